@@ -13,8 +13,9 @@
 #
 #  You should have received a copy of the GNU General Public License
 #  along with this program. If not, see <https://www.gnu.org/licenses/>.
+import os
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from numpy import ndarray
 
@@ -24,9 +25,78 @@ class BaseParser(ABC):
     A base parser. The parser is intended to load data from a file.
     """
 
-    def __init__(self, filename: str):
+    def __init__(self, filename: str, variable: str = None):
+        """
+        :param filename: the name of the file
+        :param variable: the name of the array to load, for files which can contain multiple
+        arrays (.mat and .npz); if None, the file should only contain one array which can be loaded
+        """
         self.filename: str = filename
+        self.variable: Optional[str] = variable
 
     @abstractmethod
     def parse(self) -> List[ndarray]:
         pass
+
+    def iter_chunks(self) -> Iterator[Tuple[ndarray, int]]:
+        """
+        Parses the file in chunks, so that it can be loaded with progress updates and cancelled
+        (see `DataLoader`). `join_chunks()` builds the result of `parse()` from the chunks.
+
+        Parsers which do not read the whole file, such as memory-mapped .npy files,
+        return the result of `parse()` as a single chunk.
+
+        :return: iterator over each chunk of values, and the number of bytes of the file which have been read
+        """
+        yield self.parse(), os.path.getsize(self.filename)
+
+    def join_chunks(self, chunks: Iterable[Tuple[ndarray, int]]) -> ndarray:
+        """
+        Builds the signals from the chunks returned by `iter_chunks()`, as they are parsed.
+
+        :param chunks: the chunks
+        :return: the same result as `parse()`
+        """
+        result = None
+        for result, _ in chunks:
+            pass
+
+        return result
+
+    def variables(self) -> Dict[str, Tuple[int, ...]]:
+        """
+        Lists the arrays in the file which can be loaded as signals, without loading them.
+        Files which contain one unnamed array, such as .npy files, return an empty dictionary.
+
+        :return: dictionary containing the shape of each array, in the order of the file
+        """
+        return {}
+
+    def select_variable(
+        self, condition: Callable[[Tuple[int, ...]], bool] = None
+    ) -> str:
+        """
+        Returns the name of the array which will be loaded.
+
+        :param condition: function which returns whether an array with a certain shape can be loaded
+        """
+        from data.parsing.parsing import ParsingException
+
+        if self.variable is not None:
+            return self.variable
+
+        variables = self.variables()
+        if condition:
+            variables = {k: v for k, v in variables.items() if condition(v)}
+
+        _, extension = os.path.splitext(self.filename)
+        if len(variables) > 1:
+            raise ParsingException(
+                f"{extension} file contains multiple arrays ({', '.join(variables)}), but none "
+                f"was selected. To load multiple signals, each signal should be a row or "
+                f"column in the array."
+            )
+        elif len(variables) == 0:
+            raise ParsingException(f"No arrays were found in the {extension} file.")
+
+        return next(iter(variables))
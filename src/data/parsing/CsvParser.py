@@ -13,51 +13,306 @@
 #
 #  You should have received a copy of the GNU General Public License
 #  along with this program. If not, see <https://www.gnu.org/licenses/>.
-from typing import List
+import codecs
+import io
+import os
+import warnings
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from numpy import ndarray
 
-from data.parsing import parsing
 from data.parsing.BaseParser import BaseParser
 
+# Delimiters which are detected, in order of preference. If none of them are found,
+# the values are assumed to be separated by whitespace.
+_delimiters = (",", "\t", ";", "|")
+
+# Size of each block of the file which is parsed at once, in bytes. The text of each
+# block is copied a few times while it is parsed, so it should not be too large.
+_block_size = 1024 * 1024
+
+# Number of bytes at the start of the file which are used to detect the format.
+_sniff_size = 64 * 1024
+
 
 class CsvParser(BaseParser):
     """
     A class which can parse CSV data (comma-separated-values),
     either row-wise or column-wise.
+
+    The delimiter, the number of header rows and the orientation are detected from the file.
+    The file is parsed in blocks, directly into a preallocated array.
     """
 
-    def parse(self) -> List[List[float]]:
+    def __init__(self, filename: str, dtype=np.float64):
         """
-        Parses the file, returning a list whose items are a list of
-        the values in every signal respectively.
+        :param filename: the name of the file
+        :param dtype: the data type of the parsed values, e.g. `np.float64` or `np.float32`
         """
-        lines = parsing.get_lines(self.filename)
+        super().__init__(filename)
+        self.dtype = np.dtype(dtype)
 
-        if not lines:
-            return [[]]
+        # Detected by `sniff()` when the file is parsed.
+        self.header_rows: int = 0
+        self.columns: int = 0
+        self.trailing_delimiter: bool = False
 
-        # If each line has more values than the number of lines,
-        # then each line corresponds to a separate signal.
-        row_wise = len(lines) < len(lines[0].split(","))
-        if row_wise:
-            signal_count = len(lines)
-        else:
-            signal_count = len(lines[0].split(","))
+    def parse(self) -> ndarray:
+        """
+        Parses the file, returning a 2D array containing the values of each signal in a row.
+        """
+        return self.join_chunks(self.iter_chunks())
+
+    def iter_chunks(self) -> Iterator[Tuple[ndarray, int]]:
+        """
+        Parses the file in blocks.
+
+        :return: iterator over the values in each block, with a row for each line,
+        and the number of bytes of the file which have been read
+        """
+        from data.parsing.parsing import ParsingException
+
+        if not os.path.isfile(self.filename):
+            print(f"File not found at path: '{self.filename}'")
+            raise ParsingException(f"File does not exist: {self.filename}")
+
+        delimiter, self.header_rows, self.columns, self.trailing_delimiter = (
+            self.sniff()
+        )
+
+        for block, position in self._iter_blocks(self.header_rows):
+            yield self._parse_block(block, delimiter, self.columns), position
+
+    def join_chunks(self, chunks: Iterable[Tuple[ndarray, int]]) -> ndarray:
+        """
+        Copies the values in each block into a preallocated array.
+
+        :return: 2D array containing the values of each signal in a row
+        """
+        from data.parsing.parsing import ParsingException
+
+        out = None
+        row_wise = False
+        lines = 0
+        filled = 0
+
+        for values, _ in chunks:
+            if out is None:
+                lines = self._count_lines() - self.header_rows
 
-        # List containing a list of data for each signal.
-        data = [[] for _ in range(signal_count)]
+                # If each line has more values than the number of lines,
+                # then each line corresponds to a separate signal.
+                row_wise = lines < self.columns
 
-        index = 0
-        for l in lines:
-            split = l.split(",")
+                # Each signal is a contiguous row of the output, whichever orientation the file has.
+                shape = (lines, self.columns) if row_wise else (self.columns, lines)
+                out = np.empty(shape, dtype=self.dtype)
 
-            for i in range(len(split)):
-                value = float(split[i])
-                if row_wise:
-                    data[index].append(value)
-                else:
-                    data[i].append(value)
+            count = values.shape[0]
+            if filled + count > lines:
+                raise ParsingException(
+                    f"Could not parse '{self.filename}': unexpected number of lines."
+                )
 
             if row_wise:
-                index += 1
+                out[filled : filled + count] = values
+            else:
+                out[:, filled : filled + count] = values.T
+
+            filled += count
+
+        if out is None:
+            return np.empty((1, 0), dtype=self.dtype)
+
+        # Blank lines are counted, but contain no values.
+        return out[:filled] if row_wise else out[:, :filled]
+
+    def sniff(self) -> Tuple[Optional[str], int, int, bool]:
+        """
+        Detects the format of the file from its first lines. Lines which contain text other than
+        numbers are header rows; empty values are allowed in the lines of values.
+
+        :return: the delimiter, or None if the values are separated by whitespace;
+        the number of lines before the first line of values, e.g. header rows and blank lines;
+        the number of values in each line; whether each line ends with a delimiter,
+        as in files saved by Excel
+        """
+        from data.parsing.parsing import ParsingException
+
+        with open(self.filename, mode="r", encoding="utf-8-sig", newline="") as f:
+            text = f.read(_sniff_size)
+
+        lines = text.split("\n")
+        if len(text) == _sniff_size and len(lines) > 1:
+            lines = lines[:-1]  # The last line may be incomplete.
+
+        for header_rows, line in enumerate(lines):
+            if not line.strip():
+                continue
+
+            delimiter = _detect_delimiter(line)
+            values = _split_line(line, delimiter)
+            if all(_is_number(v) for v in values if v):
+                trailing = len(values) > 1 and not values[-1]
+                columns = len(values) - 1 if trailing else len(values)
+                return delimiter, header_rows, columns, trailing
+
+        raise ParsingException(
+            f"Could not parse '{self.filename}': no lines of values were found."
+        )
+
+    def _count_lines(self) -> int:
+        """
+        Counts the lines in the file, without decoding it.
+        """
+        count = 0
+        last = b"\n"
+
+        with open(self.filename, mode="rb") as f:
+            for block in iter(lambda: f.read(_block_size), b""):
+                count += block.count(b"\n")
+                last = block[-1:]
+
+        if last != b"\n":
+            count += 1  # The last line does not end with a newline.
+
+        return count
+
+    def _iter_blocks(self, skip_lines: int = 0) -> Iterator[Tuple[str, int]]:
+        """
+        Reads the file in blocks of whole lines.
 
-        return data
+        :param skip_lines: the number of lines to skip at the start of the file
+        :return: iterator over the text of each block, and the number of bytes which have been read
+        """
+        remainder = b""
+
+        with open(self.filename, mode="rb") as f:
+            first = f.read(len(codecs.BOM_UTF8))
+            if first != codecs.BOM_UTF8:
+                remainder = first
+
+            for block in iter(lambda: f.read(_block_size), b""):
+                block = remainder + block
+
+                # Only whole lines are parsed; the rest of the last line is kept for the next block.
+                end = block.rfind(b"\n") + 1
+                block, remainder = block[:end], block[end:]
+
+                if skip_lines:
+                    block, skip_lines = _skip_lines(block, skip_lines)
+
+                if block:
+                    yield block.decode("utf-8"), f.tell() - len(remainder)
+
+            position = f.tell()
+
+        if skip_lines:
+            remainder, _ = _skip_lines(remainder, skip_lines)
+
+        if remainder:
+            yield remainder.decode("utf-8"), position
+
+    def _parse_block(
+        self, text: str, delimiter: Optional[str], columns: int
+    ) -> ndarray:
+        """
+        Parses a block of whole lines.
+
+        :return: [2D array] the values, with a row for each line
+        """
+        from data.parsing.parsing import ParsingException
+
+        if "\r" in text:
+            text = text.replace("\r", "")
+        if self.trailing_delimiter:
+            text = text.replace(f"{delimiter}\n", "\n")
+            if text.endswith(delimiter):
+                text = text[: -len(delimiter)]
+        if delimiter:
+            # Newlines are treated as delimiters, so that the whole block is parsed at once.
+            flat = text.strip("\n")
+            expected = (flat.count("\n") + 1) * columns if flat else 0
+            flat = flat.replace("\n", delimiter)
+        else:
+            # Lines cannot be counted cheaply when blank lines are allowed.
+            flat = text
+            expected = None
+
+        values = _fromstring(flat, delimiter)
+        if values is not None:
+            if expected is None and values.size % columns == 0:
+                expected = values.size
+
+            if values.size == expected:
+                return values.reshape(-1, columns)
+
+        # The block contains empty values or blank lines, which are parsed line by line.
+        try:
+            values = np.genfromtxt(
+                io.StringIO(text), delimiter=delimiter, dtype=self.dtype
+            )
+        except ValueError as e:
+            raise ParsingException(f"Could not parse '{self.filename}': {e}")
+
+        if values.size % columns != 0:
+            raise ParsingException(
+                f"Could not parse '{self.filename}': each line should contain {columns} values."
+            )
+
+        return values.reshape(-1, columns)
+
+
+def _detect_delimiter(line: str) -> Optional[str]:
+    """
+    Returns the delimiter which is used in a line, or None if the values are separated by whitespace.
+    """
+    for d in _delimiters:
+        if d in line:
+            return d
+
+    return None
+
+
+def _skip_lines(block: bytes, count: int) -> Tuple[bytes, int]:
+    """
+    Removes up to `count` lines from the start of a block.
+
+    :return: the rest of the block; the number of lines which still need to be skipped
+    """
+    while count > 0 and block:
+        end = block.find(b"\n") + 1
+        block = block[end:] if end else b""
+        count -= 1
+
+    return block, count
+
+
+def _split_line(line: str, delimiter: Optional[str]) -> List[str]:
+    """
+    Splits a line into its values, without surrounding whitespace. Empty values are empty strings.
+    """
+    return [v.strip() for v in line.split(delimiter)]
+
+
+def _is_number(value: str) -> bool:
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _fromstring(text: str, delimiter: Optional[str]) -> Optional[ndarray]:
+    """
+    Parses a string of values separated by a delimiter, or by whitespace if the delimiter is None.
+    Returns None if the text contains anything other than numbers, e.g. empty values.
+    """
+    with warnings.catch_warnings():
+        # Numpy warns, rather than raising an error, when it cannot parse the whole string.
+        warnings.simplefilter("error", DeprecationWarning)
+        try:
+            return np.fromstring(text, dtype=np.float64, sep=delimiter or " ")
+        except (DeprecationWarning, ValueError):
+            return None
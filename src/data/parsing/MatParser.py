@@ -13,36 +13,72 @@
 #
 #  You should have received a copy of the GNU General Public License
 #  along with this program. If not, see <https://www.gnu.org/licenses/>.
-from typing import List
+from typing import Dict, Tuple
 
+import numpy as np
 from numpy import ndarray
-from scipy.io import loadmat
+from scipy.io import loadmat, whosmat
 
 from data.parsing.BaseParser import BaseParser
 
+# MATLAB classes of the variables which can be loaded as signals.
+_numeric_classes = {
+    "double",
+    "single",
+    "int8",
+    "uint8",
+    "int16",
+    "uint16",
+    "int32",
+    "uint32",
+    "int64",
+    "uint64",
+    "logical",
+}
+
 
 class MatParser(BaseParser):
     """
     A parser which loads data from a .mat file.
+
+    The variables in the file can be listed without loading them, and only the selected variable
+    is loaded. MATLAB v7.3 files, which are HDF5 files, are read with h5py; if the variable is
+    stored contiguously without compression, it is memory-mapped instead of being read.
     """
 
+    def variables(self) -> Dict[str, Tuple[int, ...]]:
+        """
+        Lists the variables in the file which can be loaded as signals, without loading them.
+
+        :return: dictionary containing the shape of each variable, in the order of the file
+        """
+        if _is_hdf5(self.filename):
+            import h5py
+
+            with h5py.File(self.filename, "r") as f:
+                return {
+                    name: tuple(reversed(ds.shape))
+                    for name, ds in f.items()
+                    if _is_numeric_dataset(ds)
+                }
+
+        return {
+            name: shape
+            for name, shape, cls in whosmat(self.filename)
+            if cls in _numeric_classes
+        }
+
     def parse(self) -> ndarray:
         from data.parsing.parsing import ParsingException
 
-        data: dict = loadmat(self.filename)
-        arrays: List[ndarray] = list(
-            filter(lambda i: isinstance(i, ndarray), data.values())
+        signals = self.load_variable(
+            self.select_variable(lambda shape: len(shape) == 2)
         )
-
-        if len(arrays) > 1:
+        if signals.ndim != 2:
             raise ParsingException(
-                ".mat file should contain only one array. To load multiple signals,"
-                " each signal should be a row or column in the array."
+                f"Array with shape {signals.shape} cannot be loaded as signals. "
+                f"Each signal should be a row or column in a 2D array."
             )
-        elif len(arrays) == 0:
-            raise ParsingException("No arrays were found in the .mat file.")
-        else:
-            signals: ndarray = arrays[0]
 
         rows, cols = signals.shape
         row_wise = rows < cols
@@ -51,3 +87,82 @@ class MatParser(BaseParser):
             signals = signals.T  # Transpose signals.
 
         return signals
+
+    def load_variable(self, name: str) -> ndarray:
+        """
+        Loads a variable from the file, without loading any other variables.
+
+        :param name: the name of the variable
+        :return: the array, with the same shape as in MATLAB
+        """
+        from data.parsing.parsing import ParsingException
+
+        if _is_hdf5(self.filename):
+            return self._load_hdf5_variable(name)
+
+        data = loadmat(self.filename, variable_names=[name])
+        if name not in data:
+            raise ParsingException(f"Variable '{name}' was not found in the .mat file.")
+
+        return data[name]
+
+    def _load_hdf5_variable(self, name: str) -> ndarray:
+        """
+        Loads a variable from a MATLAB v7.3 file.
+
+        MATLAB stores arrays in column-major order, so the array in the file has the reversed
+        shape; it is transposed, which does not copy it.
+        """
+        import h5py
+        from data.parsing.parsing import ParsingException
+
+        with h5py.File(self.filename, "r") as f:
+            ds = f.get(name)
+            if ds is None or not _is_numeric_dataset(ds):
+                raise ParsingException(
+                    f"Variable '{name}' was not found in the .mat file."
+                )
+
+            offset = ds.id.get_offset()
+            if ds.chunks is None and offset is not None:
+                # Contiguous datasets (which cannot be compressed) are memory-mapped,
+                # in copy-on-write mode like .npy files.
+                array = np.memmap(
+                    self.filename,
+                    dtype=ds.dtype,
+                    mode="c",
+                    offset=offset,
+                    shape=ds.shape,
+                )
+            else:
+                # Chunked or compressed datasets are read chunk by chunk into one array.
+                array = ds[()]
+
+        return array.T
+
+
+def _is_hdf5(filename: str) -> bool:
+    """
+    Returns whether a .mat file is a MATLAB v7.3 file, which is an HDF5 file.
+    """
+    with open(filename, "rb") as f:
+        header = f.read(128)
+
+    return header.startswith(b"MATLAB 7.3")
+
+
+def _is_numeric_dataset(ds) -> bool:
+    """
+    Returns whether an item in a MATLAB v7.3 file is a numeric array.
+    """
+    import h5py
+
+    if not isinstance(ds, h5py.Dataset):
+        return False
+
+    cls = ds.attrs.get("MATLAB_class")
+    if isinstance(cls, bytes):
+        cls = cls.decode()
+
+    # Empty arrays are stored as their shape, with the "MATLAB_empty" attribute.
+    return cls in _numeric_classes and not ds.attrs.get("MATLAB_empty", 0)
@@ -26,7 +26,9 @@ class NpyParser(BaseParser):
     """
 
     def parse(self) -> ndarray:
-        signals: ndarray = np.load(self.filename)
+        # The file is memory-mapped, so the signals are only read from the disk when they are used.
+        # It is opened in copy-on-write mode, so the file cannot be modified.
+        signals: ndarray = np.load(self.filename, mmap_mode="c")
 
         rows, cols = signals.shape
         row_wise = rows < cols
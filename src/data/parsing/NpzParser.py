@@ -0,0 +1,128 @@
+#  PyMODA, a Python implementation of MODA (Multiscale Oscillatory Dynamics Analysis).
+#  Copyright (C) 2019 Lancaster University
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program. If not, see <https://www.gnu.org/licenses/>.
+import struct
+import zipfile
+from typing import BinaryIO, Dict, Tuple
+
+import numpy as np
+from numpy import ndarray
+
+from data.parsing.BaseParser import BaseParser
+
+# Size of the fixed part of the header of each file in a zip archive.
+_zip_header_size = 30
+
+
+class NpzParser(BaseParser):
+    """
+    A parser which loads data from a .npz file, which is a zip archive of .npy files.
+
+    Only the selected array is loaded. Arrays saved with `np.savez` are not compressed,
+    so they are memory-mapped like .npy files; arrays saved with `np.savez_compressed`
+    are decompressed into memory.
+    """
+
+    def variables(self) -> Dict[str, Tuple[int, ...]]:
+        """
+        Lists the numeric arrays in the file, reading only their headers.
+        """
+        out = {}
+        with zipfile.ZipFile(self.filename) as z:
+            for info in z.infolist():
+                if not info.filename.endswith(".npy"):
+                    continue
+
+                with z.open(info) as f:
+                    shape, _, dtype = _read_header(f)
+
+                if dtype.kind in "biuf":
+                    out[info.filename[: -len(".npy")]] = shape
+
+        return out
+
+    def parse(self) -> ndarray:
+        from data.parsing.parsing import ParsingException
+
+        signals = self.load_variable(
+            self.select_variable(lambda shape: len(shape) == 2)
+        )
+        if signals.ndim != 2:
+            raise ParsingException(
+                f"Array with shape {signals.shape} cannot be loaded as signals. "
+                f"Each signal should be a row or column in a 2D array."
+            )
+
+        rows, cols = signals.shape
+        row_wise = rows < cols
+
+        if not row_wise:
+            signals = signals.T  # Transpose signals.
+
+        return signals
+
+    def load_variable(self, name: str) -> ndarray:
+        """
+        Loads an array from the file, without loading any other arrays.
+
+        :param name: the name of the array
+        :return: the array, memory-mapped if it is not compressed
+        """
+        from data.parsing.parsing import ParsingException
+
+        with zipfile.ZipFile(self.filename) as z:
+            try:
+                info = z.getinfo(f"{name}.npy")
+            except KeyError:
+                raise ParsingException(
+                    f"Array '{name}' was not found in the .npz file."
+                )
+
+            if info.compress_type != zipfile.ZIP_STORED:
+                with z.open(info) as f:
+                    return np.lib.format.read_array(f, allow_pickle=False)
+
+        with open(self.filename, "rb") as f:
+            # The local header of the file in the archive may have a different
+            # "extra" field than the central directory, so it is read from the file.
+            f.seek(info.header_offset)
+            header = f.read(_zip_header_size)
+            name_length, extra_length = struct.unpack("<HH", header[26:30])
+
+            f.seek(info.header_offset + _zip_header_size + name_length + extra_length)
+            shape, fortran_order, dtype = _read_header(f)
+            offset = f.tell()
+
+        return np.memmap(
+            self.filename,
+            dtype=dtype,
+            mode="c",
+            offset=offset,
+            shape=shape,
+            order="F" if fortran_order else "C",
+        )
+
+
+def _read_header(f: BinaryIO) -> Tuple[Tuple[int, ...], bool, np.dtype]:
+    """
+    Reads the header of a .npy file, leaving the file at the start of the data.
+
+    :return: the shape, whether the array is in Fortran order, and the data type
+    """
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        return np.lib.format.read_array_header_1_0(f)
+
+    return np.lib.format.read_array_header_2_0(f)
@@ -13,11 +13,8 @@
 #
 #  You should have received a copy of the GNU General Public License
 #  along with this program. If not, see <https://www.gnu.org/licenses/>.
-from typing import Dict
-
 import numpy as np
 from numpy import ndarray
-from scipy.io import loadmat
 
 from data.parsing.MatParser import MatParser
 
@@ -30,22 +27,20 @@ class GroupMatParser(MatParser):
     def parse(self) -> ndarray:
         from data.parsing.parsing import ParsingException
 
-        data: Dict = loadmat(self.filename)
-        arrays = list(filter(lambda i: isinstance(i, ndarray), data.values()))
-
-        if len(arrays) > 1:
+        try:
+            name = self.select_variable(lambda shape: len(shape) == 3)
+        except ParsingException:
             raise ParsingException(
                 f"Data files containing a signal group should only "
                 f"contain 1 (3-dimensional) array: {self.filename}."
             )
 
-        group: ndarray = arrays[0]
+        group: ndarray = self.load_variable(name)
         x, y, z = group.shape
 
         if z == 2 and x != 2:
-            out = np.empty((x, y, z,))
-            out[0, :, :] = out[:, :, 0]
-            out[1, :, :] = out[:, :, 1]
+            # Move the last axis to the front, without copying the array.
+            out = np.moveaxis(group, 2, 0)
         else:
             out = group
 
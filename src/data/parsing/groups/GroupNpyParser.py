@@ -26,13 +26,13 @@ class GroupNpyParser(BaseParser):
     """
 
     def parse(self) -> ndarray:
-        group: ndarray = np.load(self.filename)
+        # The file is memory-mapped, so groups which are larger than the memory can be loaded.
+        group: ndarray = np.load(self.filename, mmap_mode="c")
         x, y, z = group.shape
 
         if z == 2 and x != 2:
-            out = np.empty((x, y, z,))
-            out[0, :, :] = out[:, :, 0]
-            out[1, :, :] = out[:, :, 1]
+            # Move the last axis to the front, without copying the array.
+            out = np.moveaxis(group, 2, 0)
         else:
             out = group
 
@@ -0,0 +1,47 @@
+#  PyMODA, a Python implementation of MODA (Multiscale Oscillatory Dynamics Analysis).
+#  Copyright (C) 2019 Lancaster University
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program. If not, see <https://www.gnu.org/licenses/>.
+import numpy as np
+from numpy import ndarray
+
+from data.parsing.NpzParser import NpzParser
+
+
+class GroupNpzParser(NpzParser):
+    """
+    Parser which loads group data from a .npz file.
+    """
+
+    def parse(self) -> ndarray:
+        from data.parsing.parsing import ParsingException
+
+        try:
+            name = self.select_variable(lambda shape: len(shape) == 3)
+        except ParsingException:
+            raise ParsingException(
+                f"Data files containing a signal group should only "
+                f"contain 1 (3-dimensional) array: {self.filename}."
+            )
+
+        group: ndarray = self.load_variable(name)
+        x, y, z = group.shape
+
+        if z == 2 and x != 2:
+            # Move the last axis to the front, without copying the array.
+            out = np.moveaxis(group, 2, 0)
+        else:
+            out = group
+
+        return out
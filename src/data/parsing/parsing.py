@@ -19,24 +19,13 @@ from data.parsing.BaseParser import BaseParser
 from data.parsing.CsvParser import CsvParser
 from data.parsing.MatParser import MatParser
 from data.parsing.NpyParser import NpyParser
+from data.parsing.NpzParser import NpzParser
 from data.parsing.groups.GroupMatParser import GroupMatParser
 from data.parsing.groups.GroupNpyParser import GroupNpyParser
+from data.parsing.groups.GroupNpzParser import GroupNpzParser
 
 
-def get_lines(filename):
-    lines = []
-    try:
-        with open(filename, mode="r", encoding="utf-8-sig") as f:
-            for line in f:
-                lines.append(line)
-    except FileNotFoundError:
-        print(f"File not found at path: '{filename}'")
-        raise ParsingException(f"File does not exist: {filename}")
-
-    return lines
-
-
-def get_parser(filename, groups=False) -> BaseParser:
+def get_parser(filename, groups=False, variable=None) -> BaseParser:
     """
     Gets the appropriate parser for a given file.
 
@@ -46,16 +35,28 @@ def get_parser(filename, groups=False) -> BaseParser:
         The name of the file which will be parsed.
     groups : Optional[bool]
         (Default = False) Whether the parser is intended to load a signal group, as used by group phase coherence.
+    variable : Optional[str]
+        (Default = None) The name of the array to load from a .mat or .npz file. If None, the file should only contain one array.
     """
     _, extension = os.path.splitext(filename)
     extension = extension.lower()
 
     if extension == ".mat":
-        return MatParser(filename) if not groups else GroupMatParser(filename)
+        return (
+            MatParser(filename, variable)
+            if not groups
+            else GroupMatParser(filename, variable)
+        )
     elif extension == ".csv" or extension == ".txt":
         return CsvParser(filename)
     elif extension == ".npy":
         return NpyParser(filename) if not groups else GroupNpyParser(filename)
+    elif extension == ".npz":
+        return (
+            NpzParser(filename, variable)
+            if not groups
+            else GroupNpzParser(filename, variable)
+        )
 
     raise ParsingException(f"Cannot parse a file with the extension: {extension}")
 
@@ -238,7 +238,7 @@ class DBPresenter(BaseTFPresenter):
         right.axes.set_title("Time-averaged CF 1 -> 2")
 
     def load_data(self):
-        self.signals = SignalPairs.from_file(self.open_file)
+        self.signals = SignalPairs.from_array(self.file_data)
 
         if not self.signals.has_frequency():
             freq = FrequencyDialog().run_and_get()
@@ -27,6 +27,7 @@ from maths.signals.SignalPairs import SignalPairs
 from maths.signals.TimeSeries import TimeSeries
 from maths.signals.data.BAOutputData import BAOutputData
 from processes.MPHandler import MPHandler
+from utils import args
 from utils.decorators import override
 from utils.dict_utils import sanitise
 
@@ -89,12 +90,21 @@ class BAPresenter(BaseTFPresenter):
         x, y = fr
 
         if x is not None and y is not None:
-            data = await self.mp_handler.coro_biphase(
-                self.signals, fs, f0, fr, self.on_progress_updated
-            )
+            # Calculate every point which has been added but not calculated yet, in one job.
+            data = self.get_selected_signal_pair()[0].output_data
+            points = [
+                (fx, fy)
+                for fx, fy in self.view.get_freq_pairs()
+                if f"{fx}, {fy}" not in data.biamp
+            ]
+
+            if points:
+                results = await self.mp_handler.coro_biphase(
+                    self.signals, fs, f0, points, self.on_progress_updated
+                )
 
-            for d in data:
-                self.on_biphase_completed(*d)
+                for d in results:
+                    self.on_biphase_completed(*d)
 
             self.enable_save_data(True)
 
@@ -299,13 +309,13 @@ class BAPresenter(BaseTFPresenter):
     ) -> Tuple[ndarray, ndarray, ndarray, bool]:
         fx, fy, bisp, b = tup
 
-        K = np.int(np.floor((self.params.surr_count + 1) * self.params.alpha))
+        # The significance thresholds were calculated from the surrogates using `params.alpha`.
         surr = {
             "b111": data.surrxxx,
             "b222": data.surrppp,
             "b122": data.surrxpp,
             "b211": data.surrpxx,
-        }.get(plot_type)[:, :, K]
+        }.get(plot_type)
 
         bisp = bisp.copy()
 
@@ -368,36 +378,26 @@ class BAPresenter(BaseTFPresenter):
     def on_biphase_completed(
         self,
         name: str,
-        freq_x: float,
-        freq_y: float,
-        biamp1: ndarray,
-        biphase1: ndarray,
-        biamp2: ndarray,
-        biphase2: ndarray,
-        biamp3: ndarray,
-        biphase3: ndarray,
-        biamp4: ndarray,
-        biphase4: ndarray,
+        points: List[Tuple[float, float]],
+        biamp: ndarray,
+        biphase: ndarray,
     ) -> None:
-        sig = self.signals.get(name)
-        key = f"{freq_x}, {freq_y}"
+        """
+        Stores the biamplitude and biphase of b111, b222, b122 and b211 at each point.
 
+        :param name: the name of the signal
+        :param points: the frequencies of each point
+        :param biamp: [3D array] the biamplitude, with shape (4, P, L)
+        :param biphase: [3D array] the biphase, with shape (4, P, L)
+        """
+        sig = self.signals.get(name)
         data = sig.output_data
 
-        data.biamp[key] = [[] for _ in range(4)]
-        data.biphase[key] = [[] for _ in range(4)]
-
-        data.biamp[key][0] = biamp1
-        data.biphase[key][0] = biphase1
-
-        data.biamp[key][1] = biamp2
-        data.biphase[key][1] = biphase2
-
-        data.biamp[key][2] = biamp3
-        data.biphase[key][2] = biphase3
+        for index, (freq_x, freq_y) in enumerate(points):
+            key = f"{freq_x}, {freq_y}"
 
-        data.biamp[key][3] = biamp4
-        data.biphase[key][3] = biphase4
+            data.biamp[key] = [biamp[b, index] for b in range(4)]
+            data.biphase[key] = [biphase[b, index] for b in range(4)]
 
     @override
     async def coro_get_data_to_save(self) -> Dict:
@@ -460,7 +460,7 @@ class BAPresenter(BaseTFPresenter):
         Loads the data from a file, showing a dialog to set the frequency of
         the signal.
         """
-        self.signals = SignalPairs.from_file(self.open_file)
+        self.signals = SignalPairs.from_array(self.file_data)
 
         if not self.signals.has_frequency():
             freq = FrequencyDialog().run_and_get()
@@ -511,4 +511,5 @@ class BAPresenter(BaseTFPresenter):
             surr_count=self.view.get_surr_count(),
             alpha=self.view.get_alpha(),
             opt={},
+            implementation="python" if args.python_wt() else "matlab",
         )
@@ -13,7 +13,7 @@
 #
 #  You should have received a copy of the GNU General Public License
 #  along with this program. If not, see <https://www.gnu.org/licenses/>.
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 
 from PyQt5.QtWidgets import QListWidgetItem
 
@@ -161,6 +161,18 @@ class BAWindow(
 
         return None, None
 
+    def get_freq_pairs(self) -> List[Tuple[float, float]]:
+        """
+        Returns the frequencies of every point in the list.
+        """
+        l = self.listwidget_freq
+        pairs = []
+        for i in range(l.count()):
+            str_freq_x, str_freq_y = l.item(i).text().split(", ")
+            pairs.append((float(str_freq_x), float(str_freq_y)))
+
+        return pairs
+
     def get_plot_surrogates_selected(self) -> bool:
         return self.checkbox_plot_surr.isChecked()
 
@@ -15,20 +15,25 @@
 #  along with this program. If not, see <https://www.gnu.org/licenses/>.
 import asyncio
 import os
-from typing import Dict, List
+import sys
+from typing import Dict, List, Optional
 
 import numpy as np
-from PyQt5.QtWidgets import QFileDialog
+from PyQt5.QtWidgets import QFileDialog, QInputDialog
 from numpy import ndarray
 from scipy.io import savemat
 
+from data.parsing.parsing import get_parser
 from gui.dialogs.ErrorBox import ErrorBox
 from gui.windows.common.BaseTFWindow import BaseTFWindow
 from maths.signals.Signals import Signals
 from maths.signals.TimeSeries import TimeSeries
+from processes.DataLoader import DataLoader
 from processes.MPHandler import MPHandler
 from utils import stdout_redirect, errorhandling
 from utils.decorators import deprecated
+from utils.dict_utils import to_arrays
+from utils.hdf5 import save_hdf5
 from utils.settings import Settings
 from utils.stdout_redirect import WindowLogger
 
@@ -49,6 +54,11 @@ class BaseTFPresenter:
         self.signals: Signals = None
         self.selected_signal_name: str = None
         self.open_file: str = None
+        self.variable: Optional[str] = None
+
+        # The signals parsed from the data file, with a row for each signal.
+        self.file_data: Optional[ndarray] = None
+        self.loader: Optional[DataLoader] = None
         self.freq: float = None
 
         self.mp_handler: MPHandler = None
@@ -122,6 +132,9 @@ class BaseTFPresenter:
         if self.mp_handler:
             self.mp_handler.stop()
 
+        if self.loader:
+            self.loader.cancel()
+
         self.view.on_calculate_stopped()
         self.is_plotted = False
         self.on_all_tasks_completed()
@@ -141,9 +154,68 @@ class BaseTFPresenter:
         self.open_file = file
         print(f"Opening {self.open_file}...")
         self.view.update_title()
-        self.load_data()
+
+        self.variable = None
+
+        # If a .mat or .npz file contains multiple arrays, the user selects the one to load.
+        variables = get_parser(file).variables()
+        variables = {k: v for k, v in variables.items() if len(v) == 2}
+
+        if len(variables) > 1:
+            self.variable = self.select_variable(variables)
+            if self.variable is None:
+                return
+
+        asyncio.ensure_future(self.coro_load_file())
+
+    async def coro_load_file(self) -> None:
+        """
+        Parses the data file in a separate thread, showing the progress, and then loads the data.
+        The "Cancel" button cancels the loading.
+        """
+        self.loader = DataLoader()
+        self.view.on_calculate_started()
+
+        try:
+            parser = get_parser(self.open_file, variable=self.variable)
+            self.file_data = await self.loader.coro_load(
+                parser, self.view.update_loading_progress
+            )
+        except Exception:
+            # Exceptions in coroutines do not reach the exception hook, which shows the error.
+            self.file_data = None
+            sys.excepthook(*sys.exc_info())
+        finally:
+            self.loader = None
+            self.view.on_calculate_stopped()
+
+        if self.file_data is not None:
+            self.load_data()
+
+    def select_variable(self, variables: Dict[str, tuple]) -> Optional[str]:
+        """
+        Uses a dialog to select the array which will be loaded from a .mat or .npz file.
+
+        :param variables: dictionary containing the shape of each variable
+        :return: the name of the variable, or None if the dialog was cancelled
+        """
+        items = [
+            f"{name} ({' x '.join(str(i) for i in shape)})"
+            for name, shape in variables.items()
+        ]
+        item, ok = QInputDialog.getItem(
+            self.view, "Select variable", "Variable to load:", items, 0, False
+        )
+
+        if not ok:
+            return None
+
+        return list(variables)[items.index(item)]
 
     def load_data(self) -> None:
+        """
+        Creates the signals from the data in `self.file_data`, after the data file has been parsed.
+        """
         pass
 
     async def coro_get_data_to_save(self) -> Dict:
@@ -169,7 +241,7 @@ class BaseTFPresenter:
             path += ".mat"
 
         print("Saving data as .mat file...")
-        savemat(path, data)
+        savemat(path, to_arrays(data))
         print(f"Data saved to {path}.")
 
     def save_data_npy(self) -> None:
@@ -184,9 +256,31 @@ class BaseTFPresenter:
 
         if path:
             print("Saving data as .npy file...")
-            np.save(path, data)
+            np.save(path, to_arrays(data))
             print(f"Data saved to {path}.")
 
+    def save_data_hdf5(self) -> None:
+        asyncio.ensure_future(self.coro_save_data_hdf5())
+
+    async def coro_save_data_hdf5(self) -> None:
+        """
+        Saves the current results as an HDF5 file, with large arrays chunked and compressed.
+        The file is written in a separate thread, so the window does not freeze.
+        """
+        data = await self.coro_get_data_to_save()
+        path = self.get_save_location()
+
+        if not path:
+            return
+
+        if not path.endswith(".h5"):
+            path += ".h5"
+
+        print("Saving data as .h5 file...")
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, save_hdf5, path, data)
+        print(f"Data saved to {path}.")
+
     def get_save_location(self) -> str:
         """
         Uses a dialog to get the desired save location, and returns the path.
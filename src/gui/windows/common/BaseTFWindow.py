@@ -80,6 +80,9 @@ class BaseTFWindow(BaseTFViewProperties, MaximisedWindow):
         npy = save.addAction("Save data as .npy")
         npy.triggered.connect(self.presenter.save_data_npy)
 
+        hdf5 = save.addAction("Save data as .h5")
+        hdf5.triggered.connect(self.presenter.save_data_hdf5)
+
         self.enable_save_data(False)
 
     def enable_save_data(self, enable: bool) -> None:
@@ -237,6 +240,21 @@ class BaseTFWindow(BaseTFViewProperties, MaximisedWindow):
 
         lbl.setText(self.progress_message(current, total))
 
+    def update_loading_progress(self, bytes_read: int, total: int) -> None:
+        """
+        Shows the progress of loading a data file.
+
+        :param bytes_read: the number of bytes of the file which have been read
+        :param total: the size of the file in bytes
+        """
+        percent = int(bytes_read / total * 100) if total else 100
+        self.update_progress(percent, 100)
+
+        if percent < 100:
+            self.lbl_progress.setText(
+                f"Loaded {bytes_read / 1e6:.0f} of {total / 1e6:.0f} MB."
+            )
+
     @deprecated
     def get_button_calculate_all(self) -> QPushButton:
         return self.btn_calculate_all
@@ -15,16 +15,19 @@
 #  along with this program. If not, see <https://www.gnu.org/licenses/>.
 import asyncio
 import os
+import sys
 from typing import Dict, Optional
 
 from PyQt5.QtGui import QStandardItemModel, QStandardItem
 from PyQt5.QtWidgets import QTableView
 
+from data.parsing.parsing import get_parser
 from gui.dialogs.FrequencyDialog import FrequencyDialog
 from gui.dialogs.PyMODAlibCacheDialog import PyMODAlibCacheDialog
 from gui.plotting.plots.GroupCoherencePlot import GroupCoherencePlot
 from gui.windows.common.BaseTFPresenter import BaseTFPresenter
 from maths.signals.SignalGroups import SignalGroups
+from processes.DataLoader import DataLoader
 from processes.MPHandler import MPHandler
 from utils import args
 from utils.decorators import override
@@ -190,7 +193,7 @@ class GCPresenter(BaseTFPresenter):
         PyMODAlibCacheDialog().run()
 
     def load_data(self) -> None:
-        self.signals = SignalGroups.from_files(self.open_files)
+        self.signals = SignalGroups.from_arrays(self.file_data)
 
         if not self.signals.has_frequency():
             freq = FrequencyDialog().run_and_get()
@@ -205,7 +208,43 @@ class GCPresenter(BaseTFPresenter):
         self.open_files = files
         print(f"Opening {files}...")
         self.view.update_title()
-        self.load_data()
+
+        asyncio.ensure_future(self.coro_load_file())
+
+    @override
+    async def coro_load_file(self) -> None:
+        """
+        Parses the group files in a separate thread, one after the other, showing the progress
+        of each file, and then loads the data. The "Cancel" button cancels the loading.
+        """
+        self.loader = DataLoader()
+        self.view.on_calculate_started()
+
+        self.file_data = []
+        try:
+            for f in self.open_files:
+                if f is None:
+                    self.file_data.append(None)
+                    continue
+
+                array = await self.loader.coro_load(
+                    get_parser(f, groups=True), self.view.update_loading_progress
+                )
+                if array is None:
+                    self.file_data = None  # Cancelled.
+                    break
+
+                self.file_data.append(array)
+        except Exception:
+            # Exceptions in coroutines do not reach the exception hook, which shows the error.
+            self.file_data = None
+            sys.excepthook(*sys.exc_info())
+        finally:
+            self.loader = None
+            self.view.on_calculate_stopped()
+
+        if self.file_data is not None:
+            self.load_data()
 
     @override
     async def coro_get_data_to_save(self) -> Optional[Dict]:
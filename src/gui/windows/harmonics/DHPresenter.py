@@ -112,7 +112,7 @@ class DHPresenter(BaseTFPresenter):
             main_plot.clear()
 
     def load_data(self) -> None:
-        self.signals = Signals.from_file(self.open_file)
+        self.signals = Signals.from_array(self.file_data)
 
         if not self.signals.has_frequency():
             freq = FrequencyDialog().run_and_get()
@@ -95,7 +95,7 @@ class PCPresenter(BaseTFPresenter):
         return await self.mp_handler.coro_phase_coherence(signals, params, on_progress)
 
     def on_transform_completed(
-        self, name, times, freq, values, ampl, powers, avg_ampl, avg_pow, opt=None
+        self, name, times, freq, values, avg_ampl, avg_pow, opt=None
     ) -> None:
         print(f"Calculated wavelet transform for '{name}'")
 
@@ -103,9 +103,7 @@ class PCPresenter(BaseTFPresenter):
             self.params.set_item("fmin", opt.get("fmin"))
 
         t = self.signals.get(name)
-        t.output_data = TFOutputData(
-            times, values, ampl, freq, powers, avg_ampl, avg_pow
-        )
+        t.output_data = TFOutputData(times, values, freq, avg_ampl, avg_pow)
 
     def on_phase_coherence_completed(
         self, signal_pair, tpc, pc, pdiff, surrogate_avg
@@ -145,7 +143,7 @@ class PCPresenter(BaseTFPresenter):
         ampl.plot(data.overall_coherence, freq, surrogates=data.surrogate_avg)
 
     def load_data(self) -> None:
-        self.signals = SignalPairs.from_file(self.open_file)
+        self.signals = SignalPairs.from_array(self.file_data)
 
         if not self.signals.has_frequency():
             freq = FrequencyDialog().run_and_get()
@@ -173,7 +171,7 @@ class PCPresenter(BaseTFPresenter):
 
         avg_surrogates = np.empty((len(first.surrogate_avg), cols))
 
-        amp = np.empty((*first.ampl.shape, cols))
+        amp = np.empty((*first.values.shape, cols))
         avg_amp = np.empty((first.avg_ampl.shape[0], cols))
 
         freq = first.freq
@@ -195,7 +193,7 @@ class PCPresenter(BaseTFPresenter):
                 coh[:, :, index] = d.phase_coherence[:, :]
                 avg_coh[:, index] = d.overall_coherence[:, index]
 
-                amp[:, :, index] = d.ampl[:, :]
+                amp[:, :, index] = np.abs(d.values)
                 avg_amp[:, index] = d.avg_ampl[:]
             else:
                 avg_surrogates[:, index] = np.NAN
@@ -88,8 +88,6 @@ class REPresenter(TFPresenter):
         times,
         freq,
         values,
-        ampl,
-        powers,
         avg_ampl,
         avg_pow,
         interval,
@@ -104,9 +102,6 @@ class REPresenter(TFPresenter):
         d.set_ridge_data(interval, filtered_signal, ifreq, iphi)
         d.values = values
 
-        d.ampl = ampl
-        d.powers = powers
-
         d.avg_ampl = avg_ampl
         d.avg_pow = avg_pow
 
@@ -77,7 +77,7 @@ class TFPresenter(BaseTFPresenter):
         self.view.main_plot().set_in_progress(True)
         self.invalidate_data()
 
-        log: bool = (params.transform == _wt)
+        log: bool = params.transform == _wt
         self.view.main_plot().set_log_scale(logarithmic=log)
         self.view.amplitude_plot().set_log_scale(logarithmic=log)
 
@@ -91,7 +91,7 @@ class TFPresenter(BaseTFPresenter):
             self.on_transform_completed(*d)
 
     def on_transform_completed(
-        self, name, times, freq, values, ampl, powers, avg_ampl, avg_pow, opt=None
+        self, name, times, freq, values, avg_ampl, avg_pow, opt=None
     ) -> None:
         """
         Called when the calculation of the desired transform(s) is completed.
@@ -103,9 +103,7 @@ class TFPresenter(BaseTFPresenter):
             self.params.set_item("fmin", opt.get("fmin"))
 
         t = self.signals.get(name)
-        t.output_data = TFOutputData(
-            times, values, ampl, freq, powers, avg_ampl, avg_pow
-        )
+        t.output_data = TFOutputData(times, values, freq, avg_ampl, avg_pow)
 
         print(f"Finished calculation for '{name}'.")
 
@@ -147,7 +145,7 @@ class TFPresenter(BaseTFPresenter):
 
         first = [d for d in output_data if d.is_valid()][0]
 
-        amp = np.empty((*first.ampl.shape, cols))
+        amp = np.empty((*first.values.shape, cols))
         avg_amp = np.empty((first.avg_ampl.shape[0], cols))
 
         freq = first.freq
@@ -156,7 +154,7 @@ class TFPresenter(BaseTFPresenter):
         for index, d in enumerate(output_data):
             if d.is_valid():
                 avg_amp[:, index] = d.avg_ampl[:]
-                amp[:, :, index] = d.ampl[:]
+                amp[:, :, index] = np.abs(d.values)
             else:
                 avg_amp[:, index] = np.NAN
                 amp[:, :, index] = np.NAN
@@ -248,7 +246,7 @@ class TFPresenter(BaseTFPresenter):
         )
 
     def load_data(self) -> None:
-        self.signals = Signals.from_file(self.open_file)
+        self.signals = Signals.from_array(self.file_data)
 
         if not self.signals.has_frequency():
             freq = FrequencyDialog().run_and_get()
@@ -0,0 +1,322 @@
+#  PyMODA, a Python implementation of MODA (Multiscale Oscillatory Dynamics Analysis).
+#  Copyright (C) 2019 Lancaster University
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program. If not, see <https://www.gnu.org/licenses/>.
+import hashlib
+import math
+from collections import OrderedDict
+from typing import List, Tuple
+
+import numpy as np
+import pymodalib
+from numpy import ndarray
+
+"""
+Wavelet bispectrum and biphase, implemented with Numpy as an alternative to the
+MATLAB-packaged `bispecWavPython` and `biphaseWavPython`.
+
+The wavelet bispectrum of signals x and y is
+
+    B(f1, f2) = < Wx(f1, t) * Wy(f2, t) * conj(Wy(f1 + f2, t)) >
+
+where W are the wavelet transforms (lognormal wavelet, cut to the cone of influence), <...>
+is the average over time, ignoring NaN values, and Wy(f1 + f2, t) is taken at the frequency
+of the transform which is nearest to f1 + f2. Points where f1 + f2 is above the highest
+frequency are NaN.
+
+`calculate()` and `biphase()` have the same signatures as the MATLAB wrappers, so they can be
+used interchangeably. The wavelet transforms of the most recent signals are kept in memory,
+so calculating b111, b222, b122 and b211 for the same signals only transforms each signal once.
+`biphase_points()` and `biphase_pairs()` calculate the biphase at many points from the same pair
+of transforms, which are returned by `point_transforms()`.
+"""
+
+# Maximum number of wavelet transforms kept in memory in each process.
+_cache_size = 2
+_cache: "OrderedDict[Tuple, Tuple[ndarray, ndarray]]" = OrderedDict()
+
+
+def calculate(
+    signal1: ndarray,
+    signal2: ndarray,
+    fs: float,
+    params: dict,
+    dtype=np.complex64,
+    chunk_size: int = 16,
+    cache: bool = True,
+) -> Tuple[ndarray, ndarray, ndarray, ndarray, dict]:
+    """
+    Calculates the wavelet bispectrum of 2 signals.
+
+    :param signal1: [1D array] the first signal
+    :param signal2: [1D array] the second signal
+    :param fs: the sampling frequency
+    :param params: dictionary containing "fmin", "fmax", "f0", "nv" and, optionally, "preprocess"
+    :param dtype: the complex type used for the wavelet transforms and the triple products
+    :param chunk_size: the number of frequencies f2 for which the triple products are calculated at once
+    :param cache: whether to keep the wavelet transforms in memory; should be False for signals
+    which will not be used again, such as surrogates
+    :return: [2D array] the absolute value of the bispectrum; [1D array] the frequencies;
+    [2D array] the amplitude of each wavelet transform; the options used
+    """
+    wt1, freq = _wavelet_transform(signal1, fs, params, cache)
+    wt2, _ = _wavelet_transform(signal2, fs, params, cache)
+
+    bisp = bispectrum(wt1, wt2, freq, dtype, chunk_size)
+
+    opt = {
+        "fmin": freq[0],
+        "fmax": freq[-1],
+        "f0": _f0(params),
+        "nv": params.get("nv"),
+        "preprocess": params.get("preprocess", True),
+        "implementation": "python",
+        # The parameters are needed to find the same wavelet transforms in `biphase()`.
+        "params": dict(params),
+    }
+    return np.abs(bisp), freq, np.abs(wt1), np.abs(wt2), opt
+
+
+def bispectrum(
+    wt1: ndarray, wt2: ndarray, freq: ndarray, dtype=np.complex64, chunk_size: int = 16
+) -> ndarray:
+    """
+    Calculates the wavelet bispectrum from a pair of wavelet transforms.
+
+    The triple products are calculated for one frequency f1 and a chunk of frequencies f2
+    at a time, so the temporary arrays have at most `chunk_size` rows.
+
+    :param wt1: [2D array] the wavelet transform of the first signal
+    :param wt2: [2D array] the wavelet transform of the second signal
+    :param freq: [1D array] the frequencies of the wavelet transforms
+    :param dtype: the complex type used for the triple products
+    :param chunk_size: the number of frequencies f2 to process at once
+    :return: [2D array, complex] the bispectrum, with f1 along the rows and f2 along the columns
+    """
+    wt1 = np.asarray(wt1, dtype=dtype)
+    wt2 = np.asarray(wt2, dtype=dtype)
+    conj_wt2 = np.conj(wt2)
+
+    FN = len(freq)
+    bisp = np.full((FN, FN), np.nan, dtype=np.complex128)
+
+    for j in range(FN):
+        # Indices of f1 + f2 for every f2 where it is within the frequency range.
+        valid = np.nonzero(freq[j] + freq <= freq[-1])[0]
+        idx3 = _nearest(freq, freq[j] + freq[valid])
+
+        for start in range(0, len(valid), chunk_size):
+            k = valid[start : start + chunk_size]
+            k3 = idx3[start : start + chunk_size]
+
+            product = wt1[j] * wt2[k] * conj_wt2[k3]
+            bisp[j, k] = _nanmean(product)
+
+    return bisp
+
+
+def biphase(
+    signal1: ndarray, signal2: ndarray, fs: float, f0: float, fr, opt: dict
+) -> Tuple[ndarray, ndarray]:
+    """
+    Calculates the biamplitude and biphase at a pair of frequencies, using the wavelet transforms
+    from `calculate()`. The frequencies nearest to f1, f2 and f1 + f2 are used.
+
+    :param signal1: [1D array] the first signal
+    :param signal2: [1D array] the second signal
+    :param fs: the sampling frequency
+    :param f0: the resolution parameter
+    :param fr: the frequencies (f1, f2)
+    :param opt: the options returned by `calculate()`
+    :return: [2D array] the biamplitude, with shape (1, L); [2D array] the biphase, with shape (1, L)
+    """
+    return biphase_points(signal1, signal2, fs, f0, [fr], opt)
+
+
+def biphase_points(
+    signal1: ndarray,
+    signal2: ndarray,
+    fs: float,
+    f0: float,
+    points: List[Tuple[float, float]],
+    opt: dict,
+) -> Tuple[ndarray, ndarray]:
+    """
+    Calculates the biamplitude and biphase at many pairs of frequencies. Each signal is
+    transformed once (or not at all, if its wavelet transform is still in memory from `calculate()`),
+    and the triple products at every point are calculated from the same transforms.
+
+    :param signal1: [1D array] the first signal
+    :param signal2: [1D array] the second signal
+    :param fs: the sampling frequency
+    :param f0: the resolution parameter
+    :param points: the frequencies (f1, f2) of each point
+    :param opt: the options returned by `calculate()`
+    :return: [2D array] the biamplitude at each point, with shape (P, L);
+    [2D array] the biphase at each point, with shape (P, L)
+    """
+    wt1, wt2, freq = point_transforms(signal1, signal2, fs, f0, opt)
+    return _biphase_points(wt1, wt2, freq, points)
+
+
+def biphase_pairs(
+    wt1: ndarray, wt2: ndarray, freq: ndarray, points: List[Tuple[float, float]]
+) -> Tuple[ndarray, ndarray]:
+    """
+    Calculates the biamplitude and biphase at many pairs of frequencies for each of the
+    combinations used in bispectrum analysis: (signal1, signal1), (signal2, signal2),
+    (signal1, signal2) and (signal2, signal1), from the wavelet transform of each signal.
+
+    :param wt1: [2D array] the wavelet transform of the first signal, from `point_transforms()`
+    :param wt2: [2D array] the wavelet transform of the second signal, from `point_transforms()`
+    :param freq: [1D array] the frequencies of the wavelet transforms
+    :param points: the frequencies (f1, f2) of each point
+    :return: [3D array] the biamplitude of each combination at each point, with shape (4, P, L);
+    [3D array] the biphase of each combination at each point, with shape (4, P, L)
+    """
+    results = [
+        _biphase_points(a, b, freq, points)
+        for a, b in ((wt1, wt1), (wt2, wt2), (wt1, wt2), (wt2, wt1))
+    ]
+
+    biamp = np.stack([r[0] for r in results])
+    biphase = np.stack([r[1] for r in results])
+    return biamp, biphase
+
+
+def point_transforms(
+    signal1: ndarray, signal2: ndarray, fs: float, f0: float, opt: dict
+) -> Tuple[ndarray, ndarray, ndarray]:
+    """
+    Returns the wavelet transforms of both signals with the parameters used by `calculate()`,
+    and their frequencies. Signals whose transforms are still in memory from `calculate()`
+    are not transformed again.
+
+    :param signal1: [1D array] the first signal
+    :param signal2: [1D array] the second signal
+    :param fs: the sampling frequency
+    :param f0: the resolution parameter
+    :param opt: the options returned by `calculate()`
+    """
+    params = {**opt["params"], "f0": f0}
+
+    wt1, freq = _wavelet_transform(signal1, fs, params)
+    wt2, _ = _wavelet_transform(signal2, fs, params)
+    return wt1, wt2, freq
+
+
+def _biphase_points(
+    wt1: ndarray, wt2: ndarray, freq: ndarray, points: List[Tuple[float, float]]
+) -> Tuple[ndarray, ndarray]:
+    """
+    Calculates the biamplitude and biphase at each point from a pair of wavelet transforms.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    f1, f2 = points[:, 0], points[:, 1]
+
+    j = _nearest(freq, f1)
+    k = _nearest(freq, f2)
+    k3 = _nearest(freq, f1 + f2)
+
+    product = wt1[j] * wt2[k] * np.conj(wt2[k3])
+
+    biamp = np.abs(product)
+    biphase = np.angle(product)
+
+    # Unwrap the phase within the cone of influence; NaN values would spread through `unwrap()`.
+    for row in biphase:
+        valid = ~np.isnan(row)
+        row[valid] = np.unwrap(row[valid])
+
+    return biamp, biphase
+
+
+def _wavelet_transform(
+    signal: ndarray, fs: float, params: dict, cache: bool = True
+) -> Tuple[ndarray, ndarray]:
+    """
+    Calculates the wavelet transform of a signal, or returns it from the cache if it was
+    calculated recently in the current process with the same parameters. If `cache` is False,
+    the new transform is not added to the cache.
+    """
+    signal = np.ascontiguousarray(signal, dtype=np.float64)
+    fmin, fmax = params.get("fmin"), params.get("fmax")
+    if fmin is not None and math.isnan(fmin):
+        fmin = None
+
+    nv = params.get("nv")
+    preprocess = params.get("preprocess", True)
+
+    key = (
+        hashlib.sha1(signal.tobytes()).hexdigest(),
+        fs,
+        fmin,
+        fmax,
+        _f0(params),
+        nv,
+        preprocess,
+    )
+
+    result = _cache.get(key)
+    if result is not None:
+        _cache.move_to_end(key)
+        return result
+
+    wt, freq = pymodalib.wavelet_transform(
+        signal,
+        fs,
+        fmin=fmin,
+        fmax=fmax,
+        resolution=_f0(params),
+        cut_edges=True,
+        wavelet="Lognorm",
+        preprocess=preprocess,
+        implementation="python",
+        nv=nv,
+    )
+
+    if not cache:
+        return wt, freq
+
+    _cache[key] = wt, freq
+    while len(_cache) > _cache_size:
+        _cache.popitem(last=False)
+
+    return wt, freq
+
+
+def _f0(params: dict) -> float:
+    return params.get("f0") or 1
+
+
+def _nearest(freq: ndarray, values: ndarray) -> ndarray:
+    """
+    Returns the indices of the frequencies nearest to each value.
+    """
+    idx = np.clip(np.searchsorted(freq, values), 1, len(freq) - 1)
+    lower = values - freq[idx - 1] < freq[idx] - values
+    return idx - lower
+
+
+def _nanmean(product: ndarray) -> ndarray:
+    """
+    Returns the mean of each row, ignoring NaN values; rows without any values are NaN.
+    """
+    valid = ~np.isnan(product)
+    count = np.sum(valid, axis=1)
+
+    total = np.sum(np.where(valid, product, 0), axis=1, dtype=np.complex128)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(count > 0, total / count, np.nan)
@@ -18,12 +18,14 @@
 Do not import this module in the main process, or it will break Linux support
 due to issues with the LD_LIBRARY_PATH.
 """
+
 from typing import Tuple
 
 from numpy import ndarray
 from pymodalib.utils.decorators import matlabwrapper
 
-from maths.num_utils import matlab_to_numpy
+from maths.algorithms.matlabwrappers.conversion import to_matlab, multi_to_numpy
+from maths.algorithms.matlabwrappers.packages import get_package
 
 
 @matlabwrapper(module="biphaseWavNew")
@@ -33,26 +35,19 @@ def calculate(
     """
     Calculates the biphase and biamplitude from the bispectrum using the MATLAB-packaged function.
     """
-    import biphaseWavPython
-    import matlab
-
-    package = biphaseWavPython.initialize()
+    package = get_package("biphaseWavPython")
 
     result = package.biphaseWavPython(
-        matlab.double(signal1),
-        matlab.double(signal2),
+        to_matlab(signal1),
+        to_matlab(signal2),
         fs,
         f0,
-        matlab.double(list(fr)),
+        to_matlab(list(fr)),
         opt,
         nargout=2,
     )
 
-    biamp, biphase = result
-
-    biamp = matlab_to_numpy(biamp)
-    biphase = matlab_to_numpy(biphase)
-
+    biamp, biphase = multi_to_numpy(*result)
     return biamp, biphase
 
 
@@ -20,7 +20,8 @@ import numpy as np
 from numpy import ndarray
 from pymodalib.utils.decorators import matlabwrapper
 
-from maths.num_utils import multi_matlab_to_numpy
+from maths.algorithms.matlabwrappers.conversion import to_matlab, multi_to_numpy
+from maths.algorithms.matlabwrappers.packages import get_package
 
 
 @matlabwrapper(module="bispecWavPython")
@@ -30,23 +31,18 @@ def calculate(
     """
     Calculates the bispectrum of 2 signals using the MATLAB-packaged function.
     """
-    import bispecWavPython
-    import matlab
-
-    package = bispecWavPython.initialize()
+    package = get_package("bispecWavPython")
 
     result = package.bispecWavPython(
-        matlab.double(signal1), matlab.double(signal2), fs, *expand(params), nargout=5
+        to_matlab(signal1), to_matlab(signal2), fs, *expand(params), nargout=5
     )
 
     bisp, freq, wt1, wt2, opt = result
-    bisp, freq, wt1, wt2 = multi_matlab_to_numpy(bisp, freq, wt1, wt2)
+    bisp, freq, wt1, wt2 = multi_to_numpy(bisp, freq, wt1, wt2)
 
     opt["PadLR1"], opt["PadLR2"], opt["twf1"], opt["twf2"] = [
-        n.tolist()[0]
-        for n in multi_matlab_to_numpy(
-            opt["PadLR1"], opt["PadLR2"], opt["twf1"], opt["twf2"]
-        )
+        n.ravel()
+        for n in multi_to_numpy(opt["PadLR1"], opt["PadLR2"], opt["twf1"], opt["twf2"])
     ]
 
     output = (np.abs(bisp), freq, np.abs(wt1), np.abs(wt2), opt)
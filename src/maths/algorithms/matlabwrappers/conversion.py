@@ -0,0 +1,195 @@
+#  PyMODA, a Python implementation of MODA (Multiscale Oscillatory Dynamics Analysis).
+#  Copyright (C) 2019 Lancaster University
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program. If not, see <https://www.gnu.org/licenses/>.
+from timeit import default_timer as timer
+from typing import Any, List, Dict
+
+import numpy as np
+from numpy import ndarray
+
+"""
+Conversions between Numpy arrays and MATLAB arrays.
+
+The MATLAB Engine API stores the data of a `matlab.double` in a flat, column-major
+`array.array` (`_data`, or `_real` and `_imag` for complex arrays). Rather than building
+a Python list of floats, these functions copy Numpy data directly into that buffer, and
+wrap the buffer with `np.frombuffer()` on the way back. Newer versions of the API accept
+Numpy arrays directly, which is used as a fallback.
+
+This module only imports `matlab` inside `to_matlab()`, so it is safe to import in the
+main process.
+"""
+
+
+def to_matlab(arr: Any) -> Any:
+    """
+    Converts a Numpy array, or anything which can be converted to a Numpy array, to a `matlab.double`.
+
+    1D arrays are converted to MATLAB row vectors, which is consistent with calling
+    `matlab.double()` on a Python list. Complex arrays are converted to complex MATLAB arrays.
+
+    Must only be called in a process where a MATLAB package has been imported.
+
+    :param arr: the array to convert
+    :return: the MATLAB array
+    """
+    import matlab
+
+    if isinstance(arr, matlab.double):
+        return arr
+
+    arr = np.asarray(arr)
+    is_complex = np.iscomplexobj(arr)
+    arr = arr.astype(np.complex128 if is_complex else np.float64, copy=False)
+
+    if arr.ndim == 0:
+        arr = arr.reshape(1, 1)
+    elif arr.ndim == 1:
+        arr = arr.reshape(1, -1)
+
+    size = arr.shape
+    flat = arr.ravel(order="F")
+
+    try:
+        out = matlab.double(size=size, is_complex=is_complex)
+        if is_complex:
+            np.frombuffer(out._real, dtype=np.float64)[:] = flat.real
+            np.frombuffer(out._imag, dtype=np.float64)[:] = flat.imag
+        else:
+            np.frombuffer(out._data, dtype=np.float64)[:] = flat
+        return out
+    except (AttributeError, TypeError, ValueError):
+        pass
+
+    try:
+        # Newer versions of the MATLAB Engine API support the buffer protocol.
+        return matlab.double(np.ascontiguousarray(arr), is_complex=is_complex)
+    except (TypeError, ValueError):
+        return matlab.double(arr.tolist(), is_complex=is_complex)
+
+
+def to_numpy(arr: Any) -> ndarray:
+    """
+    Converts a MATLAB array to a Numpy array with the same shape, without copying
+    the data where possible. Complex MATLAB arrays are converted to complex Numpy arrays.
+
+    Numpy arrays are returned unchanged, and other objects (such as lists or floats)
+    are converted with `np.asarray()`.
+
+    :param arr: the MATLAB array
+    :return: the Numpy array
+    """
+    if isinstance(arr, ndarray):
+        return arr
+
+    size = getattr(arr, "size", None)
+    if not isinstance(size, tuple):
+        return np.asarray(arr)
+
+    try:
+        if getattr(arr, "_is_complex", False):
+            real = np.frombuffer(arr._real, dtype=np.float64)
+            imag = np.frombuffer(arr._imag, dtype=np.float64)
+
+            result = np.empty(real.shape, dtype=np.complex128)
+            result.real = real
+            result.imag = imag
+        else:
+            result = np.frombuffer(arr._data, dtype=_dtype(arr._data))
+
+        return result.reshape(size, order="F")
+    except (AttributeError, TypeError, ValueError):
+        pass
+
+    # Newer versions of the MATLAB Engine API support the buffer protocol.
+    return np.asarray(arr)
+
+
+def multi_to_numpy(*args) -> List[ndarray]:
+    """
+    Converts multiple MATLAB arrays to Numpy arrays using `to_numpy()`.
+    """
+    return [to_numpy(arr) for arr in args]
+
+
+def _dtype(data) -> np.dtype:
+    """
+    Returns the Numpy dtype matching the typecode of an `array.array`.
+    """
+    typecode = getattr(data, "typecode", "d")
+    return np.dtype(typecode)
+
+
+def benchmark(length: int = 1_000_000, repeats: int = 5) -> Dict[str, float]:
+    """
+    Measures the time taken to convert a signal to a MATLAB array and back, using both
+    the Python list conversion previously used by the wrappers and the functions in this module.
+
+    Must be run in a process where a MATLAB package can be imported, e.g.
+    `python -m maths.algorithms.matlabwrappers.conversion` from the "src" folder.
+
+    :param length: the number of samples in the test signal
+    :param repeats: the number of times to repeat each conversion; the fastest time is used
+    :return: dictionary containing the fastest time, in seconds, of each conversion
+    """
+    from maths.algorithms.matlabwrappers.packages import get_package
+
+    # A MATLAB package must be imported before "import matlab" can be used.
+    get_package("WFT")
+    import matlab
+
+    signal = np.random.randn(length)
+    complex_signal = signal + 1j * np.random.randn(length)
+
+    def best(func) -> float:
+        times = []
+        for _ in range(repeats):
+            start = timer()
+            func()
+            times.append(timer() - start)
+
+        return min(times)
+
+    def list_to_numpy(arr) -> ndarray:
+        # The conversion previously used by the wrappers, which creates a Python float for each item.
+        try:
+            return np.array(arr._data).reshape(arr.size, order="F")
+        except AttributeError:
+            return np.array(arr)
+
+    m = to_matlab(signal)
+    mc = to_matlab(complex_signal)
+
+    results = {
+        "list to matlab": best(lambda: matlab.double(signal.tolist())),
+        "buffer to matlab": best(lambda: to_matlab(signal)),
+        "list to numpy": best(lambda: list_to_numpy(m)),
+        "buffer to numpy": best(lambda: to_numpy(m)),
+        "complex to numpy (asarray)": best(lambda: np.asarray(mc)),
+        "complex to numpy (buffer)": best(lambda: to_numpy(mc)),
+    }
+
+    for key, value in results.items():
+        print(f"{key}: {value * 1000:.1f} ms")
+
+    return results
+
+
+if __name__ == "__main__":
+    # Benchmark the conversions if this file is run directly.
+    from processes.mp_utils import setup_matlab_runtime
+
+    setup_matlab_runtime()
+    benchmark()
@@ -0,0 +1,126 @@
+#  PyMODA, a Python implementation of MODA (Multiscale Oscillatory Dynamics Analysis).
+#  Copyright (C) 2019 Lancaster University
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program. If not, see <https://www.gnu.org/licenses/>.
+import atexit
+import importlib
+from timeit import default_timer as timer
+from typing import Dict, Any
+
+"""
+Per-process registry of initialised MATLAB-packaged libraries.
+
+Calling `<package>.initialize()` starts a MATLAB Runtime instance, which takes several
+seconds. This module initialises each package once per process and reuses the handle
+for every subsequent call; the handles are terminated when the process exits.
+
+This module does not import any MATLAB package until `get_package()` is called, so it is
+safe to import in the main process. `get_package()` itself must only be called in a
+separate process (see the note about `LD_LIBRARY_PATH` in the developer guide).
+"""
+
+
+class PackageStats:
+    """
+    Timing counters for a MATLAB-packaged library in the current process.
+    """
+
+    def __init__(self):
+        # Number of times the package was initialised, and the total time taken.
+        self.inits: int = 0
+        self.init_seconds: float = 0
+
+        # Number of times an existing handle was reused instead of initialising the package.
+        self.reuses: int = 0
+
+    def saved_seconds(self) -> float:
+        """
+        Estimates the time saved by reusing the handle, based on the average initialisation time.
+        """
+        if self.inits == 0:
+            return 0
+
+        return self.reuses * self.init_seconds / self.inits
+
+
+_handles: Dict[str, Any] = {}
+_stats: Dict[str, PackageStats] = {}
+
+
+def get_package(name: str) -> Any:
+    """
+    Returns the initialised handle of a MATLAB-packaged library, initialising it
+    if this is the first time it has been requested in the current process.
+
+    :param name: the name of the package, e.g. "bispecWavPython"
+    :return: the handle returned by `<package>.initialize()`
+    """
+    stats = _stats.setdefault(name, PackageStats())
+
+    handle = _handles.get(name)
+    if handle is not None:
+        stats.reuses += 1
+        return handle
+
+    module = importlib.import_module(name)
+
+    start = timer()
+    handle = module.initialize()
+    stats.init_seconds += timer() - start
+    stats.inits += 1
+
+    _handles[name] = handle
+    return handle
+
+
+def terminate_all() -> None:
+    """
+    Terminates every package handle in the current process.
+    """
+    for name, handle in list(_handles.items()):
+        try:
+            handle.terminate()
+        except Exception as e:
+            print(f"Failed to terminate MATLAB package '{name}': {e}")
+
+    _handles.clear()
+
+
+def get_stats() -> Dict[str, PackageStats]:
+    """
+    Returns the timing counters for each package used in the current process.
+    """
+    return dict(_stats)
+
+
+def summary() -> str:
+    """
+    Returns a short description of the time saved by reusing package handles, or an empty
+    string if no packages have been used.
+    """
+    if not _stats:
+        return ""
+
+    inits = sum([s.inits for s in _stats.values()])
+    reuses = sum([s.reuses for s in _stats.values()])
+    init_seconds = sum([s.init_seconds for s in _stats.values()])
+    saved = sum([s.saved_seconds() for s in _stats.values()])
+
+    return (
+        f"MATLAB packages: {inits} initialised in {init_seconds:.1f} seconds, "
+        f"reused {reuses} times (approximately {saved:.1f} seconds saved)."
+    )
+
+
+atexit.register(terminate_all)
@@ -15,6 +15,8 @@
 #  along with this program. If not, see <https://www.gnu.org/licenses/>.
 
 
+from maths.algorithms.matlabwrappers.conversion import to_matlab, multi_to_numpy
+from maths.algorithms.matlabwrappers.packages import get_package
 from maths.params.TFParams import TFParams, _f0, _fmin
 from maths.signals.TimeSeries import TimeSeries
 
@@ -28,12 +30,9 @@ def calculate(time_series: TimeSeries, params: TFParams):
     :return: [2D array] the windowed Fourier transform; [1D array] the frequencies
     """
 
-    import WFT
-    import matlab
+    package = get_package("WFT")
 
-    package = WFT.initialize()
-
-    signal_matlab = matlab.double([time_series.signal.tolist()])
+    signal_matlab = to_matlab(time_series.signal)
 
     """
     The value passed for 'f0' should actually be that of 'fr' in the case
@@ -53,4 +52,4 @@ def calculate(time_series: TimeSeries, params: TFParams):
 
     wft, frequency = package.wft(signal_matlab, params.fs, params_dict, nargout=2)
 
-    return wft, frequency
+    return multi_to_numpy(wft, frequency)
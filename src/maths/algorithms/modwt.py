@@ -0,0 +1,222 @@
+#  PyMODA, a Python implementation of MODA (Multiscale Oscillatory Dynamics Analysis).
+#  Copyright (C) 2019 Lancaster University
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program. If not, see <https://www.gnu.org/licenses/>.
+from typing import Iterator, Tuple
+
+import numpy as np
+from numpy import ndarray
+
+"""
+Maximal overlap discrete wavelet transform (MODWT), as described in Percival and Walden,
+"Wavelet Methods for Time Series Analysis" (2000).
+
+The transform uses periodic boundary conditions, like MATLAB's `modwt`, and is calculated
+in the frequency domain. The filters are applied to the Fourier transform of the signal,
+so each level costs one multiplication and one inverse FFT.
+"""
+
+# Scaling filters of the supported wavelets. "la8" (least asymmetric, length 8) is the
+# same as "sym4", which is the default wavelet of MATLAB's `modwt`.
+_scaling_filters = {
+    "haar": np.array([0.7071067811865476, 0.7071067811865476]),
+    "db4": np.array(
+        [
+            -0.010597401784997278,
+            0.032883011666982945,
+            0.030841381835986965,
+            -0.18703481171888114,
+            -0.02798376941698385,
+            0.6308807679295904,
+            0.7148465705525415,
+            0.23037781330885523,
+        ]
+    ),
+    "la8": np.array(
+        [
+            -0.07576571478927333,
+            -0.02963552764599851,
+            0.49761866763201545,
+            0.8037387518059161,
+            0.29785779560527736,
+            -0.09921954357684722,
+            -0.012603967262037833,
+            0.0322231006040427,
+        ]
+    ),
+}
+_scaling_filters["sym4"] = _scaling_filters["la8"]
+
+
+def max_level(length: int) -> int:
+    """
+    Returns the default number of levels for a signal, which is the same as MATLAB's `modwt`.
+    """
+    return int(np.floor(np.log2(length)))
+
+
+def filter_responses(
+    length: int, level: int, wavelet: str = "la8"
+) -> Tuple[ndarray, ndarray]:
+    """
+    Calculates the frequency responses of the MODWT wavelet and scaling filters at each level,
+    at the frequencies returned by `np.fft.rfft()` for a signal of the given length.
+
+    :param length: the length of the signal
+    :param level: the number of levels
+    :param wavelet: the name of the wavelet
+    :return: [2D array] the wavelet filter at each level; [2D array] the scaling filter at each level
+    """
+    h, g = _filters(wavelet)
+
+    wavelet_filters = np.empty((level, length // 2 + 1), dtype=np.complex128)
+    scaling_filters = np.empty((level, length // 2 + 1), dtype=np.complex128)
+
+    for j in range(level):
+        wavelet_filters[j], scaling_filters[j] = _level_responses(length, j, h, g)
+
+    return wavelet_filters, scaling_filters
+
+
+def iter_levels(
+    signal: ndarray, level: int = None, wavelet: str = "la8"
+) -> Iterator[Tuple[ndarray, ndarray]]:
+    """
+    Calculates the maximal overlap discrete wavelet transform of a signal one level at a time,
+    so the coefficients of every level are never stored at once.
+
+    :param signal: [1D array] the signal
+    :param level: the number of levels; defaults to `max_level()`
+    :param wavelet: the name of the wavelet
+    :return: iterator over the wavelet coefficients at each level, followed by the scaling
+    coefficients at the final level, with their weights in the Fourier transform of the
+    reconstructed signal (see `reconstruction_weights()`)
+    """
+    length = len(signal)
+    level = level or max_level(length)
+    h, g = _filters(wavelet)
+
+    v = np.fft.rfft(signal)
+    scaling = np.ones(length // 2 + 1, dtype=np.complex128)
+
+    for j in range(level):
+        H, G = _level_responses(length, j, h, g)
+        yield np.fft.irfft(H * v, n=length), scaling * H.conj()
+
+        v = G * v
+        scaling = scaling * G.conj()
+
+    yield np.fft.irfft(v, n=length), scaling
+
+
+def modwt(signal: ndarray, level: int = None, wavelet: str = "la8") -> ndarray:
+    """
+    Calculates the maximal overlap discrete wavelet transform of a signal.
+
+    :param signal: [1D array] the signal
+    :param level: the number of levels; defaults to `max_level()`
+    :param wavelet: the name of the wavelet
+    :return: [2D array] the wavelet coefficients at each level, followed by the scaling
+    coefficients at the final level
+    """
+    length = len(signal)
+    level = level or max_level(length)
+    H, G = filter_responses(length, level, wavelet)
+
+    out = np.empty((level + 1, length), dtype=np.float64)
+
+    v = np.fft.rfft(signal)
+    for j in range(level):
+        out[j] = np.fft.irfft(H[j] * v, n=length)
+        v = G[j] * v
+
+    out[level] = np.fft.irfft(v, n=length)
+    return out
+
+
+def imodwt(coefficients: ndarray, wavelet: str = "la8") -> ndarray:
+    """
+    Calculates the inverse maximal overlap discrete wavelet transform.
+
+    :param coefficients: [2D array] the coefficients returned by `modwt()`
+    :param wavelet: the name of the wavelet
+    :return: [1D array] the reconstructed signal
+    """
+    level = coefficients.shape[0] - 1
+    length = coefficients.shape[1]
+
+    weights = reconstruction_weights(length, level, wavelet)
+
+    out = np.zeros(length // 2 + 1, dtype=np.complex128)
+    for j in range(level + 1):
+        out += weights[j] * np.fft.rfft(coefficients[j])
+
+    return np.fft.irfft(out, n=length)
+
+
+def reconstruction_weights(length: int, level: int, wavelet: str = "la8") -> ndarray:
+    """
+    Calculates the weight of each level's coefficients in the Fourier transform of the
+    reconstructed signal. This allows the signal to be reconstructed one level at a time,
+    without storing the coefficients of every level.
+
+    :param length: the length of the signal
+    :param level: the number of levels
+    :param wavelet: the name of the wavelet
+    :return: [2D array] the weights for each level, followed by the weights for the scaling coefficients
+    """
+    H, G = filter_responses(length, level, wavelet)
+
+    weights = np.empty((level + 1, length // 2 + 1), dtype=np.complex128)
+
+    scaling = np.ones(length // 2 + 1, dtype=np.complex128)
+    for j in range(level):
+        weights[j] = scaling * H[j].conj()
+        scaling = scaling * G[j].conj()
+
+    weights[level] = scaling
+    return weights
+
+
+def _filters(wavelet: str) -> Tuple[ndarray, ndarray]:
+    """
+    Returns the MODWT wavelet and scaling filters of a wavelet at the first level.
+    """
+    try:
+        g = _scaling_filters[wavelet.lower()]
+    except KeyError:
+        raise ValueError(
+            f"Wavelet '{wavelet}' is not supported. "
+            f"Supported wavelets: {', '.join(_scaling_filters.keys())}."
+        )
+
+    # Quadrature mirror filter.
+    h = g[::-1] * (-1) ** np.arange(len(g))
+
+    # MODWT filters are rescaled by 1/sqrt(2) at each level.
+    return h / np.sqrt(2), g / np.sqrt(2)
+
+
+def _level_responses(
+    length: int, j: int, h: ndarray, g: ndarray
+) -> Tuple[ndarray, ndarray]:
+    """
+    Calculates the frequency responses of the wavelet and scaling filters at level j+1.
+    """
+    k = np.arange(length // 2 + 1)
+    lags = np.arange(len(g))
+
+    # The filter at level j+1 is the filter at level 1, upsampled by 2**j.
+    phase = np.exp(-2j * np.pi * np.outer(k * 2**j % length, lags) / length)
+    return phase @ h, phase @ g
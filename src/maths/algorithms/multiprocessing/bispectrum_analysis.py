@@ -13,14 +13,16 @@
 #
 #  You should have received a copy of the GNU General Public License
 #  along with this program. If not, see <https://www.gnu.org/licenses/>.
+import functools
 import math
-from typing import Tuple
+from typing import Tuple, List, Callable
 
 from numpy import ndarray
 
 from maths.algorithms.matlab_utils import *
+from maths.algorithms.significance import SurrogateThreshold
+from maths.algorithms.surrogates import surrogate_calc, _IAFFT2
 from maths.algorithms.multiprocessing.time_frequency import avg_ampl_pow
-from maths.num_utils import matlab_to_numpy, multi_matlab_to_numpy
 from maths.params.BAParams import BAParams
 from maths.signals.TimeSeries import TimeSeries
 from processes.mp_utils import process
@@ -28,246 +30,172 @@ from processes.mp_utils import process
 
 @process
 def _biphase(
-    sig1: TimeSeries, sig2: TimeSeries, fs: float, f0: float, fr: float, opt: dict
-) -> Tuple[
-    str,
-    Tuple[float, float],
-    ndarray,
-    ndarray,
-    ndarray,
-    ndarray,
-    ndarray,
-    ndarray,
-    ndarray,
-    ndarray,
-]:
+    sig1: TimeSeries,
+    sig2: TimeSeries,
+    fs: float,
+    f0: float,
+    points: List[Tuple[float, float]],
+    opt: dict,
+) -> Tuple[str, List[Tuple[float, float]], ndarray, ndarray]:
     """
-    Calculates biphase and biamplitude. Used in bispectrum analysis.
+    Calculates biphase and biamplitude at a list of points. Used in bispectrum analysis.
+
+    All points are calculated in the same task. The Python implementation transforms each signal
+    once, and calculates every point from the same transforms. The MATLAB implementation cannot
+    be passed the transforms: `biphaseWavPython` transforms both of its signals in every call,
+    so it transforms them again for each of the 4 combinations at every point.
 
     :param sig1: the first signal
     :param sig2: the second signal
     :param fs:  sampling frequency
     :param f0: resolution parameter
-    :param fr:
-    :param opt: dictionary with params from MATLAB
-    :return:
+    :param points: the frequencies (f1, f2) of each point
+    :param opt: dictionary with the options returned by the bispectrum calculation
+    :return: the name of the signal; the points; [3D array] the biamplitude and [3D array] the biphase,
+    with shape (4, P, L), for b111, b222, b122 and b211 at each point
     """
-    # We need to import a Matlab module such as WT, in order to be able to use "import matlab".
-    import WT
+    name = sig1.name
+    sig1 = sig1.signal
+    sig2 = sig2.signal
+
+    if opt.get("implementation") == "python":
+        from maths.algorithms.bispectrum import biphase_pairs, point_transforms
 
-    # To avoid the "import WT" being removed by the auto-import optimiser, we assign a dummy variable to it.
-    dummy_variable = WT
+        wt1, wt2, freq = point_transforms(sig1, sig2, fs, f0, opt)
+        biamp, biphase = biphase_pairs(wt1, wt2, freq, points)
+        return name, points, biamp, biphase
 
-    import matlab
+    # Don't move the import statement.
     from maths.algorithms.matlabwrappers import biphase_wav_new
+    from maths.algorithms.matlabwrappers.packages import get_package
+    from maths.algorithms.matlabwrappers.conversion import to_matlab
 
-    name = sig1.name
-    sig1list = sig1.signal.tolist()
-    sig2list = sig2.signal.tolist()
+    calculate = biphase_wav_new.calculate
 
-    opt["PadLR1"] = matlab.double(opt["PadLR1"].tolist())
-    opt["PadLR2"] = matlab.double(opt["PadLR2"].tolist())
+    # A MATLAB package must be imported before the options can be converted to MATLAB arrays.
+    get_package("biphaseWavPython")
 
-    twf1 = [complex(i) for i in opt["twf1"]]
-    twf2 = [complex(i) for i in opt["twf2"]]
+    sig1 = to_matlab(sig1)
+    sig2 = to_matlab(sig2)
 
-    twf1r = [i.real for i in twf1]
-    twf2r = [i.real for i in twf2]
-    twf1i = [i.imag for i in twf1]
-    twf2i = [i.imag for i in twf2]
+    # The options are modified, so the caller's dictionary must not be used.
+    opt = dict(opt)
+    opt["PadLR1"] = to_matlab(opt["PadLR1"])
+    opt["PadLR2"] = to_matlab(opt["PadLR2"])
 
-    del opt["twf1"]
-    del opt["twf2"]
+    # MATLAB cannot convert the complex arrays in this dictionary, so the real
+    # and imaginary parts are passed separately.
+    twf1 = np.asarray(opt.pop("twf1"), dtype=np.complex128)
+    twf2 = np.asarray(opt.pop("twf2"), dtype=np.complex128)
 
-    opt["twf1r"] = matlab.double(twf1r)
-    opt["twf2r"] = matlab.double(twf2r)
-    opt["twf1i"] = matlab.double(twf1i)
-    opt["twf2i"] = matlab.double(twf2i)
+    opt["twf1r"] = to_matlab(twf1.real)
+    opt["twf2r"] = to_matlab(twf2.real)
+    opt["twf1i"] = to_matlab(twf1.imag)
+    opt["twf2i"] = to_matlab(twf2.imag)
 
-    biamp1, biphase1 = biphase_wav_new.calculate(sig1list, sig1list, fs, f0, fr, opt)
-    biamp2, biphase2 = biphase_wav_new.calculate(sig2list, sig2list, fs, f0, fr, opt)
-    biamp3, biphase3 = biphase_wav_new.calculate(sig1list, sig2list, fs, f0, fr, opt)
-    biamp4, biphase4 = biphase_wav_new.calculate(sig2list, sig1list, fs, f0, fr, opt)
+    biamp = None
+    biphase = None
 
-    biamp1, biphase1 = multi_matlab_to_numpy(biamp1, biphase1)
-    biamp2, biphase2 = multi_matlab_to_numpy(biamp2, biphase2)
-    biamp3, biphase3 = multi_matlab_to_numpy(biamp3, biphase3)
-    biamp4, biphase4 = multi_matlab_to_numpy(biamp4, biphase4)
+    for p, fr in enumerate(points):
+        for c, (a, b) in enumerate(
+            ((sig1, sig1), (sig2, sig2), (sig1, sig2), (sig2, sig1))
+        ):
+            amp, phase = calculate(a, b, fs, f0, fr, opt)
 
-    l = biamp1.shape[1]
+            if biamp is None:
+                l = amp.shape[1]
+                biamp = np.empty((4, len(points), l))
+                biphase = np.empty(biamp.shape)
 
-    biamp1 = biamp1.reshape(l)
-    biphase1 = biphase1.reshape(l)
+            biamp[c, p] = amp.reshape(l)
+            biphase[c, p] = phase.reshape(l)
 
-    biamp2 = biamp2.reshape(l)
-    biphase2 = biphase2.reshape(l)
+    return name, points, biamp, biphase
 
-    biamp3 = biamp3.reshape(l)
-    biphase3 = biphase3.reshape(l)
 
-    biamp4 = biamp4.reshape(l)
-    biphase4 = biphase4.reshape(l)
+def _bispectrum_params(params: BAParams) -> dict:
+    """
+    Returns the parameters to pass to the MATLAB-packaged bispectrum function.
+    """
+    fs = params.fs
+    out = {
+        "nv": params.nv,
+        "fmin": params.fmin or math.nan,
+        "fmax": params.fmax or fs / 2,
+        "f0": params.f0 or 1,
+    }
 
-    return (
-        name,
-        *fr,
-        biamp1,
-        biphase1,
-        biamp2,
-        biphase2,
-        biamp3,
-        biphase3,
-        biamp4,
-        biphase4,
-    )
+    if params.implementation == "python":
+        out["preprocess"] = params.preprocess
 
+    return out
 
-@process
-def _bispectrum_analysis(
-    sig1: TimeSeries, sig2: TimeSeries, params: BAParams
-) -> Tuple[
-    str,
-    ndarray,
-    ndarray,
-    ndarray,
-    ndarray,
-    ndarray,
-    ndarray,
-    ndarray,
-    ndarray,
-    ndarray,
-    ndarray,
-    ndarray,
-    ndarray,
-    ndarray,
-    ndarray,
-    ndarray,
-    ndarray,
-    ndarray,
-    dict,
-]:
+
+def _bispec_func(implementation: str) -> Callable:
+    """
+    Returns the function which calculates a bispectrum using the MATLAB or the Python implementation.
+    Both functions take the same arguments (see `maths.algorithms.bispectrum.calculate`).
     """
-    Performs bispectrum analysis.
+    if implementation == "python":
+        from maths.algorithms import bispectrum
 
-    :param sig1: the first signal
-    :param sig2: the second signal
-    :param params: the params object containing parameters for the MATLAB-packaged function
-    :return:
+        return bispectrum.calculate
+
+    # Don't move the import statement.
+    from maths.algorithms.matlabwrappers import bispec_wav_new
+
+    return bispec_wav_new.calculate
+
+
+def _unique_signals(sig1: ndarray, sig2: ndarray) -> bool:
     """
-    from maths.algorithms.matlabwrappers import bispec_wav_new, wav_surrogate
+    Returns whether a pair of signals is unique. If a single signal was loaded, it is duplicated
+    to create the pair, and only autobispectral analysis is performed.
+    """
+    return np.sum(np.abs(sig1 - sig2)) != 0
 
-    name = sig1.name
-    sig1 = sig1.signal
-    sig2 = sig2.signal
 
-    sig1list = sig1.tolist()
-    sig2list = sig2.tolist()
+@process
+def _bispectrum(
+    sig1: ndarray,
+    sig2: ndarray,
+    fs: float,
+    params: dict,
+    implementation: str,
+    transforms: bool,
+    nan_wt2: bool = False,
+) -> Tuple:
+    """
+    Calculates one bispectrum of a pair of signals. In bispectrum analysis, each of the
+    bispectra b111, b222, b122 and b211 is calculated in a separate task.
+
+    :param sig1: [1D array] the first signal
+    :param sig2: [1D array] the second signal
+    :param fs: the sampling frequency
+    :param params: the parameters returned by `_bispectrum_params()`
+    :param implementation: the implementation to use, "matlab" or "python"
+    :param transforms: whether to return the wavelet transforms and the options, as well as the bispectrum
+    :param nan_wt2: whether to replace the second wavelet transform with NaN values
+    :return: [2D array] the bispectrum; if `transforms` is True, also the frequencies, the amplitude, power,
+    average amplitude and average power of each wavelet transform, and the options returned by MATLAB
+    """
+    calculate = _bispec_func(implementation)
 
-    # Whether the signals are unique; if a single signal was loaded, it would have been duplicated and
-    # passed to this function, making this boolean False.
-    unique_signals = np.sum(np.abs(sig1 - sig2)) != 0
+    bisp, freq, amp_wt1, amp_wt2, opt = calculate(sig1, sig2, fs, params)
+    if not transforms:
+        return bisp
+
+    if nan_wt2:
+        amp_wt2 = np.empty(amp_wt1.shape)
+        amp_wt2.fill(NAN)
 
-    fs = params.fs
-    preprocess = params.preprocess
-
-    ns = params.surr_count or 0
-    nv = params.nv
-
-    fmax = params.fmax or fs / 2
-    fmin = params.fmin or math.nan
-    f0 = params.f0 or 1
-
-    params = {"nv": nv, "fmin": fmin, "fmax": fmax, "f0": f0}
-
-    # If a unique pair of signals is being analysed, perform autobispectral and crossbispectral analysis.
-    if unique_signals:
-
-        # Note: Previously attempted to calculate bispec_wav_new in a process each. Did not work
-        # due to some strange problem with the Matlab runtime. Processes would
-        # hang at the `package.initialize()` stage for unknown reasons.
-
-        print(
-            "Multiple signals; performing autobispectral and crossbispectral analysis..."
-        )
-        bispxxx, _, _, _, _ = bispec_wav_new.calculate(sig1list, sig1list, fs, params)
-        bispppp, _, _, _, _ = bispec_wav_new.calculate(sig2list, sig2list, fs, params)
-        bispxpp, freq, amp_wt1, amp_wt2, opt = bispec_wav_new.calculate(
-            sig1list, sig2list, fs, params
-        )
-        bisppxx, _, _, _, _ = bispec_wav_new.calculate(sig2list, sig1list, fs, params)
-
-        bisp_size = bispxxx.shape + (ns,)
-        surrxxx = zeros(bisp_size)
-        surrppp = zeros(bisp_size)
-        surrxpp = zeros(bisp_size)
-        surrpxx = zeros(bisp_size)
-
-        for j in range(ns):
-            surr1 = wav_surrogate.calculate(sig1list, "IAAFT2", 1)
-            surr2 = wav_surrogate.calculate(sig2list, "IAAFT2", 1)
-
-            surrxxx[:, :, j] = abs(
-                bispec_wav_new.calculate(surr1, surr1, fs, params)[0]
-            )
-            surrppp[:, :, j] = abs(
-                bispec_wav_new.calculate(surr2, surr2, fs, params)[0]
-            )
-            surrxpp[:, :, j] = abs(
-                bispec_wav_new.calculate(surr1, surr2, fs, params)[0]
-            )
-            surrpxx[:, :, j] = abs(
-                bispec_wav_new.calculate(surr2, surr1, fs, params)[0]
-            )
-
-    # If only one signal is being analysed, instead of a pair, perform autobispectral analysis only.
-    elif not unique_signals:
-        print("1 signal; performing autobispectral analysis only...")
-
-        bispxxx, freq, amp_wt1, amp_wt2, opt = bispec_wav_new.calculate(
-            sig1list, sig1list, fs, params
-        )
-        bispxxx = abs(bispxxx)
-
-        if preprocess:
-            # Create NaN array for WT2.
-            amp_wt2 = np.empty(amp_wt1.shape)
-            amp_wt2.fill(NAN)
-
-        # Create NaN arrays for remaining bispectra.
-        bisp_size = bispxxx.shape
-        surr_size = bisp_size + (ns,)
-        surrxxx = zeros(surr_size)
-
-        # Create empty arrays and make them all NaN.
-        bispppp = np.empty(bisp_size)
-        bispxpp = np.empty(bisp_size)
-        bisppxx = np.empty(bisp_size)
-        surrppp = zeros(surr_size)
-        surrxpp = zeros(surr_size)
-        surrpxx = zeros(surr_size)
-        for a in (bispppp, bispxpp, bisppxx, surrppp, surrxpp, surrpxx):
-            a.fill(NAN)
-
-        for i in range(ns):
-            surr1 = wav_surrogate.calculate(sig1list, "IAAFT2", 1)
-
-            surrxxx[:, :, i] = abs(
-                bispec_wav_new.calculate(surr1, surr1, fs, params)[0]
-            )
-
-    freq = matlab_to_numpy(freq)
     avg_amp_wt1, avg_pow_wt1 = avg_ampl_pow(amp_wt1)
     avg_amp_wt2, avg_pow_wt2 = avg_ampl_pow(amp_wt2)
 
     pow_wt1, pow_wt2 = np.square(amp_wt1), np.square(amp_wt2)
 
-    opt["PadLR1"] = matlab_to_numpy(opt["PadLR1"])
-    opt["PadLR2"] = matlab_to_numpy(opt["PadLR2"])
-    opt["twf1"] = matlab_to_numpy(opt["twf1"])
-    opt["twf2"] = matlab_to_numpy(opt["twf2"])
-
     return (
-        name,
+        bisp,
         freq,
         amp_wt1,
         pow_wt1,
@@ -277,13 +205,79 @@ def _bispectrum_analysis(
         pow_wt2,
         avg_amp_wt2,
         avg_pow_wt2,
-        bispxxx,
-        bispppp,
-        bispxpp,
-        bisppxx,
-        surrxxx,
-        surrppp,
-        surrxpp,
-        surrpxx,
         opt,
     )
+
+
+@process
+def _surrogate_bispectra(
+    sig1: ndarray,
+    sig2: ndarray,
+    fs: float,
+    params: dict,
+    implementation: str,
+    unique: bool,
+) -> Tuple[ndarray, ...]:
+    """
+    Calculates the bispectra of one surrogate of each signal. Each surrogate is a separate task,
+    so that the surrogates are shared between the workers and progress is reported for each one.
+
+    :param sig1: [1D array] the first signal
+    :param sig2: [1D array] the second signal
+    :param fs: the sampling frequency
+    :param params: the parameters returned by `_bispectrum_params()`
+    :param implementation: the implementation to use, "matlab" or "python"
+    :param unique: whether the signals are unique; if not, only b111 is calculated
+    :return: the bispectra b111, b222, b122 and b211 of the surrogates, or only b111
+    """
+    calculate = _bispec_func(implementation)
+    if implementation == "python":
+        # The wavelet transforms of a surrogate are never used again, so they should not
+        # replace the transforms of the signals in the cache.
+        calculate = functools.partial(calculate, cache=False)
+
+    surrogates1, _ = surrogate_calc(sig1, 1, _IAFFT2, False, fs)
+    surr1 = surrogates1[0]
+
+    if not unique:
+        return (calculate(surr1, surr1, fs, params)[0],)
+
+    surrogates2, _ = surrogate_calc(sig2, 1, _IAFFT2, False, fs)
+    surr2 = surrogates2[0]
+
+    return tuple(
+        [
+            calculate(a, b, fs, params)[0]
+            for a, b in ((surr1, surr1), (surr2, surr2), (surr1, surr2), (surr2, surr1))
+        ]
+    )
+
+
+def _bispectrum_output(
+    name: str,
+    bispectra: List[ndarray],
+    transforms: Tuple,
+    thresholds: List[ndarray],
+) -> Tuple:
+    """
+    Combines the results of bispectrum analysis for a pair of signals. If only b111 was calculated,
+    the other bispectra and their significance thresholds are filled with NaN values.
+
+    :param name: the name of the first signal
+    :param bispectra: the bispectra b111, b222, b122 and b211, or only b111
+    :param transforms: the wavelet transforms and options returned by `_bispectrum()`
+    :param thresholds: the significance thresholds of each bispectrum
+    :return: tuple containing the data for `BAOutputData`, and the options
+    """
+    bisp_size = bispectra[0].shape
+
+    def nan_array() -> ndarray:
+        arr = np.empty(bisp_size)
+        arr.fill(NAN)
+        return arr
+
+    bispectra = list(bispectra) + [nan_array() for _ in range(4 - len(bispectra))]
+    thresholds = list(thresholds) + [nan_array() for _ in range(4 - len(thresholds))]
+
+    freq, *wt, opt = transforms
+    return (name, freq, *wt, *bispectra, *thresholds, opt)
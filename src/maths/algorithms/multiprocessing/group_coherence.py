@@ -0,0 +1,82 @@
+#  PyMODA, a Python implementation of MODA (Multiscale Oscillatory Dynamics Analysis).
+#  Copyright (C) 2019 Lancaster University
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program. If not, see <https://www.gnu.org/licenses/>.
+from typing import Optional, Tuple, Union
+
+import numpy as np
+import pymodalib
+from numpy import ndarray
+
+from processes.SharedArray import MappedArray, as_array
+from processes.mp_utils import process
+
+"""
+Group coherence in a worker process.
+
+The signals of a group can be memory-mapped from a file which is larger than the memory, so they
+are sent to the worker as `MappedArray` references instead of being pickled. Each group is only
+copied into memory when the calculation starts.
+"""
+
+
+@process
+def _group_coherence(
+    sig1a: Union[ndarray, MappedArray],
+    sig1b: Union[ndarray, MappedArray],
+    fs: float,
+    percentile: Optional[float],
+    *args,
+    **kwargs
+) -> Tuple:
+    return pymodalib.group_coherence(
+        _load(sig1a),
+        _load(sig1b),
+        fs,
+        percentile,
+        True,
+        *args,
+        **kwargs,
+    )
+
+
+@process
+def _dual_group_coherence(
+    sig1a: Union[ndarray, MappedArray],
+    sig1b: Union[ndarray, MappedArray],
+    sig2a: Union[ndarray, MappedArray],
+    sig2b: Union[ndarray, MappedArray],
+    fs: float,
+    percentile: Optional[float],
+    *args,
+    **kwargs
+) -> Tuple:
+    return pymodalib.dual_group_coherence(
+        _load(sig1a),
+        _load(sig1b),
+        _load(sig2a),
+        _load(sig2b),
+        fs,
+        percentile,
+        *args,
+        **kwargs,
+    )
+
+
+def _load(signals: Union[ndarray, MappedArray]) -> ndarray:
+    """
+    Opens the signals of a group if they are memory-mapped, and copies them into memory if they
+    are not contiguous, e.g. a group which was transposed when it was loaded.
+    """
+    return np.ascontiguousarray(as_array(signals))
@@ -13,81 +13,92 @@
 #
 #  You should have received a copy of the GNU General Public License
 #  along with this program. If not, see <https://www.gnu.org/licenses/>.
-from typing import Tuple
+from typing import Tuple, Union
 
 import numpy as np
-import pymodalib
-from multiprocess.pool import Pool
 from numpy import ndarray
 from pymodalib.algorithms.coherence import wphcoh
 
+from maths.algorithms.multiprocessing.time_frequency import _wt_func
 from maths.algorithms.surrogates import surrogate_calc
+from maths.algorithms.wavelet_bank import get_bank
 from maths.algorithms.wpc import wpc
 from maths.params.PCParams import PCParams
-from maths.signals.TimeSeries import TimeSeries
+from processes.SharedArray import SharedArray, as_array
 from processes.mp_utils import process
 
 
 @process
-def _wt_surrogate_calc(
-    wt_signal: ndarray, surrogate: ndarray, params: PCParams
+def _surrogate_coherence(
+    wt_signal: Union[SharedArray, ndarray],
+    signal: Union[SharedArray, ndarray],
+    count: int,
+    seed: np.random.SeedSequence,
+    params: PCParams,
 ) -> ndarray:
     """
-    Calculates the phase coherence between a signal and a surrogate.
+    Calculates a batch of surrogates of a signal, and the phase coherence between the signal
+    and each surrogate.
 
-    :param wt_signal: the wavelet transform of the signal
-    :param surrogate: the values of the surrogate (not the wavelet transform)
+    With the Python implementation, the wavelet kernels are calculated once and the transforms
+    of the surrogates are reduced to phase coherence one frequency at a time (see `WaveletBank`).
+
+    :param wt_signal: the wavelet transform of the signal, usually shared with the other batches
+    :param signal: [1D array] the values of the signal, usually shared with the other batches
+    :param count: the number of surrogates in the batch
+    :param seed: the seed of the random number generator used to calculate the surrogates
     :param params: the params object with parameters to pass to the wavelet transform function
-    :return: [1D array] the wavelet phase coherence between the signal and the surrogate
+    :return: [1D array] the sum of the wavelet phase coherence between the signal and each surrogate
     """
-    wt_surrogate, _ = pymodalib.wavelet_transform(
-        surrogate, params.fs, **params.get(), Display="off"
+    wt_signal = as_array(wt_signal)
+
+    surrogates, _ = surrogate_calc(
+        as_array(signal),
+        count,
+        params.surr_method,
+        params.surr_preproc,
+        params.fs,
+        seed=seed,
     )
 
-    surr_avg, _ = wphcoh(wt_signal, wt_surrogate)
-    return surr_avg
+    if (params.get_item("implementation") or "python") == "python":
+        bank = get_bank(params, surrogates.shape[1])
+        return bank.phase_coherence_sum(wt_signal, surrogates)
+
+    total = 0
+    for surrogate in surrogates:
+        wt_surrogate, _, _ = _wt_func(surrogate, params, False)
+
+        surr_avg, _ = wphcoh(wt_signal, wt_surrogate)
+        total = total + surr_avg
+
+    return total
 
 
 @process
 def _phase_coherence(
-    signal_pair: Tuple[TimeSeries, TimeSeries], params: PCParams
-) -> Tuple[Tuple[TimeSeries, TimeSeries], ndarray, ndarray, ndarray, ndarray]:
+    wt1: Union[SharedArray, ndarray],
+    wt2: Union[SharedArray, ndarray],
+    freq: ndarray,
+    params: PCParams,
+) -> Tuple[ndarray, ndarray, ndarray]:
     """
-    Function which uses `wpc` to calculate phase coherence for a single pair of signals. The signals must have
-    their wavelet transforms attached in their `output_data` member variable.
+    Function which uses `wpc` to calculate phase coherence for a single pair of signals. The phase
+    coherence of the surrogates is calculated separately, in batches, by `_surrogate_coherence`.
 
-    :param signal_pair: tuple containing 2 signals
+    :param wt1: the wavelet transform of the first signal
+    :param wt2: the wavelet transform of the second signal
+    :param freq: [1D array] the frequencies of the wavelet transforms
     :param params: the params object with parameters for the function
     :return:
-    [tuple] the pair of signals;
     [2D array] the time-localised phase coherence;
     [1D array] phase coherence;
-    [1D array] phase difference;
-    [1D array] time-localised phase coherence of surrogates
+    [1D array] phase difference
     """
-    s1, s2 = signal_pair
-
-    wt1 = s1.output_data.values
-    wt2 = s2.output_data.values
-
-    freq = s1.output_data.freq
-    fs = s1.frequency
-
-    # Calculate surrogates.
-    surr_count = params.surr_count
-    surr_method = params.surr_method
-    surr_preproc = params.surr_preproc
-    surrogates, _ = surrogate_calc(s1, surr_count, surr_method, surr_preproc, fs)
-
-    # Calculate surrogates.
-    pool = Pool()
-    args = [(wt1, surrogates[i], params) for i in range(surr_count)]
-    tpc_surr = pool.starmap(_wt_surrogate_calc, args)
-
-    if len(tpc_surr) > 0:
-        tpc_surr = np.mean(tpc_surr, axis=0)
+    wt1 = as_array(wt1)
+    wt2 = as_array(wt2)
 
     # Calculate phase coherence.
-    tpc, pc, pdiff = wpc(wt1, wt2, freq, fs)
+    tpc, pc, pdiff = wpc(wt1, wt2, freq, params.fs)
 
-    return signal_pair, tpc, pc, pdiff, tpc_surr
+    return tpc, pc, pdiff
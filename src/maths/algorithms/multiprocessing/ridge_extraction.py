@@ -15,42 +15,36 @@
 #  along with this program. If not, see <https://www.gnu.org/licenses/>.
 from typing import Tuple
 
-import numpy as np
 from numpy import ndarray
 from pymodalib.utils.decorators import matlabwrapper
 
-from maths.num_utils import matlab_to_numpy
+from maths.algorithms.matlabwrappers.conversion import to_matlab, to_numpy
+from maths.algorithms.matlabwrappers.packages import get_package
+from maths.algorithms.multiprocessing.time_frequency import avg_ampl_pow
 from maths.params.REParams import REParams
 from maths.signals.TimeSeries import TimeSeries
 from processes.mp_utils import process
 
 
 @matlabwrapper(module="ridge_extraction")
-def _ridge_extraction(
-    time_series: TimeSeries, params: REParams
-) -> Tuple[
+def _ridge_extraction(time_series: TimeSeries, params: REParams) -> Tuple[
     str,
     ndarray,
     ndarray,
     ndarray,
     ndarray,
     ndarray,
-    ndarray,
-    ndarray,
     Tuple[float, float],
     ndarray,
     ndarray,
     ndarray,
 ]:
-    import ridge_extraction
-    import matlab
-
-    package = ridge_extraction.initialize()
+    package = get_package("ridge_extraction")
 
     d = params.get()
     result = package.ridge_extraction(
         1,
-        matlab.double(time_series.signal.tolist()),
+        to_matlab(time_series.signal),
         params.fs,
         d["fmin"],
         d["fmax"],
@@ -62,43 +56,28 @@ def _ridge_extraction(
 
     transform, freq, iamp, iphi, ifreq, filtered_signal = result
 
-    transform = matlab_to_numpy(transform)
-    freq = matlab_to_numpy(freq)
+    transform = to_numpy(transform)
+    freq = to_numpy(freq)
 
-    iamp = matlab_to_numpy(iamp)
+    iamp = to_numpy(iamp)
     iamp = iamp.reshape(iamp.shape[1])
 
-    iphi = matlab_to_numpy(iphi)
+    iphi = to_numpy(iphi)
     iphi = iphi.reshape(iphi.shape[1])
 
-    ifreq = matlab_to_numpy(ifreq)
+    ifreq = to_numpy(ifreq)
     ifreq = ifreq.reshape(ifreq.shape[1])
 
-    filtered_signal = matlab_to_numpy(filtered_signal)
+    filtered_signal = to_numpy(filtered_signal)
     filtered_signal = filtered_signal.reshape(filtered_signal.shape[1])
 
-    amplitude = np.abs(transform)
-    powers = np.square(amplitude)
-
-    length = len(amplitude)
-
-    avg_ampl = np.empty(length, dtype=np.float64)
-    avg_pow = np.empty(length, dtype=np.float64)
-
-    for i in range(length):
-        arr = amplitude[i]
-        row = arr[np.isfinite(arr)]
-
-        avg_ampl[i] = np.mean(row)
-        avg_pow[i] = np.mean(np.square(row))
+    avg_ampl, avg_pow = avg_ampl_pow(transform)
 
     return (
         time_series.name,
         time_series.times,
         freq,
         transform,
-        amplitude,
-        powers,
         avg_ampl,
         avg_pow,
         (d["fmin"], d["fmax"]),
@@ -14,25 +14,29 @@
 #  You should have received a copy of the GNU General Public License
 #  along with this program. If not, see <https://www.gnu.org/licenses/>.
 
+import math
 from typing import Tuple, Union, Dict
 
 import numpy as np
 import pymodalib
 from numpy import ndarray
-from pymodalib.utils.matlab import multi_matlab_to_numpy
 
 from maths.params.TFParams import TFParams, _wft
 from maths.signals.TimeSeries import TimeSeries
 from processes.mp_utils import process
 from utils import args
 
+# Width of the margin at the edges of a cropped transform which is set to NaN, relative to the
+# margin at the edges of the original transform.
+_crop_margin = 1.5
+
 
 @process
 def _time_frequency(
     time_series: TimeSeries, params: TFParams, return_opt: bool = False
 ) -> Union[
-    Tuple[str, ndarray, ndarray, ndarray, ndarray, ndarray, ndarray, ndarray],
-    Tuple[str, ndarray, ndarray, ndarray, ndarray, ndarray, ndarray, ndarray, Dict],
+    Tuple[str, ndarray, ndarray, ndarray, ndarray, ndarray],
+    Tuple[str, ndarray, ndarray, ndarray, ndarray, ndarray, Dict],
 ]:
     """
     Performs a wavelet transform or windowed Fourier transform using the MATLAB-packaged libraries.
@@ -42,9 +46,9 @@ def _time_frequency(
     :param return_opt: whether to return the options from the transform function
 
     :return: the name of the input signal; the times associated with the input signal;
-    the frequencies produced by the transform; the values of the transform itself; the amplitudes
-    of the values of the transform; the powers of the values of the transform; the average amplitudes
-    of the transform; and the average powers of the transform.
+    the frequencies produced by the transform; the values of the transform itself; the average amplitudes
+    of the transform; and the average powers of the transform. The amplitudes and powers are not returned,
+    since they can be calculated from the transform when needed (see `TFOutputData`).
     """
     wavelet = not params.transform == _wft
 
@@ -57,17 +61,13 @@ def _time_frequency(
         transform, freq = _wft_func(time_series, params)
         opt = {}
 
-    amplitude = np.abs(transform)
-    power = np.square(amplitude)
-    avg_ampl, avg_pow = avg_ampl_pow(amplitude)
+    avg_ampl, avg_pow = avg_ampl_pow(transform)
 
     out = (
         time_series.name,
         time_series.times,
         freq,
         transform,
-        amplitude,
-        power,
         avg_ampl,
         avg_pow,
     )
@@ -78,6 +78,42 @@ def _time_frequency(
     return out
 
 
+def _crop_transform(result: Tuple, time_series: TimeSeries) -> Tuple:
+    """
+    Crops the output of `_time_frequency` for the original data of a signal to the signal's x-limits,
+    instead of transforming the cropped signal. The transform must have been calculated with the
+    edges cut (see `TFParams.allows_crop()`).
+
+    The values near the edges of the cropped transform are set to NaN, with 1.5 times as many values
+    at each frequency as at the edges of the original transform. The values just inside the cone of
+    influence of a transform are still slightly affected by the edges, so the cone of influence is
+    slightly wider than if the cropped signal had been transformed.
+
+    :param result: the output of `_time_frequency` for the original data
+    :param time_series: the signal, with x-limits set
+    :return: the output of `_time_frequency` for the cropped signal
+    """
+    name, _, freq, transform, _, _, *opt = result
+
+    cropped = np.array(transform[:, time_series.crop])
+    length = cropped.shape[1]
+
+    for row, original in zip(cropped, transform):
+        finite = np.flatnonzero(np.isfinite(original))
+        if len(finite) == 0:
+            row[:] = np.nan
+            continue
+
+        left = math.ceil(finite[0] * _crop_margin)
+        right = math.ceil((len(original) - 1 - finite[-1]) * _crop_margin)
+
+        row[:left] = np.nan
+        row[max(length - right, 0) :] = np.nan
+
+    avg_ampl, avg_pow = avg_ampl_pow(cropped)
+    return (name, time_series.times, freq, cropped, avg_ampl, avg_pow, *opt)
+
+
 def _wt_func(signal: ndarray, params: TFParams, return_opt: bool):
     impl = params.get_item("implementation") or "python"
 
@@ -109,21 +145,88 @@ def _wft_func(signal, params):
     # Don't move the import statement.
     from maths.algorithms.matlabwrappers import wft
 
-    transform, freq = wft.calculate(signal, params)
-    return multi_matlab_to_numpy(transform, freq)
+    return wft.calculate(signal, params)
+
+
+def avg_ampl_pow(values: ndarray, chunk_size: int = 4096) -> Tuple[ndarray, ndarray]:
+    """
+    Calculates the average amplitude and average power at each frequency of a transform,
+    ignoring NaN and infinite values. Frequencies without any finite values have an average of NaN.
+
+    The columns are processed in chunks, which keeps the temporary arrays small enough to
+    stay in the CPU cache, and skips masking for chunks without NaN values (usually all
+    except the chunks at the cut edges).
+
+    :param values: [2D array] the amplitudes of the transform, or the complex values of the transform
+    :param chunk_size: the number of columns to process at once, or None to process the whole array at once
+    :return: [1D array] the average amplitudes; [1D array] the average powers
+    """
+    rows, cols = values.shape
+    step = chunk_size or max(cols, 1)
+
+    ampl_sum = np.zeros(rows, dtype=np.float64)
+    pow_sum = np.zeros(rows, dtype=np.float64)
+    count = np.zeros(rows, dtype=np.int64)
+
+    for start in range(0, cols, step):
+        chunk = values[:, start : start + step]
+        if np.iscomplexobj(chunk):
+            chunk = np.abs(chunk)
+
+        finite = np.isfinite(chunk)
+        if finite.all():
+            count += chunk.shape[1]
+        else:
+            count += np.count_nonzero(finite, axis=1)
+            chunk = np.where(finite, chunk, 0)
+
+        ampl_sum += np.sum(chunk, axis=1, dtype=np.float64)
+        pow_sum += np.einsum("ij,ij->i", chunk, chunk, dtype=np.float64)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return ampl_sum / count, pow_sum / count
+
+
+def benchmark(rows: int = 200, cols: int = 1_000_000) -> None:
+    """
+    Compares `avg_ampl_pow()` with the previous implementation, which looped over each row.
+    Run with `python -m maths.algorithms.multiprocessing.time_frequency` from the "src" folder.
+
+    :param rows: the number of frequencies in the test data
+    :param cols: the number of times in the test data
+    """
+    from timeit import default_timer as timer
+
+    amplitude = np.abs(np.random.randn(rows, cols))
+    amplitude[:, : cols // 20] = np.nan  # Simulate cut edges.
+
+    def loop(arr):
+        length = len(arr)
+        avg_ampl = np.empty(length, dtype=np.float64)
+        avg_pow = np.empty(length, dtype=np.float64)
 
+        for i in range(length):
+            row = arr[i][np.isfinite(arr[i])]
+            avg_ampl[i] = np.mean(row)
+            avg_pow[i] = np.mean(np.square(row))
 
-def avg_ampl_pow(amplitude) -> Tuple[ndarray, ndarray]:
-    length = len(amplitude)
+        return avg_ampl, avg_pow
 
-    avg_ampl = np.empty(length, dtype=np.float64)
-    avg_pow = np.empty(length, dtype=np.float64)
+    expected = None
+    for name, func in (
+        ("loop over rows", loop),
+        ("vectorised, whole array", lambda a: avg_ampl_pow(a, None)),
+        ("vectorised, chunked", avg_ampl_pow),
+    ):
+        start = timer()
+        result = func(amplitude)
+        print(f"{name}: {timer() - start:.2f} seconds.")
 
-    for i in range(length):
-        arr = amplitude[i]
-        row = arr[np.isfinite(arr)]
+        if expected is None:
+            expected = result
+        else:
+            assert all([np.allclose(r, e) for r, e in zip(result, expected)])
 
-        avg_ampl[i] = np.mean(row)
-        avg_pow[i] = np.mean(np.square(row))
 
-    return avg_ampl, avg_pow
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,119 @@
+#  PyMODA, a Python implementation of MODA (Multiscale Oscillatory Dynamics Analysis).
+#  Copyright (C) 2019 Lancaster University
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program. If not, see <https://www.gnu.org/licenses/>.
+import math
+from typing import Tuple
+
+import numpy as np
+from numpy import ndarray
+
+"""
+Surrogate significance testing without storing every surrogate.
+
+The significance threshold at each point is the K-th largest value of the surrogates, where
+K = floor((N + 1) * alpha) for N surrogates. Only the K largest values at each point are
+needed, so `SurrogateThreshold` keeps those (and a running mean and variance) as the
+surrogates are calculated, instead of a stack of N arrays.
+"""
+
+
+def threshold_rank(surr_count: int, alpha: float) -> int:
+    """
+    Returns the rank K of the surrogate value which is used as the significance threshold,
+    where K = 1 is the largest value.
+
+    :param surr_count: the number of surrogates
+    :param alpha: the significance level
+    """
+    K = int(math.floor((surr_count + 1) * alpha))
+    return min(max(K, 1), max(surr_count, 1))
+
+
+class SurrogateThreshold:
+    """
+    Accumulates the surrogates of a quantity one at a time, keeping the K largest
+    values at each point.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], surr_count: int, alpha: float):
+        """
+        :param shape: the shape of the quantity calculated for each surrogate
+        :param surr_count: the number of surrogates which will be added
+        :param alpha: the significance level
+        """
+        self.rank = threshold_rank(surr_count, alpha)
+        self.count = 0
+
+        # The largest values at each point, in descending order.
+        self._largest = np.full(shape + (self.rank,), -np.inf)
+
+        # Points where any surrogate was NaN, e.g. outside the valid frequency range.
+        self._nan = np.zeros(shape, dtype=bool)
+
+        # Running mean and sum of squared differences (Welford's algorithm).
+        self._mean = np.zeros(shape)
+        self._m2 = np.zeros(shape)
+
+    def add(self, values: ndarray) -> None:
+        """
+        Adds the values calculated for one surrogate.
+
+        :param values: the values, with the same shape as the accumulator
+        """
+        values = np.asarray(values, dtype=np.float64)
+        self.count += 1
+
+        nan = np.isnan(values)
+        self._nan |= nan
+
+        delta = values - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (values - self._mean)
+
+        # Only points where the value is larger than the current K-th largest value change.
+        largest = self._largest
+        replace = values > largest[..., -1]
+
+        if self.rank == 1:
+            largest[replace, 0] = values[replace]
+            return
+
+        rows = largest[replace]
+        rows[:, -1] = values[replace]
+        largest[replace] = -np.sort(-rows, axis=1)
+
+    def threshold(self) -> ndarray:
+        """
+        Returns the significance threshold at each point: the K-th largest surrogate value.
+        Points where a surrogate was NaN, or where fewer than K surrogates were added, are NaN.
+        """
+        out = self._largest[..., -1].copy()
+        out[self._nan | np.isinf(out)] = np.nan
+        return out
+
+    def mean(self) -> ndarray:
+        """
+        Returns the mean of the surrogates at each point.
+        """
+        return self._mean.copy()
+
+    def std(self) -> ndarray:
+        """
+        Returns the sample standard deviation of the surrogates at each point.
+        """
+        if self.count < 2:
+            return np.full(self._m2.shape, np.nan)
+
+        return np.sqrt(self._m2 / (self.count - 1))
@@ -13,23 +13,21 @@
 #
 #  You should have received a copy of the GNU General Public License
 #  along with this program. If not, see <https://www.gnu.org/licenses/>.
-import random
 from typing import Union, Tuple
 
 import numpy as np
 from numpy import ndarray
-from numpy.random import permutation as randperm
 
+from maths.algorithms import modwt
 from maths.signals.TimeSeries import TimeSeries
 
 """
 Translation of `surrcalc` from MODA.
 
 STATUS: 
-- RP, FT, AAFT, IAFFT1, tshift and CPP surrogates are implemented.
-- IAFFT1 needs to be fixed (it crashes). 
-- IAAFT is not implemented yet.
-- WIAAFT requires a function "modwt" which is not implemented in scipy. Not implemented yet.
+- RP, FT, AAFT, IAAFT1, IAAFT2, tshift and CPP surrogates are implemented.
+- All surrogates are calculated at once, without looping in Python over each surrogate.
+- WIAAFT uses the maximal overlap discrete wavelet transform from `modwt.py`.
 - Results may need to be checked for surrogates. 
 """
 
@@ -44,7 +42,16 @@ _CPP = "CPP"
 
 
 def surrogate_calc(
-    time_series: Union[TimeSeries, ndarray], N: int, method: str, pp: bool, fs: float
+    time_series: Union[TimeSeries, ndarray],
+    N: int,
+    method: str,
+    pp: bool,
+    fs: float,
+    dtype=np.float64,
+    seed: Union[int, np.random.Generator, None] = None,
+    maxit: int = 1000,
+    tolerance: float = 0,
+    chunk_size: int = None,
 ) -> Tuple[ndarray, "Params"]:
     """
     Calculates surrogates.
@@ -54,13 +61,21 @@ def surrogate_calc(
     :param method: the required surrogate type
     :param pp: whether to perform preprocessing
     :param fs: the sampling frequency
-    :return: the surrogate signal(s) and params
+    :param dtype: the data type of the surrogates, e.g. `np.float32` to halve the memory used
+    :param seed: the seed, or random number generator, to use; the same seed gives the same surrogates
+    :param maxit: the maximum number of iterations for IAAFT surrogates
+    :param tolerance: the fraction of samples which may change rank between iterations when an IAAFT
+    surrogate is considered to have converged; 0 requires the ranks to be unchanged, as in MODA
+    :param chunk_size: for WIAAFT surrogates, the number of surrogates to calculate at once; this
+    limits the memory used for long signals
+    :return: [2D array] the surrogates, with one surrogate in each row; and params
     """
     if isinstance(time_series, TimeSeries):
         sig = time_series.signal
     else:
         sig = time_series
 
+    rng = np.random.default_rng(seed)
     surr = np.empty((N, len(sig)), dtype=np.float64)
 
     params = Params()
@@ -81,169 +96,57 @@ def surrogate_calc(
         params.preprocessing = False
 
     L = len(sig)
-    L2 = np.int(np.ceil(L / 2))
+    L2 = int(np.ceil(L / 2))
 
     params.time = time
 
     # Random permutation surrogates.
     if method == _RP:
-        for k in range(N):
-            surr[k, :] = sig[randperm(L)]
+        surr = sig[_random_permutations(rng, N, L)]
 
     # Fourier transform surrogates.
     elif method == _FT:
-        b = 2 * np.pi
-
         # Note: removed 'eta' parameter from function.
-        eta = b * np.random.rand(N, L2 - 1)
-
-        ftsig = np.fft.fft(sig, axis=0)
-        ftrp = np.zeros((N, len(ftsig)), dtype=np.complex64)
-        ftrp[:, 0] = ftsig[0]
-
-        F = ftsig[1:L2]
-        F = np.tile(F, (N, 1))
-
-        ftrp[:, 1:L2] = F * np.exp(1j * eta)
-        ftrp[:, 1 + L - L2 : L] = np.conj(np.fliplr(ftrp[:, 1:L2]))
-
-        surr = np.fft.ifft(ftrp, axis=0)
-        surr = np.real(surr)
+        eta = 2 * np.pi * rng.random((N, L2 - 1))
 
+        surr = _randomise_phases(np.fft.rfft(sig), eta, L)
         params.rphases = eta
 
     # Amplitude-adjusted Fourier transform surrogates.
     elif method == _AAFT:
-        b = 2 * np.pi
-        eta = b * np.random.rand(N, L2 - 1)
-
-        val = np.sort(sig)
-        ind = np.argsort(sig)
-        rankind = np.empty(ind.shape, dtype=np.int)
-        rankind[ind] = np.arange(0, L)
-
-        gn = np.sort(np.random.randn(N, len(sig)), 1)
-        for j in range(N):
-            gn[j, :] = gn[j, rankind]
-
-        ftgn = np.fft.fft(gn, axis=0)
-        F = ftgn[:, 1:L2]
-
-        surr = np.zeros((N, len(sig)), dtype=np.complex)
-        surr[:, 0] = gn[:, 0]
-        surr[:, 1:L2] = np.multiply(F, np.exp(np.complex(0, 1) * eta))
-        surr[:, 1 + L - L2 : L] = np.conj(np.fliplr(surr[:, 1:L2]))
-        surr = np.fft.ifft(surr, axis=0)
-
-        ind2 = np.argsort(surr, axis=1)
-        rrank = np.zeros((1, L), dtype=np.int)
-        for k in range(N):
-            rrank[:, ind2[k, :]] = np.arange(0, L)
-            surr[k, :] = val[rrank]
-
-        surr = np.real(surr)
-
-    # Iterated amplitude-adjusted Fourier transform with exact distribution.
-    elif method == _IAFFT1:
-        maxit = 1000
-        val = np.sort(sig)
-        ind = np.argsort(sig)
-
-        rankind = np.empty(ind.shape, dtype=np.int)
-        rankind[ind] = np.arange(0, L)
-
-        ftsig = np.fft.fft(sig, axis=0)
-        F = np.tile(ftsig, (N, 1))
-        surr = np.zeros((N, L))
-
-        for j in range(N):
-            surr[j, :] = sig[randperm(L)]
-
-        it = 1
-        irank = rankind.copy()
-        irank = np.tile(irank, (N, 1))
-        irank2 = np.zeros((1, L))
-        oldrank = np.zeros((N, L))
-        iind = np.zeros((N, L))
-        iterf = iind.copy()
-
-        while np.max(np.abs(oldrank - irank), axis=1) != 0 and it < maxit:
-            go = np.max(np.abs(oldrank - irank), axis=1)
-            go_c = go.conj().T
-
-            inc = go_c[go_c != 0].nonzero()
-
-            oldrank = irank.copy()
-            iterf[inc, :] = np.real(np.fft.ifft(np.abs(F[inc, :]), axis=0)) * np.exp(
-                1j * np.angle(np.fft.fft(surr[inc, :], axis=1))
-            )
-
-            iind[inc, :] = np.sort(iterf[inc, :], axis=1)
-            for k in range(inc):
-                irank2[iind[k, :]] = np.arange(0, L)
-                irank[k, :] = irank2.copy()
-                surr[k, :] = val[irank2]
-
-            it += 1
-
-    # Iterated amplitude-adjusted Fourier transform with exact spectrum.
-    elif method == _IAFFT2:  # Note: needs testing.
-        maxit = 1000
+        eta = 2 * np.pi * rng.random((N, L2 - 1))
 
         val = np.sort(sig)
         ind = np.argsort(sig)
-
-        rankind = np.empty(L, dtype=np.int64)
+        rankind = np.empty(ind.shape, dtype=np.int64)
         rankind[ind] = np.arange(0, L)
 
-        ftsig = np.fft.fft(sig, axis=0)
-        F = ftsig[np.ones((1, N)), :]
-        surr = np.zeros((N, L))
-
-        for j in range(N):
-            surr[j, :] = sig[randperm(L)]
-
-        it = 1
-        irank = rankind.copy()
-        irank = irank[np.ones((1, N)), :]
-        irank2 = np.zeros((N, L))
-        oldrank = np.zeros((N, L))
-        iind = np.zeros((N, L))
-        iterf = np.zeros((N, L))
-
-        while np.max(np.abs(oldrank - irank)) != 0 and it < maxit:
-            go = np.max(np.abs(oldrank - irank))
-            inc = (go.T != 0).nonzero()[0]
-
-            oldrank = irank.copy()
-            iterf[inc, :] = np.real(
-                np.fft.ifft(
-                    np.abs(F[inc, :])
-                    * np.exp(1j * np.angle(np.fft.fft(surr[inc, :], axis=1))),
-                    axis=1,
-                )
-            )
+        # Gaussian noise with the same rank order as the signal.
+        gn = np.sort(rng.standard_normal((N, L)), axis=1)[:, rankind]
 
-            iind[inc, :] = np.argsort(iterf[inc, :], axis=1)
+        ftgn = _randomise_phases(np.fft.rfft(gn, axis=1), eta, L)
 
-            k = inc
-            irank2[iind[k, :]] = np.arange(0, L)
-            irank[k, :] = irank2.copy()
-            surr[k, :] = val[irank2]
+        # Give the original values the rank order of the phase-randomised noise.
+        surr = np.empty((N, L), dtype=np.float64)
+        np.put_along_axis(
+            surr, np.argsort(ftgn, axis=1), np.broadcast_to(val, (N, L)), axis=1
+        )
 
-            it += 1
-
-        surr = iterf
+    # Iterated amplitude-adjusted Fourier transform with exact distribution (IAAFT1)
+    # or exact spectrum (IAAFT2).
+    elif method in (_IAFFT1, _IAFFT2):
+        surr, params.iterations = iaaft(
+            sig, N, rng, maxit, tolerance, exact_spectrum=method == _IAFFT2
+        )
 
     # Wavelet iterated amplitude adjusted Fourier transform surrogates
     elif method == _WIAFFT:
-        pass
+        surr, params.iterations = wiaaft(sig, N, rng, maxit, tolerance, chunk_size)
 
     # Time-shifted surrogates.
     elif method == _tshift:
-        for sn in range(N):
-            startp = random.randint(1, L - 1)
-            surr[sn, :] = np.hstack([sig[startp:L], sig[:startp]])
+        startp = rng.integers(1, L, size=N)
+        surr = sig[(np.arange(L) + startp[:, None]) % L]
 
     # Cycle phase permutation surrogates.
     elif method == _CPP:
@@ -254,25 +157,34 @@ def surrogate_calc(
 
         NC = len(dcpoints) - 1
         if NC > 0:
-            cycles = []
-
-            for k in range(NC):
-                cycles.append(signal[dcpoints[k] : dcpoints[k + 1]])
-
-            stcycle = signal[: dcpoints[0]]
-            endcycle = signal[dcpoints[NC] :]
-
-            rand_cycles = []
-            for i in randperm(NC):
-                rand_cycles.append(cycles[i])
-
-            for sn in range(N):
-                surr[sn, :] = np.unwrap(
-                    np.concatenate((stcycle, *rand_cycles, endcycle))
-                )
+            stcycle = np.arange(dcpoints[0])
+            endcycle = np.arange(dcpoints[NC], L)
+
+            # Each surrogate joins the cycles in a different random order.
+            starts = dcpoints[:-1]
+            lengths = np.diff(dcpoints)
+            order = _random_permutations(rng, N, NC)
+
+            ordered_starts = starts[order]
+            ordered_lengths = lengths[order]
+
+            # The index of every sample in the permuted cycles, for each surrogate.
+            total = dcpoints[NC] - dcpoints[0]
+            offsets = np.cumsum(ordered_lengths, axis=1) - ordered_lengths
+            cycle_ind = np.repeat(
+                (ordered_starts - offsets).ravel(), ordered_lengths.ravel()
+            ).reshape(N, total) + np.arange(total)
+
+            ind = np.hstack(
+                [
+                    np.broadcast_to(stcycle, (N, len(stcycle))),
+                    cycle_ind,
+                    np.broadcast_to(endcycle, (N, len(endcycle))),
+                ]
+            )
+            surr = np.unwrap(signal[ind], axis=1)
         else:
-            for sn in range(N):
-                surr[sn, :] = np.unwrap(signal)
+            surr = np.tile(np.unwrap(signal), (N, 1))
 
     params.type = method
     params.numsurr = N
@@ -288,7 +200,168 @@ def surrogate_calc(
     params.time = time
     params.fs = fs
 
-    return surr, params
+    return surr.astype(dtype, copy=False), params
+
+
+def iaaft(
+    sig: ndarray,
+    N: int,
+    rng: np.random.Generator,
+    maxit: int = 1000,
+    tolerance: float = 0,
+    exact_spectrum: bool = False,
+    initial: ndarray = None,
+) -> Tuple[ndarray, ndarray]:
+    """
+    Calculates iterated amplitude-adjusted Fourier transform surrogates. All surrogates are
+    iterated together; each surrogate stops iterating when it has converged.
+
+    Each iteration gives the surrogates the amplitude spectrum of the signal, and then gives
+    them the values of the signal in the rank order of the result.
+
+    :param sig: [1D array] the signal
+    :param N: the number of surrogates
+    :param rng: the random number generator
+    :param maxit: the maximum number of iterations
+    :param tolerance: the fraction of samples which may change rank between iterations
+    when a surrogate is considered to have converged
+    :param exact_spectrum: whether to return the surrogates with the exact spectrum of the signal (IAAFT2),
+    instead of the exact distribution of values (IAAFT1)
+    :param initial: [2D array] the starting point for each surrogate; if None, random permutations
+    of the signal are used
+    :return: [2D array] the surrogates, one in each row; [1D array] the number of iterations for each surrogate
+    """
+    L = len(sig)
+    val = np.sort(sig)
+    amplitude = np.abs(np.fft.rfft(sig))
+
+    if initial is None:
+        surr = sig[_random_permutations(rng, N, L)]
+    else:
+        surr = np.array(initial, dtype=np.float64)
+
+    iterf = surr.copy()
+
+    oldind = np.zeros((N, L), dtype=np.int64)
+    iterations = np.zeros(N, dtype=np.int64)
+    active = np.arange(N)
+
+    max_changes = tolerance * L
+
+    for _ in range(maxit):
+        if len(active) == 0:
+            break
+
+        # Match the spectrum of the signal, keeping the phases of the surrogates.
+        ft = np.fft.rfft(surr[active], axis=1)
+        iterf[active] = np.fft.irfft(amplitude * np.exp(1j * np.angle(ft)), n=L, axis=1)
+
+        # Match the distribution of the signal, keeping the rank order of the surrogates.
+        ind = np.argsort(iterf[active], axis=1)
+        adjusted = np.empty((len(active), L), dtype=np.float64)
+        np.put_along_axis(adjusted, ind, np.broadcast_to(val, adjusted.shape), axis=1)
+        surr[active] = adjusted
+
+        iterations[active] += 1
+
+        changes = np.count_nonzero(ind != oldind[active], axis=1)
+        oldind[active] = ind
+
+        active = active[changes > max_changes]
+
+    if exact_spectrum:
+        return iterf, iterations
+
+    return surr, iterations
+
+
+def wiaaft(
+    sig: ndarray,
+    N: int,
+    rng: np.random.Generator,
+    maxit: int = 1000,
+    tolerance: float = 0,
+    chunk_size: int = None,
+    wavelet: str = "la8",
+) -> Tuple[ndarray, ndarray]:
+    """
+    Calculates wavelet iterated amplitude-adjusted Fourier transform surrogates (Keylock, 2006).
+
+    The signal is decomposed with the MODWT. At each level, IAAFT surrogates of the coefficients
+    are calculated and circularly shifted to best match the original coefficients, which preserves
+    the timing of local features. The surrogates are reconstructed from the shifted coefficients,
+    and finally adjusted with IAAFT to give them the exact values and spectrum of the signal.
+
+    Surrogates are calculated in chunks. For each chunk, the MODWT is calculated and reconstructed
+    one level at a time (see `modwt.iter_levels()`), so only the coefficients of one level of the
+    signal and of one chunk of surrogates are stored at once. Recalculating the MODWT for each
+    chunk costs two FFTs per level, which is small compared to the IAAFT iterations.
+
+    :param sig: [1D array] the signal
+    :param N: the number of surrogates
+    :param rng: the random number generator
+    :param maxit: the maximum number of IAAFT iterations
+    :param tolerance: the tolerance for the IAAFT iterations (see `iaaft()`)
+    :param chunk_size: the number of surrogates to calculate at once, or None to calculate all at once
+    :param wavelet: the name of the wavelet
+    :return: [2D array] the surrogates, one in each row; [1D array] the number of iterations of the final
+    IAAFT adjustment for each surrogate
+    """
+    L = len(sig)
+    level = modwt.max_level(L)
+
+    surr = np.empty((N, L), dtype=np.float64)
+    iterations = np.zeros(N, dtype=np.int64)
+
+    chunk_size = chunk_size or max(N, 1)
+    for start in range(0, N, chunk_size):
+        n = min(chunk_size, N - start)
+        ft = np.zeros((n, L // 2 + 1), dtype=np.complex128)
+
+        for c, weights in modwt.iter_levels(sig, level, wavelet):
+            c_surr, _ = iaaft(c, n, rng, maxit, tolerance)
+
+            # Shift each surrogate to maximise its circular cross-correlation with the coefficients.
+            corr = np.fft.irfft(
+                np.fft.rfft(c_surr, axis=1) * np.fft.rfft(c).conj(), n=L, axis=1
+            )
+            shift = np.argmax(corr, axis=1)
+            c_surr = np.take_along_axis(
+                c_surr, (np.arange(L) + shift[:, None]) % L, axis=1
+            )
+
+            ft += weights * np.fft.rfft(c_surr, axis=1)
+
+        reconstructed = np.fft.irfft(ft, n=L, axis=1)
+
+        surr[start : start + n], iterations[start : start + n] = iaaft(
+            sig, n, rng, maxit, tolerance, initial=reconstructed
+        )
+
+    return surr, iterations
+
+
+def _random_permutations(rng: np.random.Generator, N: int, L: int) -> ndarray:
+    """
+    Returns N random permutations of the integers from 0 to L-1, one in each row.
+    """
+    return np.argsort(rng.random((N, L)), axis=1)
+
+
+def _randomise_phases(ft: ndarray, eta: ndarray, L: int) -> ndarray:
+    """
+    Randomises the phases of the Fourier transform of one or more real signals, and returns
+    the corresponding real signals. The amplitudes of the Fourier transform are unchanged.
+
+    :param ft: [1D or 2D array] the Fourier transform from `np.fft.rfft()`; if 2D, one signal per row
+    :param eta: [2D array] the random phases, with one row per output signal
+    :param L: the length of the signals
+    :return: [2D array] the phase-randomised signals, one in each row
+    """
+    ft = np.array(np.broadcast_to(ft, (eta.shape[0], ft.shape[-1])))
+    ft[:, 1 : eta.shape[1] + 1] *= np.exp(1j * eta)
+
+    return np.fft.irfft(ft, n=L, axis=1)
 
 
 def preprocessing(sig: ndarray, fs: float) -> Tuple[ndarray, ndarray, ndarray, float]:
@@ -333,3 +406,4 @@ class Params:
         self.numsurr = None
         self.fs = None
         self.method = None
+        self.iterations = None
@@ -0,0 +1,370 @@
+#  PyMODA, a Python implementation of MODA (Multiscale Oscillatory Dynamics Analysis).
+#  Copyright (C) 2019 Lancaster University
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program. If not, see <https://www.gnu.org/licenses/>.
+from typing import List, Tuple, Optional, Dict
+
+import numpy as np
+import pymodalib
+from numpy import ndarray
+
+from maths.params.TFParams import TFParams
+
+"""
+Wavelet transform of many signals which share the same sampling frequency, length and parameters,
+such as the surrogates of a signal.
+
+`pymodalib.wavelet_transform` estimates the window parameters, frequency grid, padding and wavelet
+kernels every time it is called, although they only depend on the parameters. `WaveletBank`
+calculates them once; each signal then only needs to be padded, and transformed with one FFT.
+
+The calculation follows the Python implementation of `pymodalib.wavelet_transform`, so the
+results are the same to within floating-point error.
+"""
+
+
+class WaveletBank:
+    """
+    The frequencies and wavelet kernels of a wavelet transform, precomputed for signals of a given length.
+    """
+
+    def __init__(
+        self,
+        fs: float,
+        length: int,
+        fmin: Optional[float] = None,
+        fmax: Optional[float] = None,
+        resolution: float = 1,
+        wavelet: str = "Lognorm",
+        padding="predictive",
+        preprocess: bool = True,
+        cut_edges: bool = False,
+        rel_tolerance: float = 0.01,
+    ):
+        """
+        :param fs: the sampling frequency of the signals
+        :param length: the length of the signals
+        :param fmin: the minimum frequency; defaults to the same value as `pymodalib.wavelet_transform`
+        :param fmax: the maximum frequency; defaults to `fs/2`
+        :param resolution: the wavelet resolution parameter, f0
+        :param wavelet: the wavelet type - Lognorm, Morlet or Morse-a
+        :param padding: the padding to use - "predictive", a number, or anything else for no padding
+        :param preprocess: whether to perform preprocessing on each signal
+        :param cut_edges: whether coefficients outside the cone of influence should be set to NaN
+        :param rel_tolerance: relative tolerance, specifying the cone of influence
+        """
+        from pymodalib.implementations.python.matlab_compat import is_number
+        from pymodalib.implementations.python.wavelet.wavelet_transform import (
+            LognormWavelet,
+            MorletWavelet,
+            MorseWavelet,
+            parcalc,
+        )
+
+        if wavelet == "Lognorm":
+            wp = LognormWavelet(resolution)
+        elif wavelet == "Morlet":
+            wp = MorletWavelet(resolution)
+        elif wavelet == "Morse-a":
+            wp = MorseWavelet(3, resolution)
+        else:
+            raise ValueError(f"Wavelet '{wavelet}' is not supported.")
+
+        L = int(length)
+        fmax = fmax or fs / 2
+        parcalc(rel_tolerance, L, wp, wp.fwt, [], False, wp.f0, fmax, fs=fs)
+
+        if fmin is None:
+            fmin = wp.ompeak / (2 * np.pi) * (wp.t2e - wp.t1e) * fs / L
+
+        nv = int(np.ceil(10 * np.log(2) / np.log(wp.xi2h / wp.xi1h)))
+        freq = 2 ** (
+            np.arange(np.ceil(nv * np.log2(fmin)), np.floor(nv * np.log2(fmax)) + 1)
+            / nv
+        )
+
+        t1e = np.reshape(wp.t1e, -1)
+        t2e = np.reshape(wp.t2e, -1)
+        coib1 = np.ceil(np.abs(t1e * fs * wp.ompeak / (2 * np.pi * freq)))
+        coib2 = np.ceil(np.abs(t2e * fs * wp.ompeak / (2 * np.pi * freq)))
+
+        NL = int(2 ** np.ceil(np.log2(L + coib1[0] + coib2[0])))
+        if coib1[0] == 0 and coib2[0] == 0:
+            n1 = np.floor((NL - L) / 2)
+            n2 = np.ceil((NL - L) / 2)
+        else:
+            n1 = np.floor((NL - L) * coib1[0] / (coib1[0] + coib2[0]))
+            n2 = np.ceil((NL - L) * coib1[0] / (coib1[0] + coib2[0]))
+
+        self.predictive = padding == "predictive"
+        self.constant = None
+        if self.predictive:
+            # Weights used by the predictive padding.
+            self.weights = 2 ** (
+                -(L / fs - np.arange(1, L + 1) / fs) / (wp.t2h - wp.t1h)
+            )
+        elif is_number(padding):
+            self.constant = float(padding)
+        else:
+            NL, n1, n2 = L, 0, 0
+
+        if (t2e - t1e) * wp.ompeak / (2 * np.pi * fmax) > L / fs:
+            coib1.fill(0)
+            coib2.fill(0)
+
+        self.fs = fs
+        self.length = L
+        self.fmin = fmin
+        self.fmax = fmax
+        self.freq = freq
+        self.preprocess = preprocess
+        self.cut_edges = cut_edges
+        self.padded_length = NL
+        self.n1 = int(n1)
+        self.n2 = int(n2)
+        self.coib1 = coib1.astype(int)
+        self.coib2 = coib2.astype(int)
+
+        # Arguments for the predictive padding, which are the same for every signal.
+        self.fint = [max([fmin, fs / L]), fmax]
+        self.fcast_count = min([np.ceil(len(freq) / 2) + 5, np.round(L / 3)])
+
+        # Like `pymodalib.wavelet_transform`, signals are preprocessed before padding unless the
+        # lowest frequency is close to fs/L, and again after predictive padding.
+        self.preprocess_before = preprocess and not (
+            self.predictive and fmin < 5 * fs / L
+        )
+        self.preprocess_after = preprocess and self.predictive
+
+        self.kernels = self._kernels(wp, freq, NL, fs)
+
+    @staticmethod
+    def from_params(params: TFParams, length: int) -> "WaveletBank":
+        """
+        Creates a wavelet bank using the same parameters as `_wt_func()`.
+
+        :param params: the params object with parameters for the wavelet transform
+        :param length: the length of the signals
+        """
+        return WaveletBank(
+            fs=params.fs,
+            length=length,
+            fmin=params.get_item("fmin"),
+            fmax=params.get_item("fmax"),
+            resolution=params.get_item("f0"),
+            wavelet=params.get_item("Wavelet"),
+            padding=params.get_item("Padding"),
+            preprocess=params.get_item("Preprocess") == "on",
+            cut_edges=params.get_item("CutEdges") == "on",
+            rel_tolerance=params.get_item("RelTol"),
+        )
+
+    @staticmethod
+    def _kernels(
+        wp, freq: ndarray, NL: int, fs: float
+    ) -> List[Tuple[ndarray, ndarray]]:
+        """
+        Calculates the Fourier transform of the wavelet at each frequency. Only the values within
+        the wavelet's support are stored, with their indices.
+        """
+        Nq = int(np.ceil((NL + 1) / 2))
+        ff = np.concatenate([np.arange(0, Nq), -np.arange(1, NL - Nq)[::-1]]) * fs / NL
+
+        kernels = []
+        for f in freq:
+            freqwf = ff * wp.ompeak / (2 * np.pi * f)
+            ii = np.nonzero(
+                (wp.xi1 / (2 * np.pi) < freqwf) & (freqwf < wp.xi2 / (2 * np.pi))
+            )[0]
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                fw = np.conj(wp.fwt(2 * np.pi * freqwf[ii]))
+
+                # Avoid NaNs due to numerics, e.g. sin(0)/0.
+                nid = ~np.isfinite(fw)
+                if np.any(nid):
+                    fw[nid] = np.conj(wp.fwt(2 * np.pi * freqwf[ii[nid]] + 1e-14))
+                    fw[~np.isfinite(fw)] = 0
+
+            kernels.append((ii, fw.astype(np.complex128)))
+
+        return kernels
+
+    def pad(self, signal: ndarray) -> ndarray:
+        """
+        Preprocesses and pads a signal in the same way as `pymodalib.wavelet_transform`.
+
+        :param signal: [1D array] the signal
+        :return: [1D array] the padded signal
+        """
+        from pymodalib.implementations.python.wavelet.wavelet_transform import fcast
+
+        fs = self.fs
+        signal = np.asarray(signal, dtype=np.float64)
+
+        if self.preprocess_before:
+            signal = pymodalib.preprocess(signal, fs, self.fmin, self.fmax)
+
+        if self.predictive:
+            args = (self.fint, self.fcast_count, self.weights)
+            padleft = np.flip(fcast(np.flip(signal), fs, self.n1, *args))
+            padright = fcast(signal, fs, self.n2, *args)
+        elif self.constant is not None:
+            padleft = np.full(self.n1, self.constant)
+            padright = np.full(self.n2, self.constant)
+        else:
+            padleft, padright = [], []
+
+        signal = np.concatenate([padleft, signal, padright])
+
+        if self.preprocess_after:
+            signal = pymodalib.preprocess(signal, fs, self.fmin, self.fmax)
+
+        return signal
+
+    def spectra(self, signals: ndarray) -> ndarray:
+        """
+        Pads each signal and calculates its Fourier transform.
+
+        :param signals: [2D array] the signals, one in each row
+        :return: [2D array] the Fourier transform of each padded signal
+        """
+        padded = [self.pad(s) for s in signals]
+        return np.fft.fft(np.asarray(padded), self.padded_length, axis=1)
+
+    def rows(self, spectra: ndarray, fn: int) -> ndarray:
+        """
+        Calculates one row of the wavelet transform of each signal.
+
+        :param spectra: [2D array] the spectra returned by `spectra()`
+        :param fn: the index of the frequency
+        :return: [2D array, complex] the coefficients at the frequency, one row for each signal
+        """
+        ii, fw = self.kernels[fn]
+        NL = self.padded_length
+        L = self.length
+
+        cc = np.zeros((spectra.shape[0], NL), dtype=np.complex64)
+        cc[:, ii] = spectra[:, ii] * fw
+
+        out = np.fft.ifft(cc, NL, axis=1)[:, self.n1 : NL - self.n2].astype(
+            np.complex64
+        )
+
+        if self.cut_edges:
+            c1, c2 = self.coib1[fn], self.coib2[fn]
+            if L - c1 - c2 <= 0:
+                out.fill(np.nan)
+            elif c1 + c2 > 0:
+                out[:, :c1] = np.nan
+                out[:, L - c2 :] = np.nan
+
+        return out
+
+    def transform(self, signal: ndarray) -> ndarray:
+        """
+        Calculates the wavelet transform of a single signal.
+
+        :param signal: [1D array] the signal
+        :return: [2D array, complex] the wavelet transform
+        """
+        spectra = self.spectra(np.reshape(signal, (1, -1)))
+        return np.vstack([self.rows(spectra, fn) for fn in range(len(self.freq))])
+
+    def phase_coherence_sum(
+        self, wt_signal: ndarray, signals: ndarray, chunk_size: int = 8
+    ) -> ndarray:
+        """
+        Calculates the sum of the wavelet phase coherence (see `pymodalib.algorithms.coherence.wphcoh`)
+        between a wavelet transform and the wavelet transform of each signal.
+
+        The transforms of the signals are calculated one frequency at a time, for a chunk of
+        signals at once, so the full transforms are never stored.
+
+        :param wt_signal: [2D array] the wavelet transform to compare with each signal
+        :param signals: [2D array] the signals, one in each row
+        :param chunk_size: the number of signals to transform at once
+        :return: [2D array] the sum of the phase coherence at each frequency, with shape (FN, 1)
+        """
+        FN = min(wt_signal.shape[0], len(self.freq))
+        total = np.zeros((FN, 1))
+
+        for start in range(0, len(signals), chunk_size):
+            spectra = self.spectra(signals[start : start + chunk_size])
+
+            for fn in range(FN):
+                total[fn] += np.sum(
+                    _phase_coherence(wt_signal[fn], self.rows(spectra, fn))
+                )
+
+        return total
+
+
+# The most recently used wavelet bank in the current process, since a worker usually
+# calculates several batches of surrogates with the same parameters.
+_banks: Dict[tuple, WaveletBank] = {}
+
+
+def get_bank(params: TFParams, length: int) -> WaveletBank:
+    """
+    Returns a wavelet bank for the parameters and signal length, reusing the previous bank
+    in the current process if they have not changed.
+
+    :param params: the params object with parameters for the wavelet transform
+    :param length: the length of the signals
+    """
+    key = (params.fs, length, tuple(sorted(params.data.items(), key=lambda i: i[0])))
+
+    bank = _banks.get(key)
+    if bank is None:
+        _banks.clear()
+        bank = WaveletBank.from_params(params, length)
+        _banks[key] = bank
+
+    return bank
+
+
+def _phase_coherence(w1: ndarray, w2: ndarray) -> ndarray:
+    """
+    Calculates the phase coherence between one row of a wavelet transform and the same
+    row of several other transforms, in the same way as `wphcoh`.
+
+    :param w1: [1D array] the row of the first wavelet transform
+    :param w2: [2D array] the rows of the other wavelet transforms
+    :return: [1D array] the phase coherence with each of the other transforms; NaN if it is undefined
+    """
+    # exp(i*(angle(w1) - angle(w2))), without calculating the angles.
+    phexp = _phasor(w1) * np.conj(_phasor(w2))
+    valid = ~np.isnan(phexp)
+
+    CL = np.sum(valid, axis=1)
+    cutoff = min(len(w1), w2.shape[1])
+    NL = np.sum((w1[:cutoff] == 0) & (w2[:, :cutoff] == 0), axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        phph = np.nansum(phexp, axis=1) / CL - NL / CL
+
+    return np.where(CL > 0, np.abs(phph), np.nan)
+
+
+def _phasor(w: ndarray) -> ndarray:
+    """
+    Returns exp(i*angle(w)), which is 1 where `w` is 0 and NaN where `w` is NaN.
+    """
+    w = w.astype(np.complex128)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = w / np.abs(w)
+
+    out[w == 0] = 1
+    return out
@@ -13,7 +13,7 @@
 #
 #  You should have received a copy of the GNU General Public License
 #  along with this program. If not, see <https://www.gnu.org/licenses/>.
-from typing import Any, Optional, List
+from typing import Any, Optional
 
 import numpy as np
 from numpy import ndarray
@@ -113,28 +113,3 @@ def calc_subset_count(arr):
     results.
     """
     return int(np.ceil(arr.shape[1] / 3840))
-
-
-def matlab_to_numpy(arr) -> ndarray:
-    """
-    Converts a matlab array to a numpy array.
-    Can be much faster than simply calling "np.asarray()",
-    but does not appear to be faster for complex arrays.
-    """
-    try:
-        # Should work for real arrays, maybe not for complex arrays.
-        result = np.array(arr._data).reshape(arr.size, order="F")
-    except:
-        result = np.array(arr)
-    return result
-
-
-def multi_matlab_to_numpy(*args) -> List[ndarray]:
-    """
-    Converts multiple matlab arrays to numpy arrays using `matlab_to_numpy()`.
-    """
-    out = []
-    for arr in args:
-        out.append(matlab_to_numpy(arr))
-
-    return out
@@ -28,6 +28,7 @@ class BAParams:
         surr_count: int,
         alpha: float,
         opt: dict,
+        implementation: str = "matlab",
     ):
         self.signals = signals
         self.fmin = fmin
@@ -39,5 +40,9 @@ class BAParams:
         self.alpha = alpha
         self.fs = signals.frequency
 
+        # Whether to use the MATLAB-packaged bispectrum, or the Numpy implementation
+        # in `maths.algorithms.bispectrum`.
+        self.implementation = implementation
+
         # The MATLAB algorithm returns a struct, `opt`, which is converted to this dict.
         self.opt = opt
@@ -33,6 +33,11 @@ _wavelet = "Wavelet"
 _wft = "wft"
 _wt = "wt"
 
+# Highest maximum frequency, as a fraction of the sampling frequency, for which a transform
+# can be cropped. Near the Nyquist frequency, the transform of part of a signal differs from
+# the same part of the transform of the whole signal, even far from the edges.
+_crop_max_frequency = 1 / 3
+
 
 class TFParams:
     """
@@ -114,6 +119,31 @@ class TFParams:
         """
         return sanitise(self.data)
 
+    def transform_items(self) -> dict:
+        """
+        Gets the parameters which affect the transform, as a dictionary. The window is
+        only used by the WFT, and the wavelet is only used by the WT.
+        """
+        items = self.get()
+        items.pop(_wavelet if self.transform == _wft else _window, None)
+        return items
+
+    def allows_crop(self) -> bool:
+        """
+        Returns whether the transform of part of a signal can be taken from the transform of the
+        whole signal. This is only possible for the WT with the edges cut, so that only values which
+        are not affected by the edges are kept, and without preprocessing, which depends on the
+        whole signal. The minimum frequency must be set, because the default depends on the length
+        of the signal, and the maximum frequency must be at most a third of the sampling frequency.
+        """
+        return (
+            self.transform != _wft
+            and self.get_item(_cut_edges) == "on"
+            and self.get_item(_preprocess) == "off"
+            and self.get_item(_fmin) is not None
+            and self.get_item(_fmax) <= self.fs * _crop_max_frequency
+        )
+
     def set_item(self, key, value):
         self.data[key] = value
 
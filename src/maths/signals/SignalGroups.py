@@ -13,13 +13,14 @@
 #
 #  You should have received a copy of the GNU General Public License
 #  along with this program. If not, see <https://www.gnu.org/licenses/>.
-from typing import Iterable, Tuple
+from typing import Iterable, Optional, Tuple
 
 import numpy as np
 from numpy import ndarray
 
 from data.parsing import parsing
 from maths.signals.Signals import Signals
+from maths.signals.TimeAxis import TimeAxis
 
 
 class SignalGroups(Signals):
@@ -46,7 +47,7 @@ class SignalGroups(Signals):
 
     def set_frequency(self, freq: float) -> None:
         self.frequency = float(freq)
-        self.times = np.arange(0, self.sig1a.shape[1] / freq, 1 / freq)
+        self.times = TimeAxis(0, freq, self.sig1a.shape[1])
 
     def get_all(self) -> Tuple[ndarray, ndarray, ndarray, ndarray]:
         return self.sig1a, self.sig1b, self.sig2a, self.sig2b
@@ -66,18 +67,37 @@ class SignalGroups(Signals):
         SignalGroups
             SignalGroups instance representing the data from the file(s).
         """
+        return SignalGroups.from_arrays(
+            [
+                parsing.get_parser(f, groups=True).parse() if f is not None else None
+                for f in files
+            ]
+        )
+
+    @staticmethod
+    def from_arrays(arrays: Iterable[Optional[ndarray]]) -> "SignalGroups":
+        """
+        Creates a SignalGroups instance from the arrays parsed from a file or pair of files.
+
+        Parameters
+        ----------
+        arrays : Iterable[Optional[ndarray]]
+            One or two 3D arrays, as returned by the group parsers, or None for a file which is not used.
+
+        Returns
+        -------
+        SignalGroups
+            SignalGroups instance representing the data from the array(s).
+        """
         out = []
-        for f in files:
-            if f is None:
+        for array in arrays:
+            if array is None:
                 out.extend((None, None))
                 continue
 
-            parser = parsing.get_parser(f, groups=True)
-            array: ndarray = parser.parse()
-
             if len(array.shape) <= 2:
                 raise Exception(
-                    f"Array from {f} with shape {array.shape} cannot be "
+                    f"Array with shape {array.shape} cannot be "
                     f"loaded as a signal group. Signal group arrays must be "
                     f"saved as 3D arrays. Please see the documentation."
                 )  # TODO GC: add docs
@@ -76,8 +76,7 @@ class SignalPairs(Signals):
         signals.set_frequency(self.frequency)
         return signals
 
-    @staticmethod
-    def from_file(file: str) -> "SignalPairs":
-        parser = get_parser(file)
-        args = [TimeSeries(d) for d in parser.parse()]
-        return SignalPairs(*args)
+    @classmethod
+    def from_file(cls, file: str, variable: str = None) -> "SignalPairs":
+        parser = get_parser(file, variable=variable)
+        return cls.from_array(parser.parse())
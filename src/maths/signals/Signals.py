@@ -13,7 +13,10 @@
 #
 #  You should have received a copy of the GNU General Public License
 #  along with this program. If not, see <https://www.gnu.org/licenses/>.
-from typing import List
+from typing import List, Optional, Union
+
+import numpy as np
+from numpy import ndarray
 
 from data.parsing.parsing import get_parser
 from maths.signals.TimeSeries import TimeSeries
@@ -25,6 +28,10 @@ class Signals(List[TimeSeries]):
 
     Each Signals instance should have a frequency which is shared
     across all contained TimeSeries instances.
+
+    When the signals are loaded from a file, they are stored in a single 2D array (`data`), with one
+    row for each signal; the signal of each TimeSeries is a view of its row. The array may be
+    memory-mapped from the file, in which case the signals are only read when they are used.
     """
 
     def __init__(self, *args: TimeSeries):
@@ -39,6 +46,9 @@ class Signals(List[TimeSeries]):
         self.generate_names()
         self.frequency = None
 
+        # The 2D array containing the signals, if they were created from one.
+        self.data: Optional[ndarray] = None
+
     def generate_names(self) -> None:
         """
         Generates a unique name for every TimeSeries in the dataset. If multiple
@@ -129,9 +139,36 @@ class Signals(List[TimeSeries]):
         signals.set_frequency(self.frequency)
         return signals
 
-    @staticmethod
-    def from_file(file: str) -> "Signals":
-        """Creates a Signals instance from a provided file."""
-        parser = get_parser(file)
-        args = [TimeSeries(d) for d in parser.parse()]
-        return Signals(*args)
+    @classmethod
+    def from_array(cls, data: Union[ndarray, List[List[float]]]) -> "Signals":
+        """
+        Creates an instance from a 2D array containing a signal in each row. Each TimeSeries
+        is a view of a row, so the array is not copied (unless it is a list).
+
+        :param data: [2D array] the signals, or a list containing the values of each signal
+        :return: the new instance
+        """
+        if not isinstance(data, ndarray):
+            try:
+                data = np.array(data, dtype=np.float64)
+            except ValueError:
+                # The signals have different lengths, so they cannot be stored in one array.
+                return cls(*[TimeSeries(d) for d in data])
+
+        if data.ndim == 1:
+            data = data.reshape(1, -1)
+
+        signals = cls(*[TimeSeries(row) for row in data])
+        signals.data = data
+        return signals
+
+    @classmethod
+    def from_file(cls, file: str, variable: str = None) -> "Signals":
+        """
+        Creates a Signals instance from a provided file.
+
+        :param file: the name of the file
+        :param variable: the name of the variable to load, if the file is a .mat file
+        """
+        parser = get_parser(file, variable=variable)
+        return cls.from_array(parser.parse())
@@ -0,0 +1,142 @@
+#  PyMODA, a Python implementation of MODA (Multiscale Oscillatory Dynamics Analysis).
+#  Copyright (C) 2019 Lancaster University
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program. If not, see <https://www.gnu.org/licenses/>.
+import math
+from typing import Union, Iterator
+
+import numpy as np
+from numpy import ndarray
+
+
+class TimeAxis:
+    """
+    The times of a uniformly sampled signal, stored as the initial time, the sampling frequency
+    and the number of samples instead of an array.
+
+    The time of sample k is `t0 + k / fs`. Indexing with an integer returns a single time, and
+    slicing returns another `TimeAxis`, so the times of a cropped signal are not copied either.
+    The times are only calculated as an array when they are needed, e.g. when they are plotted:
+    `np.asarray()` and any other kind of indexing return a Numpy array.
+    """
+
+    def __init__(self, t0: float, fs: float, length: int, first: int = 0):
+        """
+        :param t0: the time of the first sample of the original signal
+        :param fs: the sampling frequency
+        :param length: the number of samples
+        :param first: the index of the first sample in the original signal; used when slicing,
+        so that the times are exactly the same as the times of the original signal
+        """
+        self.t0 = t0
+        self.fs = float(fs)
+        self.length = max(int(length), 0)
+        self.first = int(first)
+
+    @property
+    def shape(self):
+        return (self.length,)
+
+    @property
+    def ndim(self) -> int:
+        return 1
+
+    @property
+    def size(self) -> int:
+        return self.length
+
+    @property
+    def dtype(self) -> np.dtype:
+        return np.dtype(np.float64)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index) -> Union[float, "TimeAxis", ndarray]:
+        if isinstance(index, (int, np.integer)):
+            k = int(index)
+            if k < 0:
+                k += self.length
+            if not 0 <= k < self.length:
+                raise IndexError(
+                    f"index {index} is out of bounds for time axis with size {self.length}"
+                )
+
+            return self.t0 + (self.first + k) / self.fs
+
+        if isinstance(index, slice) and index.step in (None, 1):
+            start, stop, _ = index.indices(self.length)
+            return TimeAxis(self.t0, self.fs, stop - start, self.first + start)
+
+        return self.to_numpy()[index]
+
+    def __iter__(self) -> Iterator[float]:
+        return iter(self.to_numpy())
+
+    def __array__(self, dtype=None) -> ndarray:
+        arr = self.to_numpy()
+        if dtype is not None:
+            arr = arr.astype(dtype, copy=False)
+
+        return arr
+
+    def to_numpy(self) -> ndarray:
+        """
+        Returns the times as a Numpy array.
+        """
+        return self.t0 + (self.first + np.arange(self.length)) / self.fs
+
+    def searchsorted(self, value: float, side: str = "left") -> int:
+        """
+        Finds the index where a time would be inserted to keep the times in order,
+        like `np.searchsorted()`, without creating an array.
+
+        :param value: the time
+        :param side: "left" to return the index of the first time which is greater than or equal
+        to the value, or "right" to return the index of the first time which is greater
+        :return: the index
+        """
+        if side not in ("left", "right"):
+            raise ValueError(f"side must be 'left' or 'right', not '{side}'")
+
+        if self.length == 0:
+            return 0
+
+        estimate = (value - self.t0) * self.fs - self.first
+        if math.isnan(estimate):
+            return self.length
+
+        k = int(math.ceil(min(max(estimate, 0), self.length)))
+
+        def before(i: int) -> bool:
+            # Whether the time at index i comes before the value.
+            t = self[i]
+            return t < value if side == "left" else t <= value
+
+        # The estimate may be wrong by one sample due to rounding.
+        while k > 0 and not before(k - 1):
+            k -= 1
+        while k < self.length and before(k):
+            k += 1
+
+        return k
+
+    def copy(self) -> "TimeAxis":
+        """
+        Returns this object; it is never modified, so it does not need to be copied.
+        """
+        return self
+
+    def __repr__(self) -> str:
+        return f"TimeAxis(t0={self.t0}, fs={self.fs}, length={self.length}, first={self.first})"
@@ -13,11 +13,13 @@
 #
 #  You should have received a copy of the GNU General Public License
 #  along with this program. If not, see <https://www.gnu.org/licenses/>.
-from typing import List, Union
+from typing import List, Optional, Union
 
 import numpy as np
 from numpy import ndarray
 
+from maths.signals.TimeAxis import TimeAxis
+from processes.SharedArray import MappedArray
 from maths.signals.data.TFOutputData import TFOutputData
 
 
@@ -40,13 +42,42 @@ class TimeSeries:
             self.signal = data
 
         self.initial_time = 0
-        self.times = None
+        self.times: Optional[TimeAxis] = None
 
         self.original_signal = None
         self.original_times = None
 
+        # The indices of the original data which are within the x-limits, if they are set.
+        self.crop: Optional[slice] = None
+
         self.output_data = TFOutputData.empty()
 
+    def __getstate__(self) -> dict:
+        # Signals which are memory-mapped from a file are sent to other processes
+        # as their location in the file, rather than being copied.
+        state = self.__dict__.copy()
+        for key in ("signal", "original_signal"):
+            mapped = (
+                MappedArray.from_view(state[key]) if state[key] is not None else None
+            )
+            if mapped:
+                state[key] = mapped
+
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        for key in ("signal", "original_signal"):
+            if isinstance(state.get(key), MappedArray):
+                state[key] = state[key].open()
+
+        # A signal which is not contiguous, e.g. a column of a column-wise file, is copied when
+        # it is used in a calculation, because reading it from the file would read every row.
+        # Only the cropped window is copied; the original signal stays memory-mapped.
+        if isinstance(state.get("signal"), ndarray):
+            state["signal"] = np.ascontiguousarray(state["signal"])
+
+        self.__dict__.update(state)
+
     def has_frequency(self) -> bool:
         """Returns whether a frequency has been set."""
         return self.frequency is not None
@@ -65,12 +96,12 @@ class TimeSeries:
     def has_times(self) -> bool:
         return self.times is not None
 
-    def _generate_times(self) -> ndarray:
-        """Generates the time values associated with the data."""
-        count = len(self.signal)
-        return (
-            np.arange(0, count / self.frequency, 1 / self.frequency) + self.initial_time
-        )
+    def _generate_times(self) -> TimeAxis:
+        """
+        Generates the time values associated with the data. The times are not stored
+        as an array; see `TimeAxis`.
+        """
+        return TimeAxis(self.initial_time, self.frequency, len(self.signal))
 
     def set_xlimits(self, x1, x2) -> None:
         """
@@ -78,6 +109,9 @@ class TimeSeries:
         range of times). The original data is saved to a variable so that
         it can be restored.
 
+        The times are in ascending order, so the values within the x-limits are found with a binary
+        search, and the signal and times become views of the original data rather than copies.
+
         :param x1: the lower limit
         :param x2: the upper limit
         """
@@ -91,23 +125,28 @@ class TimeSeries:
         if x2 < x1:
             x1, x2 = x2, x1  # Swap values.
 
-        indices = (x1 <= self.times) & (self.times <= x2)
-        self.times = self.times[indices]
-        self.signal = self.signal[indices]
+        start = self.original_times.searchsorted(x1, side="left")
+        stop = self.original_times.searchsorted(x2, side="right")
+
+        self.crop = slice(int(start), int(stop))
+        self.times = self.original_times[self.crop]
+        self.signal = self.original_signal[self.crop]
 
     def reset_xlimits(self) -> None:
         """Resets the x-limits by restoring the original data."""
         if self.contains_original_data():
-            self.signal = self.original_signal.copy()
-            self.times = self.original_times.copy()
+            self.signal = self.original_signal
+            self.times = self.original_times
+            self.crop = None
 
     def save_original_data(self) -> None:
         """
         Saves the original data,so that it can be restored later
-        even if the x-limits are changed.
+        even if the x-limits are changed. The data is not modified when the
+        x-limits are set, so it is not copied.
         """
-        self.original_signal = self.signal.copy()
-        self.original_times = self.times.copy()
+        self.original_signal = self.signal
+        self.original_times = self.times
 
     def contains_original_data(self) -> bool:
         """Returns whether the original data has been saved."""
@@ -50,7 +50,7 @@ class BAOutputData:
     bispxpp: ndarray
     bisppxx: ndarray
 
-    # Surrogates.
+    # Significance thresholds calculated from the surrogates of each bispectrum.
     surrxxx: ndarray
     surrppp: ndarray
     surrxpp: ndarray
@@ -13,36 +13,46 @@
 #
 #  You should have received a copy of the GNU General Public License
 #  along with this program. If not, see <https://www.gnu.org/licenses/>.
+from typing import Optional
+
+import numpy as np
 from numpy import ndarray
 
 
 class TFOutputData:
     """
     A class which contains the output data from calculations.
+
+    Only the values of the transform are stored. The amplitudes and powers are calculated
+    from them when needed; the amplitudes are cached with the data type `cache_dtype`,
+    which can be set to None to disable the cache. The powers are always calculated from
+    the values in double precision, rather than from the cached amplitudes.
     """
 
+    # Data type of the cached amplitudes. Float32 is precise enough for plotting,
+    # and takes a quarter of the memory of the complex transform.
+    cache_dtype = np.float32
+
     def __init__(
-            self,
-            times: ndarray,
-            values: ndarray,
-            ampl: ndarray,
-            freq: ndarray,
-            powers: ndarray,
-            avg_ampl: ndarray,
-            avg_pow: ndarray,
-            transform: str = "wt",
-            overall_coherence: ndarray = None,
-            phase_coherence: ndarray = None,
-            phase_diff: ndarray = None,
+        self,
+        times: ndarray,
+        values: ndarray,
+        freq: ndarray,
+        avg_ampl: ndarray,
+        avg_pow: ndarray,
+        transform: str = "wt",
+        overall_coherence: ndarray = None,
+        phase_coherence: ndarray = None,
+        phase_diff: ndarray = None,
     ):
+        self._ampl: Optional[ndarray] = None
+
         self.transform = transform  # The name of the transform (e.g. WT or WFT).
         self.values = values  # The values of the transform (complex numbers).
 
         # Data plotted in main color mesh in time-frequency common.
         self.times = times
         self.freq = freq
-        self.ampl = ampl
-        self.powers = powers
 
         # Data plotted on the RHS of the main color-mesh plot.
         self.avg_ampl = avg_ampl
@@ -64,9 +74,54 @@ class TFOutputData:
         # Set to false when the data is invalidated.
         self.valid = True
 
+    @property
+    def values(self) -> ndarray:
+        return self._values
+
+    @values.setter
+    def values(self, values: ndarray) -> None:
+        self._values = values
+        self._ampl = None
+
+    @property
+    def ampl(self) -> Optional[ndarray]:
+        """The amplitudes of the transform, calculated from the values when first used."""
+        if self._ampl is not None:
+            return self._ampl
+
+        if self._values is None:
+            return None
+
+        ampl = np.abs(self._values)
+        if self.cache_dtype is not None:
+            self._ampl = ampl.astype(self.cache_dtype, copy=False)
+            return self._ampl
+
+        return ampl
+
+    @property
+    def powers(self) -> Optional[ndarray]:
+        """The powers of the transform, calculated from the values each time."""
+        if self._values is None:
+            return None
+
+        powers = np.abs(self._values).astype(np.float64, copy=False)
+        return np.square(powers, out=powers)
+
+    def __getstate__(self) -> dict:
+        # Don't send the cached amplitudes to other processes.
+        state = self.__dict__.copy()
+        state["_ampl"] = None
+        return state
+
     def is_valid(self) -> bool:
         """Returns whether the data is valid and should be plotted."""
-        return self.valid and len(self.times) > 0 and len(self.freq) > 0 and len(self.ampl) > 0
+        return (
+            self.valid
+            and len(self.times) > 0
+            and len(self.freq) > 0
+            and len(self.values) > 0
+        )
 
     def invalidate(self):
         """
@@ -76,9 +131,7 @@ class TFOutputData:
         self.valid = False
         self.times = None
         self.values = None
-        self.ampl = None
         self.freq = None
-        self.powers = None
         self.avg_ampl = None
         self.avg_pow = None
         self.filtered_signal = None
@@ -87,7 +140,10 @@ class TFOutputData:
         self.band_data = {}
 
     def has_phase_coherence(self) -> bool:
-        return not (self.overall_coherence is None or len(self.freq) != len(self.overall_coherence))
+        return not (
+            self.overall_coherence is None
+            or len(self.freq) != len(self.overall_coherence)
+        )
 
     def has_surrogates(self) -> bool:
         return self.surrogate_avg is not None
@@ -106,7 +162,11 @@ class TFOutputData:
         return len(self.band_data.keys()) > 0
 
     def set_band_data(self, interval: tuple, band, phase, amp):
-        self.band_data[interval] = (band, phase, amp,)
+        self.band_data[interval] = (
+            band,
+            phase,
+            amp,
+        )
 
     def get_band_data(self, interval: tuple) -> tuple:
         return self.band_data.get(interval)
@@ -116,4 +176,4 @@ class TFOutputData:
         """
         Creates an instance of this class with only empty lists as data.
         """
-        return TFOutputData(*[[] for _ in range(7)])
+        return TFOutputData(*[[] for _ in range(5)])
@@ -0,0 +1,77 @@
+#  PyMODA, a Python implementation of MODA (Multiscale Oscillatory Dynamics Analysis).
+#  Copyright (C) 2019 Lancaster University
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program. If not, see <https://www.gnu.org/licenses/>.
+import asyncio
+import os
+import threading
+from typing import Callable, Iterator, Optional, Tuple
+
+from numpy import ndarray
+
+from data.parsing.BaseParser import BaseParser
+
+
+class DataLoader:
+    """
+    Loads a data file in a separate thread, so that the GUI does not freeze while a large
+    file is parsed.
+
+    The file is parsed in chunks (see `BaseParser.iter_chunks()`), and the signals are built
+    as each chunk is parsed. Progress is reported between chunks, and the loading
+    can be cancelled.
+    """
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+
+    async def coro_load(
+        self, parser: BaseParser, on_progress: Callable[[int, int], None] = None
+    ) -> Optional[ndarray]:
+        """
+        Parses a file in a separate thread.
+
+        :param parser: the parser for the file
+        :param on_progress: function called in the main thread with the number of bytes
+        which have been read, and the size of the file
+        :return: the result of `parser.parse()`, or None if the loading was cancelled
+        """
+        self._cancelled.clear()
+
+        loop = asyncio.get_event_loop()
+        size = os.path.getsize(parser.filename)
+
+        def chunks() -> Iterator[Tuple[ndarray, int]]:
+            for values, position in parser.iter_chunks():
+                if self._cancelled.is_set():
+                    return
+
+                if on_progress:
+                    loop.call_soon_threadsafe(on_progress, position, size)
+
+                yield values, position
+
+        result = await loop.run_in_executor(None, parser.join_chunks, chunks())
+
+        if self._cancelled.is_set():
+            print("Loading cancelled.")
+            return None
+
+        return result
+
+    def cancel(self) -> None:
+        """
+        Cancels the loading. The thread stops after the chunk which is being parsed.
+        """
+        self._cancelled.set()
@@ -13,10 +13,15 @@
 #
 #  You should have received a copy of the GNU General Public License
 #  along with this program. If not, see <https://www.gnu.org/licenses/>.
+import asyncio
+import copy
 import functools
-from typing import Callable, List, Tuple, Union, Optional, Dict
+import math
+import shutil
+from typing import Callable, List, Tuple, Union, Optional, Dict, Any, Awaitable
 
 import multiprocess as mp
+import numpy as np
 import pymodalib
 from numpy import ndarray
 from scheduler.Scheduler import Scheduler
@@ -27,12 +32,27 @@ from maths.algorithms.multiprocessing.bayesian_inference import (
     _dynamic_bayesian_inference,
 )
 from maths.algorithms.multiprocessing.bispectrum_analysis import (
-    _bispectrum_analysis,
+    _bispectrum,
+    _bispectrum_output,
+    _bispectrum_params,
     _biphase,
+    _surrogate_bispectra,
+    _unique_signals,
+)
+from maths.algorithms.multiprocessing.group_coherence import (
+    _group_coherence,
+    _dual_group_coherence,
+)
+from maths.algorithms.multiprocessing.phase_coherence import (
+    _phase_coherence,
+    _surrogate_coherence,
 )
-from maths.algorithms.multiprocessing.phase_coherence import _phase_coherence
 from maths.algorithms.multiprocessing.ridge_extraction import _ridge_extraction
-from maths.algorithms.multiprocessing.time_frequency import _time_frequency
+from maths.algorithms.multiprocessing.time_frequency import (
+    _crop_transform,
+    _time_frequency,
+)
+from maths.algorithms.significance import SurrogateThreshold
 from maths.params.BAParams import BAParams
 from maths.params.DHParams import DHParams
 from maths.params.PCParams import PCParams
@@ -41,30 +61,47 @@ from maths.params.TFParams import TFParams, _fmin, _fmax
 from maths.signals.SignalPairs import SignalPairs
 from maths.signals.Signals import Signals
 from maths.signals.TimeSeries import TimeSeries
+from processes.SharedArray import SharedArray, shared_directory, map_array
+from processes.WorkerPool import WorkerPool, Job
+from utils.cache import MemoryCache, ResultCache, result_key
 from utils.os_utils import OS
 
 
 class MPHandler:
     """
     A class providing functions which perform mathematical computations
-    using a Scheduler. 
+    using a pool of worker processes.
+
+    The worker pool is shared by all instances and stays alive between calculations,
+    so workers keep their imported modules and initialised state.
+
+    The results of analyses are saved in the `ResultCache`. If an analysis is repeated with
+    the same signals and parameters, its results are loaded instead of being recalculated.
+    Recent transforms are also kept in memory, so windows which transform the same signals
+    with the same parameters share them.
 
     Important:
     - Keep a reference to any instances of `MPHandler` to prevent them from
       being garbage collected before tasks have completed.
     - Calling any function on a running MPHandler will stop any tasks
-      currently in progress.
+      currently in progress. Tasks started by other instances are not affected.
     """
 
-    # On Linux, we don't need to run in a thread because processes can be forked; we also need to avoid
-    # using a thread because this will cause issues with the LD_LIBRARY_PATH.
-    should_run_in_thread = not OS.is_linux()
-
     # On macOS, multiprocess has issues so we need to use threads for everything.
     only_threads = OS.is_mac_os()
 
+    # The worker pool shared by all instances.
+    _pool: WorkerPool = None
+
+    # The cache of results shared by all instances.
+    _result_cache: ResultCache = None
+
+    # The recently calculated transforms, shared by all instances.
+    _transform_cache: MemoryCache = None
+
     def __init__(self):
         self.scheduler: Scheduler = None
+        self.job: Job = None
 
     async def coro_transform(
         self, params: TFParams, on_progress: Callable[[int, int], None]
@@ -77,23 +114,66 @@ class MPHandler:
         :param on_progress: progress callback
         :return: list containing the output from each process
         """
-        self.stop()
-        self.scheduler = Scheduler(
-            progress_callback=on_progress,
-            raise_exceptions=True,
-            capture_stdout=True,
-            only_threads=self.only_threads,
-        )
-
         signals: Signals = params.signals
         params.remove_signals()  # Don't want to pass large unneeded object to other process.
 
-        return await self.scheduler.map(
+        memory = self.transform_cache()
+
+        def key(signal: ndarray, name: str, start: Optional[float]) -> str:
+            return result_key(
+                "time_frequency",
+                params.get_item("implementation"),
+                [signal],
+                params.fs,
+                params.transform_items(),
+                params.transform,
+                name,
+                start,
+            )
+
+        # If the x-limits are set and the original data has already been transformed,
+        # the transform is cropped instead of being recalculated.
+        cropped = {}
+        if params.allows_crop():
+            original_keys = await _in_thread(
+                lambda: {
+                    index: key(
+                        time_series.original_signal,
+                        time_series.name,
+                        float(time_series.original_times[0]),
+                    )
+                    for index, time_series in enumerate(signals)
+                    if time_series.crop is not None
+                }
+            )
+            for index, original_key in original_keys.items():
+                original = memory.get(original_key)
+                if original is not None:
+                    cropped[index] = _crop_transform(original, signals[index])
+
+        remaining = [
+            time_series
+            for index, time_series in enumerate(signals)
+            if index not in cropped
+        ]
+        keys = await _in_thread(
+            lambda: [key(t.signal, *_series_id(t)) for t in remaining]
+        )
+        results = await self._map(
             target=_time_frequency,
-            args=[(time_series, params, True) for time_series in signals],
-            process_type=mp.Process,
-            queue_type=mp.Queue,
+            args=[(time_series, params, True) for time_series in remaining],
+            on_progress=on_progress,
+            keys=keys,
+            memory=memory,
         )
+        if remaining and not results:
+            return []  # Cancelled.
+
+        results = iter(results)
+        return [
+            cropped[index] if index in cropped else next(results)
+            for index in range(len(signals))
+        ]
 
     async def coro_harmonics(
         self,
@@ -114,19 +194,20 @@ class MPHandler:
         # Whether to parallelize the algorithm for each calculation.
         parallel = len(signals) < Scheduler.optimal_process_count()
 
-        self.stop()
-        self.scheduler = Scheduler(
-            progress_callback=on_progress,
-            raise_exceptions=True,
-            capture_stdout=True,
-            only_threads=self.only_threads,
-        )
-
         args = [
-            (preprocess, sig.signal, params, *params.args(), parallel, params.crop,)
+            (
+                preprocess,
+                sig.signal,
+                params,
+                *params.args(),
+                parallel,
+                params.crop,
+            )
             for sig in signals
         ]
-        return await self.scheduler.map(target=harmonic_wrapper, args=args)
+        return await self._map(
+            target=harmonic_wrapper, args=args, on_progress=on_progress
+        )
 
     async def coro_phase_coherence(
         self,
@@ -137,26 +218,119 @@ class MPHandler:
         """
         Performs wavelet phase coherence between signal pairs. Used in "wavelet phase coherence".
 
+        The phase coherence of each pair is calculated first. Then the phase coherence between
+        the first signal of each pair and its surrogates is calculated in batches, which are shared
+        between all the workers in the pool. The wavelet transform of each first signal is written
+        to shared memory once, rather than being sent to every batch. Each batch generates its own
+        surrogates from a separate seed, so the surrogates are never sent between processes.
+
         :param signals: the pairs of signals
         :param params: the parameters which are used in the algorithm
         :param on_progress: progress callback
-        :return: list containing the output from each process
+        :return: list containing the pair of signals, time-localised phase coherence, phase coherence,
+        phase difference and average surrogate phase coherence for each pair
         """
-        self.stop()
-        self.scheduler = Scheduler(
-            progress_callback=on_progress,
-            raise_exceptions=True,
-            capture_stdout=True,
-            only_threads=self.only_threads,
+        pairs = signals.get_pairs()
+        keys = await _in_thread(
+            lambda: [
+                result_key(
+                    "phase_coherence",
+                    params.get_item("implementation"),
+                    [s1.signal, s2.signal],
+                    params.fs,
+                    params.get(),
+                    params.surr_count or 0,
+                    params.surr_method,
+                    params.surr_preproc,
+                )
+                for s1, s2 in pairs
+            ]
         )
 
-        return await self.scheduler.map(
-            target=_phase_coherence,
-            args=[(pair, params) for pair in signals.get_pairs()],
-            subtasks=params.surr_count,
-            process_type=mp.Process,
-            queue_type=mp.Queue,
-        )
+        async def calculate(indices: List[int]) -> List[Tuple]:
+            return await self._phase_coherence(
+                [pairs[i] for i in indices], params, on_progress
+            )
+
+        results = await self._cached(keys, calculate)
+        return [(pair, *result) for pair, result in zip(pairs, results)]
+
+    async def _phase_coherence(
+        self,
+        pairs: List[Tuple[TimeSeries, TimeSeries]],
+        params: PCParams,
+        on_progress: Callable[[int, int], None],
+    ) -> List[Tuple]:
+        """
+        Performs wavelet phase coherence between signal pairs. See `coro_phase_coherence()`.
+
+        :return: list containing the time-localised phase coherence, phase coherence,
+        phase difference and average surrogate phase coherence for each pair
+        """
+        surr_count = params.surr_count or 0
+
+        # Split the surrogates into roughly one batch per worker.
+        workers = Scheduler.optimal_process_count()
+        batch_size = max(1, math.ceil(surr_count * len(pairs) / workers))
+        batch_count = len(pairs) * math.ceil(surr_count / batch_size)
+
+        directory = shared_directory()
+
+        def share(arr: ndarray) -> Union[SharedArray, ndarray]:
+            return SharedArray.create(arr, directory) or arr
+
+        try:
+            wt_shared = [
+                (share(s1.output_data.values), share(s2.output_data.values))
+                for s1, s2 in pairs
+            ]
+
+            results = await self._map(
+                target=_phase_coherence,
+                args=[
+                    (wt1, wt2, s1.output_data.freq, params)
+                    for (wt1, wt2), (s1, _) in zip(wt_shared, pairs)
+                ],
+                on_progress=lambda c, t: on_progress(c, t + batch_count),
+            )
+            if not results:
+                return []  # Cancelled.
+
+            # Independent seeds, so that the batches do not generate the same surrogates.
+            seeds = iter(np.random.SeedSequence().spawn(batch_count))
+
+            args = []
+            batch_pairs = []
+            for index, (s1, _) in enumerate(pairs):
+                if not surr_count:
+                    break
+
+                signal = share(s1.signal)
+                for start in range(0, surr_count, batch_size):
+                    count = min(batch_size, surr_count - start)
+                    seed = next(seeds)
+
+                    args.append((wt_shared[index][0], signal, count, seed, params))
+                    batch_pairs.append(index)
+
+            surr_sums = await self._map(
+                target=_surrogate_coherence,
+                args=args,
+                on_progress=lambda c, t: on_progress(len(pairs) + c, len(pairs) + t),
+            )
+            if args and not surr_sums:
+                return []  # Cancelled.
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        out = []
+        for index, (tpc, pc, pdiff) in enumerate(results):
+            sums = [s for s, i in zip(surr_sums, batch_pairs) if i == index]
+            tpc_surr = sum(sums) / surr_count if sums else []
+
+            out.append((tpc, pc, pdiff, tpc_surr))
+
+        return out
 
     async def coro_ridge_extraction(
         self, params: REParams, on_progress: Callable[[int, int], None]
@@ -168,33 +342,37 @@ class MPHandler:
         :param on_progress: progress callback
         :return: list containing the output from each process
         """
-        self.stop()
-        self.scheduler = Scheduler(
-            progress_callback=on_progress,
-            raise_exceptions=True,
-            capture_stdout=True,
-            only_threads=self.only_threads,
-        )
-
         signals = params.signals
-        num_transforms = len(signals)
-        intervals = params.intervals
-
-        for i in range(num_transforms):
-            for j in range(len(intervals)):
-                fmin, fmax = intervals[j]
+        params.remove_signals()  # Don't want to pass large unneeded object to other process.
 
-                params.set_item(_fmin, fmin)
-                params.set_item(_fmax, fmax)
+        intervals = params.intervals
 
-                self.scheduler.add(
-                    target=_ridge_extraction,
-                    args=(signals[i], params),
-                    process_type=mp.Process,
-                    queue_type=mp.Queue,
+        args = []
+        for s in signals:
+            for fmin, fmax in intervals:
+                # Each task needs its own copy, because the tasks may be sent to workers later.
+                p = copy.deepcopy(params)
+                p.set_item(_fmin, fmin)
+                p.set_item(_fmax, fmax)
+
+                args.append((s, p))
+
+        keys = await _in_thread(
+            lambda: [
+                result_key(
+                    "ridge_extraction",
+                    "matlab",
+                    [s.signal],
+                    p.fs,
+                    p.get(),
+                    *_series_id(s),
                 )
-
-        return await self.scheduler.run()
+                for s, p in args
+            ]
+        )
+        return await self._map(
+            target=_ridge_extraction, args=args, on_progress=on_progress, keys=keys
+        )
 
     async def coro_bandpass_filter(
         self,
@@ -210,26 +388,15 @@ class MPHandler:
         :param on_progress: progress callback
         :return: list containing the output from each process
         """
-        self.stop()
-        self.scheduler = Scheduler(
-            progress_callback=on_progress,
-            raise_exceptions=True,
-            capture_stdout=True,
-            only_threads=self.only_threads,
-        )
-
+        args = []
         for s in signals:
             fs = s.frequency
-            for i in range(len(intervals)):
-                fmin, fmax = intervals[i]
-                self.scheduler.add(
-                    target=_bandpass_filter,
-                    args=(s, fmin, fmax, fs),
-                    process_type=mp.Process,
-                    queue_type=mp.Queue,
-                )
+            for fmin, fmax in intervals:
+                args.append((s, fmin, fmax, fs))
 
-        return await self.scheduler.run()
+        return await self._map(
+            target=_bandpass_filter, args=args, on_progress=on_progress
+        )
 
     async def coro_bayesian(
         self,
@@ -245,24 +412,26 @@ class MPHandler:
         :param on_progress: progress callback
         :return: list containing the output from each process
         """
-        self.stop()
-        self.scheduler = Scheduler(
-            progress_callback=on_progress,
-            raise_exceptions=True,
-            capture_stdout=True,
-            only_threads=self.only_threads,
-        )
-
-        for params in paramsets:
-            for pair in signals.get_pairs():
-                self.scheduler.add(
-                    target=_dynamic_bayesian_inference,
-                    args=(*pair, params),
-                    process_type=mp.Process,
-                    queue_type=mp.Queue,
+        args = [(*pair, params) for params in paramsets for pair in signals.get_pairs()]
+        keys = await _in_thread(
+            lambda: [
+                result_key(
+                    "bayesian_inference",
+                    "python",
+                    [s1.signal, s2.signal],
+                    s1.frequency,
+                    vars(params),
+                    *_series_id(s1),
                 )
-
-        return await self.scheduler.run()
+                for s1, s2, params in args
+            ]
+        )
+        return await self._map(
+            target=_dynamic_bayesian_inference,
+            args=args,
+            on_progress=on_progress,
+            keys=keys,
+        )
 
     async def coro_bispectrum_analysis(
         self,
@@ -274,59 +443,162 @@ class MPHandler:
         Performs wavelet bispectrum analysis on signal pairs.
         Used in "wavelet bispectrum analysis".
 
+        The bispectra of each pair are calculated in separate tasks, followed by the bispectra of
+        each surrogate. Each worker initialises the MATLAB package once and reuses it for all of
+        its tasks. The surrogate bispectra are reduced to significance thresholds as they are
+        received, so they are never stored together.
+
         :param signals: the signal pairs
         :param params: the parameters to use in the algorithm
         :param on_progress: progress callback
-        :return: list containing the output from each process
+        :return: list containing the output for each pair
         """
-        self.stop()
-        self.scheduler = Scheduler(
-            progress_callback=on_progress,
-            raise_exceptions=True,
-            capture_stdout=True,
-            only_threads=self.only_threads,
+        pairs = signals.get_pairs()
+        keys = await _in_thread(
+            lambda: [
+                result_key(
+                    "bispectrum_analysis",
+                    params.implementation,
+                    [s1.signal, s2.signal],
+                    params.fs,
+                    _bispectrum_params(params),
+                    params.preprocess,
+                    params.surr_count or 0,
+                    params.alpha or 0.05,
+                    *_series_id(s1),
+                )
+                for s1, s2 in pairs
+            ]
         )
 
-        return await self.scheduler.map(
-            target=_bispectrum_analysis,
-            args=[(*pair, params) for pair in signals.get_pairs()],
-            subtasks=4,
-            process_type=mp.Process,
-            queue_type=mp.Queue,
+        async def calculate(indices: List[int]) -> List[Tuple]:
+            return await self._bispectrum_analysis(
+                [pairs[i] for i in indices], params, on_progress
+            )
+
+        return await self._cached(keys, calculate)
+
+    async def _bispectrum_analysis(
+        self,
+        pairs: List[Tuple[TimeSeries, TimeSeries]],
+        params: BAParams,
+        on_progress: Callable[[int, int], None],
+    ) -> List[Tuple]:
+        """
+        Performs wavelet bispectrum analysis on signal pairs. See `coro_bispectrum_analysis()`.
+        """
+        fs = params.fs
+        surr_count = params.surr_count or 0
+        alpha = params.alpha or 0.05
+        bisp_params = _bispectrum_params(params)
+        impl = params.implementation
+
+        unique = [_unique_signals(s1.signal, s2.signal) for s1, s2 in pairs]
+
+        # The bispectra b111, b222, b122 and b211 of each unique pair, or only b111 for a
+        # single signal. The wavelet transforms are returned by one task for each pair.
+        args = []
+        bisp_pairs = []
+        for index, (s1, s2) in enumerate(pairs):
+            x, p = s1.signal, s2.signal
+
+            if unique[index]:
+                args += [
+                    (x, x, fs, bisp_params, impl, False),
+                    (p, p, fs, bisp_params, impl, False),
+                    (x, p, fs, bisp_params, impl, True),
+                    (p, x, fs, bisp_params, impl, False),
+                ]
+                bisp_pairs += [index] * 4
+            else:
+                args.append((x, x, fs, bisp_params, impl, True, params.preprocess))
+                bisp_pairs.append(index)
+
+        surr_args = [
+            (s1.signal, s2.signal, fs, bisp_params, impl, unique[index])
+            for index, (s1, s2) in enumerate(pairs)
+            for _ in range(surr_count)
+        ]
+
+        results = await self._map(
+            target=_bispectrum,
+            args=args,
+            on_progress=lambda c, t: on_progress(c, t + len(surr_args)),
+        )
+        if not results:
+            return []  # Cancelled.
+
+        bispectra = [[] for _ in pairs]
+        transforms = [None for _ in pairs]
+        for index, result in zip(bisp_pairs, results):
+            if isinstance(result, tuple):
+                bisp, transforms[index] = result[0], result[1:]
+            else:
+                bisp = result
+
+            bispectra[index].append(bisp)
+
+        thresholds = [
+            [SurrogateThreshold(b.shape, surr_count, alpha) for b in bispectra[index]]
+            for index in range(len(pairs))
+        ]
+
+        def on_result(
+            task: int, surr_bispectra: Union[Tuple[ndarray, ...], ndarray]
+        ) -> None:
+            if not isinstance(surr_bispectra, tuple):
+                surr_bispectra = (
+                    surr_bispectra,
+                )  # A single item is unpacked by the worker.
+
+            for t, b in zip(thresholds[task // surr_count], surr_bispectra):
+                t.add(b)
+
+        surr_results = await self._map(
+            target=_surrogate_bispectra,
+            args=surr_args,
+            on_progress=lambda c, t: on_progress(len(args) + c, len(args) + t),
+            on_result=on_result,
         )
+        if surr_args and not surr_results:
+            return []  # Cancelled.
+
+        return [
+            _bispectrum_output(
+                s1.name,
+                bispectra[index],
+                transforms[index],
+                [t.threshold() for t in thresholds[index]],
+            )
+            for index, (s1, _) in enumerate(pairs)
+        ]
 
     async def coro_biphase(
         self,
         signals: SignalPairs,
         fs: float,
         f0: float,
-        fr: Tuple[float, float],
+        points: List[Tuple[float, float]],
         on_progress: Callable[[int, int], None],
     ) -> List[Tuple]:
         """
         Calculates biphase and biamplitude. Used in "wavelet bispectrum analysis".
 
+        All points for a signal pair are calculated in one task, which reuses the
+        wavelet transforms for every point.
+
         :param signals: the signal pairs
         :param fs: the sampling frequency
         :param f0: the resolution
-        :param fr: 'x' and 'y' frequencies
+        :param points: list containing the 'x' and 'y' frequencies of each point
         :param on_progress: progress callback
         :return: list containing the output from each process
         """
-        self.stop()
-        self.scheduler = Scheduler(
-            progress_callback=on_progress,
-            raise_exceptions=True,
-            capture_stdout=True,
-            only_threads=self.only_threads,
-        )
-
         args = [
-            (s1, s2, fs, f0, fr, s1.output_data.opt) for s1, s2 in signals.get_pairs()
+            (s1, s2, fs, f0, points, s1.output_data.opt)
+            for s1, s2 in signals.get_pairs()
         ]
-        return await self.scheduler.map(
-            target=_biphase, args=args, process_type=mp.Process, queue_type=mp.Queue
-        )
+        return await self._map(target=_biphase, args=args, on_progress=on_progress)
 
     async def coro_group_coherence(
         self,
@@ -336,7 +608,7 @@ class MPHandler:
         percentile: Optional[float],
         on_progress: Callable[[int, int], None],
         *args,
-        **kwargs
+        **kwargs,
     ) -> List[Tuple]:
         """
         Calculates group coherence.
@@ -368,26 +640,21 @@ class MPHandler:
             [3D array] The surrogates for group 1.
 
         """
-        self.stop()
-        self.scheduler = Scheduler(
-            progress_callback=on_progress,
-            raise_exceptions=True,
-            capture_stdout=True,
-            only_threads=self.only_threads,
-        )
-
-        return await self.scheduler.map(
+        # Memory-mapped groups are sent to the worker as their location in the file.
+        return await self._map(
             target=functools.partial(
-                pymodalib.group_coherence,
-                sig1a,
-                sig1b,
+                _group_coherence,
+                map_array(sig1a),
+                map_array(sig1b),
                 fs,
                 percentile,
-                True,
                 *args,
                 **kwargs,
             ),
-            args=[tuple(),],
+            args=[
+                tuple(),
+            ],
+            on_progress=on_progress,
         )
 
     async def coro_dual_group_coherence(
@@ -400,7 +667,7 @@ class MPHandler:
         percentile: Optional[float],
         on_progress: Callable[[int, int], None],
         *args,
-        **kwargs
+        **kwargs,
     ) -> List[Tuple]:
         """
         Calculates group coherence.
@@ -440,27 +707,22 @@ class MPHandler:
             [3D array] The surrogates for group 2.
 
         """
-        self.stop()
-        self.scheduler = Scheduler(
-            progress_callback=on_progress,
-            raise_exceptions=True,
-            capture_stdout=True,
-            only_threads=self.only_threads,
-        )
-
-        return await self.scheduler.map(
+        return await self._map(
             target=functools.partial(
-                pymodalib.dual_group_coherence,
-                sig1a,
-                sig1b,
-                sig2a,
-                sig2b,
+                _dual_group_coherence,
+                map_array(sig1a),
+                map_array(sig1b),
+                map_array(sig2a),
+                map_array(sig2b),
                 fs,
                 percentile,
                 *args,
                 **kwargs,
             ),
-            args=[tuple(),],
+            args=[
+                tuple(),
+            ],
+            on_progress=on_progress,
         )
 
     async def coro_statistical_test(
@@ -492,20 +754,20 @@ class MPHandler:
         pvalues : Dict[Tuple[float, float], float]
             A list containing the p-values for each frequency band.
         """
-        self.stop()
-        self.scheduler = Scheduler(
-            run_in_thread=self.should_run_in_thread,
-            progress_callback=on_progress,
-            raise_exceptions=True,
-            capture_stdout=True,
-            only_threads=self.only_threads,
-        )
-
         from pymodalib.algorithms.group_coherence import statistical_test
 
         results = (
-            await self.scheduler.map(
-                target=statistical_test, args=[(freq, coh1, coh2, bands,)],
+            await self._map(
+                target=statistical_test,
+                args=[
+                    (
+                        freq,
+                        coh1,
+                        coh2,
+                        bands,
+                    )
+                ],
+                on_progress=on_progress,
             )
         )[0]
 
@@ -522,31 +784,199 @@ class MPHandler:
         :param fmax: the maximum frequency
         :return: list containing the output from each process
         """
-        self.stop()
-        self.scheduler = Scheduler(
-            run_in_thread=True,
-            raise_exceptions=True,
-            capture_stdout=True,
-            only_threads=self.only_threads,
-        )
-
         if isinstance(signals, TimeSeries):
             signals = [signals]
 
         args = [(s.signal, s.frequency, fmin, fmax) for s in signals]
-        return await self.scheduler.map(
-            target=pymodalib.preprocess,
-            args=args,
-            process_type=mp.Process,
-            queue_type=mp.Queue,
-        )
+        return await self._map(target=pymodalib.preprocess, args=args)
+
+    async def _map(
+        self,
+        target: Callable,
+        args: List[Tuple],
+        on_progress: Callable[[int, int], None] = None,
+        subtasks: int = 0,
+        on_result: Callable[[int, Any], None] = None,
+        keys: List[str] = None,
+        memory: MemoryCache = None,
+    ) -> List[Tuple]:
+        """
+        Stops any tasks in progress, then runs the target function once for each tuple of arguments
+        using the shared worker pool.
+
+        :param target: the function to run in a worker
+        :param args: list containing the arguments for each task, as a tuple
+        :param on_progress: progress callback
+        :param subtasks: the number of processes that each task may start itself
+        :param on_result: function called with the index and output of each task as soon as it
+        finishes; if set, the outputs are not stored, and the returned list only contains None
+        :param keys: list containing the key of each task's output in the `ResultCache` (see `result_key()`);
+        if set, outputs are loaded from the cache when possible, and the other outputs are saved to it
+        :param memory: the memory cache in which to keep the outputs, as well as the `ResultCache`
+        :return: list containing the output from each task
+        """
+        self.stop()
+
+        if keys is not None:
+
+            async def calculate(indices: List[int]) -> List[Tuple]:
+                return await self._map(
+                    target=target,
+                    args=[args[i] for i in indices],
+                    on_progress=on_progress,
+                    subtasks=subtasks,
+                )
+
+            return await self._cached(keys, calculate, memory)
+
+        if self.only_threads:
+            self.scheduler = Scheduler(
+                progress_callback=on_progress,
+                raise_exceptions=True,
+                capture_stdout=True,
+                only_threads=True,
+            )
+            results = await self.scheduler.map(
+                target=target,
+                args=args,
+                subtasks=subtasks,
+                process_type=mp.Process,
+                queue_type=mp.Queue,
+            )
+            if on_result:
+                for index, result in enumerate(results):
+                    on_result(index, result)
+                    results[index] = None
+
+            return results
+
+        pool = self.pool()
+        self.job = pool.submit(target, args, on_progress, subtasks, on_result)
+        return await pool.wait(self.job)
+
+    async def _cached(
+        self,
+        keys: List[str],
+        calculate: Callable[[List[int]], Awaitable[List]],
+        memory: MemoryCache = None,
+    ) -> List:
+        """
+        Loads the results from the `ResultCache`, calculating and saving those which are not cached.
+        The results are read and written in a separate thread, so that the GUI does not freeze.
+
+        :param keys: the key of each result
+        :param calculate: coroutine function which takes the indices of the results which are not cached,
+        and returns a list containing those results
+        :param memory: the memory cache to check before the `ResultCache`, and to add the results to
+        :return: list containing every result, or an empty list if the calculation was cancelled
+        """
+        cache = self.result_cache()
+
+        results = [memory.get(key) if memory else None for key in keys]
+        unloaded = [index for index, result in enumerate(results) if result is None]
+
+        loaded = await _in_thread(lambda: [cache.get(keys[i]) for i in unloaded])
+        for index, result in zip(unloaded, loaded):
+            results[index] = result
+            if result is not None and memory:
+                memory.set(keys[index], result)
+
+        missing = [index for index, result in enumerate(results) if result is None]
+
+        if len(missing) < len(keys):
+            print(f"Loaded {len(keys) - len(missing)} result(s) from the cache.")
+
+        if not missing:
+            return results
+
+        calculated = await calculate(missing)
+        if not calculated:
+            return []  # Cancelled.
+
+        for index, result in zip(missing, calculated):
+            results[index] = result
+            if memory:
+                memory.set(keys[index], result)
+
+        def save() -> None:
+            for index, result in zip(missing, calculated):
+                cache.set(keys[index], result)
+
+        # The results are returned without waiting for them to be saved.
+        asyncio.get_event_loop().run_in_executor(None, save)
+
+        return results
+
+    @classmethod
+    def result_cache(cls) -> ResultCache:
+        """
+        Returns the result cache shared by all MPHandler instances, creating it if necessary.
+        """
+        if cls._result_cache is None:
+            cls._result_cache = ResultCache()
+
+        return cls._result_cache
+
+    @classmethod
+    def transform_cache(cls) -> MemoryCache:
+        """
+        Returns the memory cache of transforms shared by all MPHandler instances, creating it if necessary.
+        """
+        if cls._transform_cache is None:
+            cls._transform_cache = MemoryCache()
+
+        return cls._transform_cache
+
+    @classmethod
+    def pool(cls) -> WorkerPool:
+        """
+        Returns the worker pool shared by all MPHandler instances, creating it if necessary.
+        """
+        if cls._pool is None or cls._pool.closed:
+            cls._pool = WorkerPool()
+
+        return cls._pool
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """
+        Stops the shared worker pool. Should only be called when the application exits.
+        """
+        if cls._pool:
+            cls._pool.shutdown()
+            cls._pool = None
 
     def stop(self):
         """
         Stops the tasks in progress. The MPHandler instance can be reused.
+
+        Only the tasks started by this instance are stopped; the worker pool stays alive.
         """
         if self.scheduler:
             self.scheduler.terminate()
+            self.scheduler = None
+
+        if self.job:
+            self.pool().cancel(self.job)
+            self.job = None
+
+
+async def _in_thread(function: Callable[[], Any]) -> Any:
+    """
+    Runs a function in a separate thread, so that the GUI does not freeze while it runs.
+    Used to hash signals and to read and write the `ResultCache`.
+    """
+    return await asyncio.get_event_loop().run_in_executor(None, function)
+
+
+def _series_id(time_series: TimeSeries) -> Tuple[str, Optional[float]]:
+    """
+    Returns the name of a signal and its first time value, which are part of the results of some
+    analyses but not part of the signal's data.
+    """
+    times = time_series.times
+    start = float(times[0]) if times is not None and len(times) else None
+    return time_series.name, start
 
 
 def harmonic_wrapper(preprocess, signal, params, *args, **kwargs):
@@ -0,0 +1,293 @@
+#  PyMODA, a Python implementation of MODA (Multiscale Oscillatory Dynamics Analysis).
+#  Copyright (C) 2019 Lancaster University
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program. If not, see <https://www.gnu.org/licenses/>.
+import mmap
+import os
+import shutil
+import tempfile
+from typing import Any, Optional, Tuple
+
+import numpy as np
+from numpy import ndarray
+
+"""
+Transport for large Numpy arrays between processes.
+
+Sending an array through a queue pickles it in the worker, copies it through a pipe
+and unpickles it in the main process. Instead, a worker writes each large array into a
+memory-mapped file once, and sends a small `SharedArray` which the main process opens
+as a view of the same memory.
+
+`multiprocessing.shared_memory` requires Python 3.8, so memory-mapped files are used.
+On Linux, the files are created in "/dev/shm", which is backed by memory rather than disk.
+
+Arrays which are already memory-mapped from a file, such as signals loaded from a .npy file,
+do not need to be copied at all: a `MappedArray` refers to their location in the file.
+"""
+
+
+class SharedArray:
+    """
+    A picklable reference to a Numpy array stored in a memory-mapped file.
+    """
+
+    def __init__(self, filename: str, shape: Tuple[int, ...], dtype: str, order: str):
+        self.filename = filename
+        self.shape = shape
+        self.dtype = dtype
+        self.order = order
+
+    @staticmethod
+    def create(arr: ndarray, directory: str) -> Optional["SharedArray"]:
+        """
+        Copies an array into a new memory-mapped file.
+
+        :param arr: the array to copy
+        :param directory: the directory in which to create the file
+        :return: the reference to the file, or None if there is not enough space to create it
+        """
+        try:
+            if shutil.disk_usage(directory).free < 2 * arr.nbytes:
+                # Writing to a memory-mapped file without enough space crashes the process.
+                return None
+        except OSError:
+            return None
+
+        order = "F" if arr.flags.f_contiguous and not arr.flags.c_contiguous else "C"
+
+        fd, filename = tempfile.mkstemp(suffix=".dat", dir=directory)
+        os.close(fd)
+
+        mm = np.memmap(
+            filename, dtype=arr.dtype, mode="w+", shape=arr.shape, order=order
+        )
+        mm[...] = arr
+        mm.flush()
+        del mm
+
+        return SharedArray(filename, arr.shape, arr.dtype.str, order)
+
+    def open(self) -> ndarray:
+        """
+        Opens the array in the current process, without copying the data.
+
+        The file is removed immediately, so it will be freed when the returned array is
+        garbage-collected. On Windows, files cannot be removed while they are open;
+        they are removed when the worker pool is shut down instead.
+        """
+        mm = np.memmap(
+            self.filename,
+            dtype=self.dtype,
+            mode="r+",
+            shape=self.shape,
+            order=self.order,
+        )
+        self.release()
+
+        # Return a plain Numpy array, which still refers to the mapped memory.
+        return mm.view(ndarray)
+
+    def view(self) -> ndarray:
+        """
+        Opens the array as a read-only view, without removing the file. Used when the same array
+        is read by several tasks; the file must be removed by its owner afterwards.
+        """
+        mm = np.memmap(
+            self.filename,
+            dtype=self.dtype,
+            mode="r",
+            shape=self.shape,
+            order=self.order,
+        )
+        return mm.view(ndarray)
+
+    def release(self) -> None:
+        """
+        Removes the file without opening it, e.g. if the result is no longer needed.
+        """
+        try:
+            os.remove(self.filename)
+        except OSError:
+            pass
+
+
+class MappedArray:
+    """
+    A picklable reference to a Numpy array which is a view of a memory-mapped file, e.g. a row of
+    signals loaded with `np.load(..., mmap_mode=...)`. Pickling the reference sends the location
+    of the data in the file, instead of the data.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        offset: int,
+        shape: Tuple[int, ...],
+        strides: Tuple[int, ...],
+        dtype: str,
+    ):
+        self.filename = filename
+        self.offset = offset
+        self.shape = shape
+        self.strides = strides
+        self.dtype = dtype
+
+    @staticmethod
+    def from_view(arr: ndarray) -> Optional["MappedArray"]:
+        """
+        Creates a reference to an array, if it is a view of a memory-mapped file.
+
+        :param arr: the array
+        :return: the reference, or None if the array is not a view of a memory-mapped file
+        """
+        if not isinstance(arr, np.memmap) or arr.size == 0:
+            return None
+
+        # Find the array which was created by `np.memmap`; its base is the mmap object.
+        root = arr
+        while isinstance(root.base, ndarray):
+            root = root.base
+
+        if not isinstance(root, np.memmap) or not isinstance(root.base, mmap.mmap):
+            return None
+
+        filename = getattr(root, "filename", None)
+        if not filename or root.offset is None:
+            return None
+
+        delta = _address(arr) - _address(root)
+        return MappedArray(
+            filename, root.offset + delta, arr.shape, arr.strides, arr.dtype.str
+        )
+
+    def open(self) -> ndarray:
+        """
+        Opens the array in the current process. The file is opened in copy-on-write mode,
+        so the array can be modified without modifying the file.
+        """
+        dtype = np.dtype(self.dtype)
+
+        # Size of the region of the file which contains the array.
+        extent = dtype.itemsize + sum(
+            (n - 1) * abs(s) for n, s in zip(self.shape, self.strides)
+        )
+        low = self.offset + sum(
+            (n - 1) * s for n, s in zip(self.shape, self.strides) if s < 0
+        )
+
+        mm = np.memmap(
+            self.filename, dtype=np.uint8, mode="c", offset=low, shape=(extent,)
+        )
+        return np.ndarray(
+            self.shape,
+            dtype=dtype,
+            buffer=mm,
+            offset=self.offset - low,
+            strides=self.strides,
+        )
+
+
+def _address(arr: ndarray) -> int:
+    return arr.__array_interface__["data"][0]
+
+
+def shared_directory() -> str:
+    """
+    Creates a new directory for memory-mapped files, preferably in memory.
+    """
+    parent = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+    try:
+        return tempfile.mkdtemp(prefix="pymoda-", dir=parent)
+    except OSError:
+        return tempfile.mkdtemp(prefix="pymoda-")
+
+
+def as_array(item: Any) -> Any:
+    """
+    Returns a read-only view of the data if the item is a `SharedArray`, opens the array if the
+    item is a `MappedArray`, and otherwise returns the item.
+    """
+    if isinstance(item, SharedArray):
+        return item.view()
+    elif isinstance(item, MappedArray):
+        return item.open()
+
+    return item
+
+
+def map_array(arr: Any) -> Any:
+    """
+    Returns a `MappedArray` referring to an array if it is a view of a memory-mapped file,
+    so that it can be sent to another process without copying it; otherwise returns the array.
+    """
+    if isinstance(arr, ndarray):
+        return MappedArray.from_view(arr) or arr
+
+    return arr
+
+
+def share_arrays(result: Any, directory: str, threshold: int) -> Any:
+    """
+    Replaces each large Numpy array in a result with a `SharedArray`. Only the result itself,
+    or the items of a result tuple, are checked; arrays nested more deeply are sent normally.
+
+    :param result: the result of a task
+    :param directory: the directory in which to create the files
+    :param threshold: the minimum size of an array to share, in bytes
+    :return: the result, with the large arrays replaced
+    """
+
+    def share(item: Any) -> Any:
+        if (
+            isinstance(item, ndarray)
+            and item.nbytes >= threshold
+            and not item.dtype.hasobject
+        ):
+            return SharedArray.create(item, directory) or item
+
+        return item
+
+    if isinstance(result, tuple):
+        return tuple([share(item) for item in result])
+
+    return share(result)
+
+
+def open_arrays(result: Any) -> Any:
+    """
+    Reverses `share_arrays()`, replacing each `SharedArray` with a view of its data.
+    """
+
+    def _open(item: Any) -> Any:
+        if isinstance(item, SharedArray):
+            return item.open()
+
+        return item
+
+    if isinstance(result, tuple):
+        return tuple([_open(item) for item in result])
+
+    return _open(result)
+
+
+def release_arrays(result: Any) -> None:
+    """
+    Removes the files for each `SharedArray` in a result which will not be used.
+    """
+    items = result if isinstance(result, tuple) else (result,)
+    for item in items:
+        if isinstance(item, SharedArray):
+            item.release()
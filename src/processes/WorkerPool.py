@@ -0,0 +1,487 @@
+#  PyMODA, a Python implementation of MODA (Multiscale Oscillatory Dynamics Analysis).
+#  Copyright (C) 2019 Lancaster University
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program. If not, see <https://www.gnu.org/licenses/>.
+import asyncio
+import atexit
+import itertools
+import logging
+import queue
+import shutil
+import sys
+import time
+import traceback
+from collections import deque
+from typing import Callable, List, Optional, Any, Deque, Dict, Iterable, Tuple
+
+import multiprocess as mp
+from scheduler.Scheduler import Scheduler
+from scheduler.utils import TaskFailedException, terminate_tree
+
+from processes.SharedArray import (
+    shared_directory,
+    share_arrays,
+    open_arrays,
+    release_arrays,
+)
+
+"""
+A pool of long-lived worker processes which can run tasks from many jobs.
+
+Unlike `Scheduler`, which starts a new process for every task, the workers in
+the pool stay alive between jobs. Each worker keeps its imported modules and
+any initialised state (such as MATLAB Runtime packages), so short calculations
+do not pay the cost of starting a process and importing PyMODAlib every time.
+
+Large arrays in the results are returned through memory-mapped files rather than
+through the queues (see `SharedArray`).
+"""
+
+# Types of message sent from a worker to the main process.
+_RESULT = "result"
+_ERROR = "error"
+_STDOUT = "stdout"
+
+
+class Job:
+    """
+    A group of tasks submitted to the pool together, e.g. the wavelet transform of every signal.
+    The results are returned in the same order as the tasks were submitted.
+    """
+
+    def __init__(
+        self,
+        job_id: int,
+        count: int,
+        subtasks: int,
+        progress_callback: Optional[Callable[[int, int], None]],
+        result_callback: Optional[Callable[[int, Any], None]] = None,
+    ):
+        self.id = job_id
+        self.output: List[Any] = [None for _ in range(count)]
+
+        # Each task is weighted by the number of processes it may start itself, like in `Scheduler`.
+        self.weight: int = 1 + subtasks
+        self.total: int = count * self.weight
+
+        self.remaining: int = count
+        self.completed: int = 0
+
+        self.progress_callback = progress_callback
+
+        # If set, each result is passed to this function as soon as it is received
+        # instead of being stored, so that large results can be reduced one at a time.
+        self.result_callback = result_callback
+
+        self.cancelled = False
+        self.exception_tb: Optional[str] = None
+
+    def is_finished(self) -> bool:
+        return self.cancelled or self.exception_tb is not None or self.remaining <= 0
+
+    def report_progress(self) -> None:
+        if self.progress_callback:
+            self.progress_callback(self.completed, self.total)
+
+    def on_result(self, index: int, result: Any) -> None:
+        if self.result_callback:
+            self.result_callback(index, result)
+        else:
+            self.output[index] = result
+
+        self.remaining -= 1
+        self.completed += self.weight
+        self.report_progress()
+
+
+class _Worker:
+    """
+    A single worker process, with a queue for incoming tasks and a queue for outgoing messages.
+
+    Each worker has its own queues, so that terminating one worker cannot corrupt
+    a queue which is shared with the other workers.
+    """
+
+    _ids = itertools.count()
+
+    def __init__(self, directory: str, threshold: int):
+        self.id: int = next(self._ids)
+
+        self.inbox = mp.Queue()
+        self.outbox = mp.Queue()
+
+        # The (job id, task index, weight) of the task currently being run.
+        self.task: Optional[Tuple[int, int, int]] = None
+
+        # The process cannot be daemonic, because some tasks start their own processes.
+        self.process = mp.Process(
+            target=_worker_main,
+            args=(self.inbox, self.outbox, directory, threshold),
+            daemon=False,
+        )
+        self.process.start()
+
+    def is_busy(self) -> bool:
+        return self.task is not None
+
+    def run(self, job: Job, index: int, target: Callable, args: Tuple) -> None:
+        self.task = (job.id, index, job.weight)
+        self.inbox.put((job.id, index, target, args))
+
+    def terminate(self) -> None:
+        try:
+            terminate_tree(self.process)
+        except Exception:
+            pass
+
+        for q in (self.inbox, self.outbox):
+            try:
+                q.close()
+            except Exception:
+                pass
+
+    def stop(self, timeout: float = 1) -> None:
+        """Asks the worker to exit, then terminates it if it does not exit in time."""
+        try:
+            self.inbox.put(None)
+            self.process.join(timeout)
+        except Exception:
+            pass
+
+        if self.process.is_alive():
+            self.terminate()
+
+
+class WorkerPool:
+    """
+    A long-lived pool of worker processes. Jobs are submitted with `map()`, which runs a function
+    over a list of arguments in a coroutine and returns the ordered results.
+
+    Cancelling a job with `cancel()` removes its queued tasks and replaces only the workers
+    which were running its tasks; the other workers, and the other jobs, are unaffected.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = None,
+        update_interval: float = 0.05,
+        share_threshold: int = 1_000_000,
+    ):
+        """
+        :param max_workers: the maximum number of workers; workers are started on demand up to this number
+        :param update_interval: the time between consecutive checks for results, in seconds
+        :param share_threshold: the minimum size, in bytes, of an array in a result which is
+        returned through a memory-mapped file instead of the queue
+        """
+        self.max_workers: int = max_workers or Scheduler.optimal_process_count()
+        self.update_interval = update_interval
+
+        self.share_threshold = share_threshold
+        self.shared_directory = shared_directory()
+
+        self.workers: List[_Worker] = []
+
+        # Tasks which have not been sent to a worker yet.
+        self.pending: Deque[Tuple[Job, int, Callable, Tuple]] = deque()
+        self.jobs: Dict[int, Job] = {}
+        self._job_ids = itertools.count()
+
+        self.closed = False
+        atexit.register(self.shutdown)
+
+    def submit(
+        self,
+        target: Callable,
+        args: Iterable[Tuple] = (),
+        progress_callback: Callable[[int, int], None] = None,
+        subtasks: int = 0,
+        result_callback: Callable[[int, Any], None] = None,
+    ) -> Job:
+        """
+        Submits a job which runs the target function once for each tuple of arguments.
+
+        :param target: the function to run in a worker
+        :param args: iterable containing the arguments for each task, as a tuple
+        :param progress_callback: function taking the number of finished tasks and the total number of tasks
+        :param subtasks: the number of processes that each task may start itself
+        :param result_callback: function taking the index of a task and its result, which is called when
+        each result is received; if set, the results are not stored in the job's output
+        :return: the job, which can be passed to `wait()` or `cancel()`
+        """
+        if self.closed:
+            raise RuntimeError(
+                "Cannot submit a job to a WorkerPool which has been shut down."
+            )
+
+        args = list(args)
+        job = Job(
+            next(self._job_ids), len(args), subtasks, progress_callback, result_callback
+        )
+        self.jobs[job.id] = job
+
+        for index, a in enumerate(args):
+            self.pending.append((job, index, target, a))
+
+        job.report_progress()
+        self._dispatch()
+        return job
+
+    async def wait(self, job: Job) -> List[Any]:
+        """
+        Waits for a job to finish in a coroutine.
+
+        :returns an ordered list containing the output of each task, or an empty list if the job was cancelled
+        """
+        while not job.is_finished():
+            await asyncio.sleep(self.update_interval)
+            self.update()
+
+        self.jobs.pop(job.id, None)
+
+        if job.exception_tb is not None:
+            exception = TaskFailedException(job.exception_tb)
+            logging.error(exception)
+            raise exception
+
+        if job.cancelled:
+            return []
+
+        return job.output
+
+    async def map(
+        self,
+        target: Callable,
+        args: Iterable[Tuple] = (),
+        progress_callback: Callable[[int, int], None] = None,
+        subtasks: int = 0,
+        result_callback: Callable[[int, Any], None] = None,
+    ) -> List[Any]:
+        """
+        Equivalent to calling `submit()` and then waiting for the job with `wait()`.
+        """
+        job = self.submit(target, args, progress_callback, subtasks, result_callback)
+        return await self.wait(job)
+
+    def cancel(self, job: Job) -> None:
+        """
+        Cancels a job. Its queued tasks are discarded, and the workers running its tasks are
+        replaced by new workers. Other workers keep running.
+
+        Also called when a task fails, so that the job's other tasks stop running.
+        """
+        self.jobs.pop(job.id, None)
+        if job.cancelled:
+            return
+
+        # A job which has failed or completed keeps its exception or its output.
+        if not job.is_finished():
+            job.cancelled = True
+
+        self.pending = deque(p for p in self.pending if p[0] is not job)
+
+        for w in list(self.workers):
+            if w.task and w.task[0] == job.id:
+                w.terminate()
+                self.workers.remove(w)
+                self.workers.append(self._new_worker())
+
+        self._dispatch()
+
+    def update(self) -> None:
+        """
+        Collects messages from the workers, and sends queued tasks to idle workers.
+        """
+        for w in list(self.workers):
+            if w not in self.workers:
+                continue  # Replaced while handling another worker's messages.
+
+            self._collect(w)
+
+            if w.is_busy() and not w.process.is_alive():
+                # The process died without reporting an error, e.g. due to a crash in native code.
+                self.workers.remove(w)
+
+                job = self.jobs.get(w.task[0])
+                if job and not job.is_finished():
+                    job.exception_tb = (
+                        f"Worker process exited unexpectedly "
+                        f"with exit code {w.process.exitcode}."
+                    )
+                    self.cancel(job)
+
+        self._dispatch()
+
+    def _collect(self, worker: _Worker) -> None:
+        while True:
+            try:
+                message = worker.outbox.get_nowait()
+            except (queue.Empty, OSError, ValueError):
+                break
+
+            kind, job_id, index, data = message
+            if kind == _STDOUT:
+                sys.stdout.write(data)
+                continue
+
+            worker.task = None
+            job = self.jobs.get(job_id)
+            if job is None or job.is_finished():
+                release_arrays(data)
+                continue  # The job was cancelled.
+
+            if kind == _RESULT:
+                try:
+                    job.on_result(index, open_arrays(data))
+                except Exception:
+                    # An exception in the result callback fails the job, like an exception in a task.
+                    job.exception_tb = traceback.format_exc()
+                    self.cancel(job)
+            elif kind == _ERROR:
+                job.exception_tb = data
+                self.cancel(job)
+
+    def _dispatch(self) -> None:
+        """Sends queued tasks to idle workers, starting new workers if necessary."""
+        while self.pending:
+            job, index, target, args = self.pending[0]
+
+            running = sum([w.task[2] for w in self.workers if w.is_busy()])
+            if running > 0 and running + job.weight > self.max_workers:
+                break
+
+            worker = next((w for w in self.workers if not w.is_busy()), None)
+            if worker is None:
+                if len(self.workers) >= self.max_workers:
+                    break
+
+                worker = self._new_worker()
+                self.workers.append(worker)
+
+            self.pending.popleft()
+            worker.run(job, index, target, args)
+
+    def _new_worker(self) -> _Worker:
+        return _Worker(self.shared_directory, self.share_threshold)
+
+    def shutdown(self) -> None:
+        """
+        Cancels all jobs and stops all workers. The pool cannot be used afterwards.
+        """
+        if self.closed:
+            return
+
+        self.closed = True
+        for job in list(self.jobs.values()):
+            job.cancelled = True
+
+        self.jobs.clear()
+        self.pending.clear()
+
+        for w in self.workers:
+            if w.is_busy():
+                w.terminate()
+            else:
+                w.stop()
+
+        self.workers = []
+
+        # Removes any files which were not opened, e.g. because a worker was terminated.
+        shutil.rmtree(self.shared_directory, ignore_errors=True)
+
+
+class _StdOut:
+    """
+    Replaces `sys.stdout` in a worker, sending the text to the main process.
+    """
+
+    def __init__(self, outbox, period: float = 1):
+        self.outbox = outbox
+        self.period = period
+        self.text: List[str] = []
+        self.last_update = time.time()
+
+        self.job_id = None
+        self.index = None
+
+    def write(self, text: str) -> None:
+        self.text.append(text)
+        self.update()
+
+    def update(self, force: bool = False) -> None:
+        if self.text and (force or time.time() - self.last_update > self.period):
+            out = "".join(self.text)
+            self.text = []
+            self.last_update = time.time()
+
+            if out.strip():
+                self.outbox.put((_STDOUT, self.job_id, self.index, out))
+
+    def flush(self) -> None:
+        return
+
+
+def _worker_main(inbox, outbox, directory: str, threshold: int) -> None:
+    """
+    The entry-point of a worker process. Runs tasks until it receives `None`.
+
+    :param inbox: the queue of tasks
+    :param outbox: the queue of messages for the main process
+    :param directory: the directory for memory-mapped files containing large arrays
+    :param threshold: the minimum size of an array to send in a memory-mapped file, in bytes
+    """
+    from processes.mp_utils import setup_matlab_runtime
+
+    setup_matlab_runtime()
+
+    # Import the heavy modules once, so that every task can use them immediately.
+    import numpy
+    import pymodalib
+
+    stdout = _StdOut(outbox)
+    sys.stdout = stdout
+    sys.stderr = stdout
+
+    while True:
+        item = inbox.get()
+        if item is None:
+            break
+
+        job_id, index, target, args = item
+        stdout.job_id, stdout.index = job_id, index
+
+        try:
+            result = target(*args)
+
+            # Match the behaviour of `Scheduler`, which unpacks a result containing a single item.
+            if isinstance(result, tuple) and len(result) == 1:
+                result = result[0]
+
+            result = share_arrays(result, directory, threshold)
+
+            stdout.update(force=True)
+            outbox.put((_RESULT, job_id, index, result))
+        except Exception as e:
+            stdout.update(force=True)
+
+            tb = (
+                f"{type(e)}\n"
+                + "".join(traceback.format_tb(e.__traceback__))
+                + f"\n{e}"
+            )
+            outbox.put((_ERROR, job_id, index, tb))
+
+    # Processes exit without running `atexit` handlers, so the MATLAB packages must be terminated here.
+    packages = sys.modules.get("maths.algorithms.matlabwrappers.packages")
+    if packages:
+        packages.terminate_all()
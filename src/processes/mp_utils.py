@@ -19,6 +19,7 @@ import traceback
 from timeit import default_timer as timer
 from typing import Optional
 
+from maths.algorithms.matlabwrappers import packages
 from utils import log_utils
 from utils.args import matlab_runtime
 from utils.os_utils import OS
@@ -43,6 +44,11 @@ def process(func):
         result = func(*args, **kwargs)
         print(f"Time taken to calculate result: {timer() - start:.1f} seconds.")
 
+        # Show the time saved by reusing MATLAB packages in this process, if any were used.
+        summary = packages.summary()
+        if summary:
+            print(summary)
+
         return result
 
     return wrapper
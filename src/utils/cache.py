@@ -13,11 +13,46 @@
 #
 #  You should have received a copy of the GNU General Public License
 #  along with this program. If not, see <https://www.gnu.org/licenses/>.
+import hashlib
 import os
+import pickle
 import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
 
+import numpy as np
+import pymodalib
 import scipy.io
 
+"""
+Caches for data written to disk.
+
+`Cache` saves numbered .mat files. `ResultCache` stores the results of analyses,
+addressed by a hash of everything which affects them (see `result_key()`), so a calculation
+which has already been performed with the same signals and parameters can be loaded instead.
+`MemoryCache` keeps recently used results in memory, with the same keys.
+"""
+
+# Increment when an algorithm changes in a way which changes its results,
+# so that results calculated by older versions are not loaded.
+_format_version = 1
+
+# Default maximum total size of the result cache, in bytes.
+_default_max_size = 2 * 1024**3
+
+# Temporary files older than this, in seconds, are left over from interrupted writes.
+_stale_time = 24 * 60 * 60
+
+_result_extension = ".pkl"
+
+# Default maximum total size of the arrays in a memory cache, in bytes.
+_default_memory_size = 1024**3
+
+# Approximate size of each part of an array which is hashed at once, in bytes.
+_hash_slab_size = 16 * 1024 * 1024
+
 
 def clear():
     c = Cache()
@@ -82,3 +117,283 @@ class Cache:
     @staticmethod
     def _name_template(index) -> str:
         return f"data{index}"
+
+
+def result_key(
+    algorithm: str, implementation: str, signals, fs: float, params: Any, *extra
+) -> str:
+    """
+    Returns the key of a result in the `ResultCache`: a hash of the signals, the sampling frequency,
+    the parameters, the algorithm, its implementation and the versions of the algorithms.
+
+    Hashing long signals takes a while, so this should not be called in the main thread.
+
+    :param algorithm: the name of the algorithm
+    :param implementation: the implementation of the algorithm, e.g. "matlab" or "python"
+    :param signals: [list of 1D arrays] the signals which are analysed
+    :param fs: the sampling frequency
+    :param params: the parameters, e.g. the dictionary returned by `TFParams.get()`
+    :param extra: any other values which affect the result, e.g. the name of a signal
+    :return: the key, as a hexadecimal string
+    """
+    h = hashlib.sha1()
+    _update_hash(
+        h,
+        (
+            _format_version,
+            pymodalib.__version__,
+            algorithm,
+            implementation,
+            fs,
+            params,
+            extra,
+        ),
+    )
+
+    for s in signals:
+        _update_hash(h, np.asarray(s))
+
+    return h.hexdigest()
+
+
+def _update_hash(h, item: Any) -> None:
+    """
+    Adds an item to a hash. Numpy arrays are added by their contents; dictionaries are added in order
+    of their keys, so the hash does not depend on the order in which the items were inserted.
+    """
+    if isinstance(item, np.ndarray):
+        h.update(f"ndarray{item.dtype.str}{item.shape}".encode())
+        _update_hash_array(h, item)
+    elif isinstance(item, dict):
+        h.update(b"dict")
+        for key in sorted(item.keys(), key=str):
+            _update_hash(h, key)
+            _update_hash(h, item[key])
+    elif isinstance(item, (list, tuple)):
+        h.update(f"{type(item).__name__}{len(item)}".encode())
+        for i in item:
+            _update_hash(h, i)
+    else:
+        h.update(repr(item).encode())
+
+
+def _update_hash_array(h, array: np.ndarray) -> None:
+    """
+    Adds the contents of an array to a hash, a slab at a time so that non-contiguous or
+    memory-mapped arrays are not copied as a whole.
+    """
+    if array.ndim == 0 or array.flags.c_contiguous:
+        h.update(np.ascontiguousarray(array).data)
+        return
+
+    row_bytes = max(array[:1].nbytes, 1)
+    rows = max(_hash_slab_size // row_bytes, 1)
+
+    for start in range(0, array.shape[0], rows):
+        h.update(np.ascontiguousarray(array[start : start + rows]).data)
+
+
+class ResultCache:
+    """
+    A content-addressed cache of analysis results, stored in the cache folder.
+
+    Each result is pickled into a file named after its key. Files are written to a temporary
+    file first and then renamed, so a result is never read while it is partially written.
+    When the total size of the files exceeds the maximum size, the least recently used results
+    are removed.
+    """
+
+    def __init__(self, location: str = None, max_size: int = _default_max_size):
+        """
+        :param location: the folder in which to store the results; defaults to "results" in the cache folder
+        :param max_size: the maximum total size of the results, in bytes
+        """
+        self.location = location or os.path.join(Cache.get_cache_location(), "results")
+        self.max_size = max_size
+
+        os.makedirs(self.location, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Loads a result from the cache.
+
+        :param key: the key returned by `result_key()`
+        :return: the result, or None if it is not in the cache
+        """
+        path = self._path(key)
+
+        try:
+            with open(path, "rb") as f:
+                result = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Removing unreadable result from the cache: {e}")
+            self._remove(path)
+            return None
+
+        try:
+            # The modification time is used to find the least recently used results.
+            os.utime(path)
+        except OSError:
+            pass
+
+        return result
+
+    def set(self, key: str, result: Any) -> None:
+        """
+        Saves a result to the cache, then removes the least recently used results if the
+        cache is too large. Results larger than the maximum size are not saved.
+
+        This takes a while for large results, so it should not be called in the main thread.
+
+        :param key: the key returned by `result_key()`
+        :param result: the result, which must be picklable
+        """
+        if _nbytes(result) > self.max_size:
+            return
+
+        try:
+            fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=self.location)
+        except OSError as e:
+            print(f"Could not save result to the cache: {e}")
+            return
+
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(result, f, protocol=4)
+                size = f.tell()
+
+            if size > self.max_size:
+                self._remove(tmp)
+                return
+
+            os.replace(tmp, self._path(key))
+        except Exception as e:
+            print(f"Could not save result to the cache: {e}")
+            self._remove(tmp)
+            return
+
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Removes the least recently used results until the cache is smaller than its maximum size.
+        Also removes temporary files left over from interrupted writes.
+        """
+        now = time.time()
+        entries = []
+
+        with os.scandir(self.location) as it:
+            for entry in it:
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+
+                if entry.name.endswith(_result_extension):
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                elif entry.name.endswith(".tmp") and now - stat.st_mtime > _stale_time:
+                    self._remove(entry.path)
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+
+            self._remove(path)
+            total -= size
+
+    def clear(self) -> None:
+        """
+        Removes every result from the cache.
+        """
+        shutil.rmtree(self.location, ignore_errors=True)
+        os.makedirs(self.location, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.location, f"{key}{_result_extension}")
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class MemoryCache:
+    """
+    A least-recently-used cache of results in memory, limited by the total size of
+    the Numpy arrays in the results.
+
+    The results are not copied, so they must not be modified after they are added.
+    """
+
+    def __init__(self, max_size: int = _default_memory_size):
+        """
+        :param max_size: the maximum total size of the arrays in the results, in bytes
+        """
+        self.max_size = max_size
+        self.size = 0
+
+        self._items: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Returns a result from the cache, or None if it is not in the cache.
+        """
+        item = self._items.get(key)
+        if item is None:
+            return None
+
+        self._items.move_to_end(key)
+        return item[0]
+
+    def set(self, key: str, result: Any) -> None:
+        """
+        Adds a result to the cache, then removes the least recently used results until the cache
+        is smaller than its maximum size. Results larger than the maximum size are not added.
+        """
+        self.remove(key)
+
+        size = _nbytes(result)
+        if size > self.max_size:
+            return
+
+        self._items[key] = result, size
+        self.size += size
+
+        while self.size > self.max_size:
+            _, (_, removed) = self._items.popitem(last=False)
+            self.size -= removed
+
+    def remove(self, key: str) -> None:
+        """
+        Removes a result from the cache, if it is in the cache.
+        """
+        item = self._items.pop(key, None)
+        if item is not None:
+            self.size -= item[1]
+
+    def clear(self) -> None:
+        """
+        Removes every result from the cache.
+        """
+        self._items.clear()
+        self.size = 0
+
+
+def _nbytes(item: Any) -> int:
+    """
+    Returns the total size of the Numpy arrays in an item, including arrays in tuples,
+    lists and dictionaries.
+    """
+    if isinstance(item, np.ndarray):
+        return item.nbytes
+    if isinstance(item, dict):
+        return sum(_nbytes(i) for i in item.values())
+    if isinstance(item, (list, tuple)):
+        return sum(_nbytes(i) for i in item)
+
+    return 0
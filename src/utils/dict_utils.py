@@ -15,6 +15,8 @@
 #  along with this program. If not, see <https://www.gnu.org/licenses/>.
 from typing import Dict
 
+import numpy as np
+
 
 def sanitise(dictionary: Dict) -> Dict:
     """
@@ -31,3 +33,25 @@ def sanitise(dictionary: Dict) -> Dict:
             new[key] = value
 
     return new
+
+
+def to_arrays(dictionary: Dict) -> Dict:
+    """
+    Creates a copy of a dictionary, and of any dictionaries which it contains, where objects
+    which can be converted to Numpy arrays (such as a `TimeAxis`) are replaced by arrays.
+    Does not modify the existing dictionary.
+
+    :param dictionary: the dictionary containing the items to convert
+    :return: the new dictionary
+    """
+    new = {}
+
+    for key, value in dictionary.items():
+        if isinstance(value, dict):
+            value = to_arrays(value)
+        elif hasattr(value, "__array__") and not isinstance(value, np.ndarray):
+            value = np.asarray(value)
+
+        new[key] = value
+
+    return new
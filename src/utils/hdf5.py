@@ -0,0 +1,174 @@
+#  PyMODA, a Python implementation of MODA (Multiscale Oscillatory Dynamics Analysis).
+#  Copyright (C) 2019 Lancaster University
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program. If not, see <https://www.gnu.org/licenses/>.
+from typing import Any, Dict, List, Union
+
+import h5py
+import numpy as np
+from numpy import ndarray
+
+"""
+Saving results as HDF5 files, which can be opened with h5py in Python or `h5read` in MATLAB.
+
+Each dictionary is saved as an HDF5 group. Arrays are saved as datasets; large arrays are
+chunked and compressed, and are written a slab at a time instead of being converted as a whole,
+so there is no limit on their size (unlike .mat files, which are limited to 2GB per variable).
+Parameters and other scalar values are saved as attributes of the group.
+
+`load_hdf5()` opens a saved file without reading the arrays; each dataset is only read
+when it is indexed.
+"""
+
+# Arrays smaller than this size, in bytes, are saved without chunking or compression.
+_compress_threshold = 64 * 1024
+
+# Approximate size of each slab of an array which is written at once, in bytes.
+_slab_size = 64 * 1024 * 1024
+
+# Level of gzip compression, from 0 to 9.
+_compression_level = 4
+
+
+def save_hdf5(path: str, data: Dict[str, Any]) -> None:
+    """
+    Saves a dictionary of results as an HDF5 file.
+
+    :param path: the path of the file
+    :param data: the dictionary, as returned by `coro_get_data_to_save()`
+    """
+    with h5py.File(path, "w") as f:
+        _write_group(f, data)
+
+
+def load_hdf5(path: str) -> "HDF5Results":
+    """
+    Opens an HDF5 file saved by `save_hdf5()`, without reading the arrays.
+
+    :param path: the path of the file
+    :return: the results, which should be closed when they are no longer needed
+    """
+    return HDF5Results(h5py.File(path, "r"))
+
+
+class HDF5Results:
+    """
+    Lazy access to the results in an HDF5 file. Arrays are returned as h5py datasets, which are
+    only read from the file when they are indexed, e.g. `results["TFData"]["amplitude"][:, :, 0]`.
+    Groups are returned as `HDF5Results`, and attributes as their values.
+    """
+
+    def __init__(self, group: h5py.Group):
+        self.group = group
+
+    def keys(self) -> List[str]:
+        return list(self.group.keys()) + list(self.group.attrs.keys())
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.group or key in self.group.attrs
+
+    def __getitem__(self, key: str) -> Union["HDF5Results", h5py.Dataset, Any]:
+        if key in self.group:
+            item = self.group[key]
+            return HDF5Results(item) if isinstance(item, h5py.Group) else item
+
+        if key in self.group.attrs:
+            value = self.group.attrs[key]
+            return value.decode() if isinstance(value, bytes) else value
+
+        raise KeyError(key)
+
+    def close(self) -> None:
+        self.group.file.close()
+
+    def __enter__(self) -> "HDF5Results":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def _write_group(group: h5py.Group, data: Dict[str, Any]) -> None:
+    for key, value in data.items():
+        if key is None or value is None:
+            continue
+
+        key = str(key)
+        if isinstance(value, dict):
+            _write_group(group.create_group(key), value)
+        elif isinstance(value, (str, bytes, bool, int, float, complex, np.generic)):
+            group.attrs[key] = value
+        else:
+            _write_item(group, key, value)
+
+
+def _write_item(group: h5py.Group, key: str, value: Any) -> None:
+    """
+    Writes an array, or a list which can be converted to an array. Lists of arrays with different
+    shapes are saved as a group; anything else which cannot be saved is saved as text.
+    """
+    if _is_ragged(value):
+        _write_group(group.create_group(key), {str(i): v for i, v in enumerate(value)})
+        return
+
+    try:
+        array = np.asarray(value)
+    except ValueError:
+        array = None
+
+    if array is not None and array.dtype.kind in "biufc":
+        _write_array(group, key, array)
+    elif array is not None and array.dtype.kind == "U":
+        group.create_dataset(key, data=array.astype(object), dtype=h5py.string_dtype())
+    else:
+        group.attrs[key] = str(value)
+
+
+def _is_ragged(value: Any) -> bool:
+    """
+    Returns whether an item is a list of arrays with different shapes.
+    """
+    return (
+        isinstance(value, (list, tuple))
+        and all(isinstance(v, ndarray) for v in value)
+        and len({v.shape for v in value}) > 1
+    )
+
+
+def _write_array(group: h5py.Group, key: str, array: ndarray) -> None:
+    """
+    Writes an array as a dataset, a slab at a time so that non-contiguous or memory-mapped
+    arrays are not copied as a whole.
+    """
+    large = array.nbytes >= _compress_threshold and array.ndim > 0
+
+    ds = group.create_dataset(
+        key,
+        shape=array.shape,
+        dtype=array.dtype,
+        chunks=True if large else None,
+        compression="gzip" if large else None,
+        compression_opts=_compression_level if large else None,
+        shuffle=large,
+    )
+
+    if array.ndim == 0:
+        ds[()] = array
+        return
+
+    row_bytes = max(array[:1].nbytes, 1)
+    rows = max(_slab_size // row_bytes, 1)
+
+    for start in range(0, array.shape[0], rows):
+        ds[start : start + rows] = array[start : start + rows]